@@ -0,0 +1,113 @@
+# ad_checkpoint.py
+import os
+import json
+import shutil
+import logging
+from datetime import datetime, timedelta
+from config import AD_CHECKPOINT_DIR, AD_CHECKPOINT_MAX_AGE_HOURS
+
+# Контрольная точка относится к экспорту AD, поэтому пишем в его лог
+logger = logging.getLogger('ad_export')
+
+CHECKPOINT_VERSION = 1
+
+# Состояние экспорта (источник, метка изменений, завершенные разделы)
+STATE_FILE = "state.json"
+# Полученные пользователи: по строке JSON [раздел, запись] на пользователя
+RECORDS_FILE = "records.jsonl"
+
+def _write_state(checkpoint):
+    """Атомарная запись состояния контрольной точки"""
+    state = {key: checkpoint[key] for key in ('version', 'source', 'started_at', 'watermark', 'done')}
+    state_file = checkpoint['directory'] / STATE_FILE
+    tmp_file = state_file.with_name(state_file.name + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, state_file)
+
+def _read_records(records_file):
+    """Чтение сохраненных пользователей. Недописанная при сбое последняя строка пропускается"""
+    records = []
+    if not records_file.exists():
+        return records
+
+    with open(records_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                _, record = json.loads(line)
+            except ValueError:
+                logger.debug("Пропущена недописанная строка контрольной точки")
+                continue
+            records.append(record)
+    return records
+
+def clear_checkpoint(directory=AD_CHECKPOINT_DIR):
+    """Удаление контрольной точки после успешного экспорта"""
+    if directory.exists():
+        shutil.rmtree(directory, ignore_errors=True)
+
+def load_checkpoint(source, directory=AD_CHECKPOINT_DIR, max_age_hours=AD_CHECKPOINT_MAX_AGE_HOURS):
+    """
+    Контрольная точка экспорта из источника source.
+    Если прерванный экспорт того же источника не старше max_age_hours,
+    возвращается его состояние с сохраненными пользователями, иначе создается новая.
+    """
+    state = None
+    state_file = directory / STATE_FILE
+    if state_file.exists():
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать контрольную точку {state_file}: {e}")
+
+    if state is not None:
+        try:
+            started_at = datetime.fromisoformat(state['started_at'])
+            if (state.get('version') != CHECKPOINT_VERSION or state.get('source') != source
+                    or datetime.now() - started_at > timedelta(hours=max_age_hours)):
+                logger.info("Контрольная точка относится к другому или слишком старому экспорту, начинаем заново")
+                state = None
+        except (KeyError, TypeError, ValueError):
+            state = None
+
+    if state is not None:
+        checkpoint = dict(state, directory=directory, added=0,
+                          records=_read_records(directory / RECORDS_FILE))
+        logger.info(f"Возобновление экспорта AD с контрольной точки: {len(checkpoint['records'])} пользователей, "
+                    f"завершено разделов и диапазонов: {len(checkpoint['done'])}")
+        return checkpoint
+
+    clear_checkpoint(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    checkpoint = {
+        'version': CHECKPOINT_VERSION,
+        'source': source,
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'watermark': None,
+        'done': [],
+        'directory': directory,
+        'records': [],
+        'added': 0,
+    }
+    _write_state(checkpoint)
+    return checkpoint
+
+def add_checkpoint_batch(checkpoint, partition, records):
+    """Дописывает пачку полученных пользователей раздела на диск"""
+    with open(checkpoint['directory'] / RECORDS_FILE, 'a', encoding='utf-8') as f:
+        f.write("".join(json.dumps([partition, record], ensure_ascii=False) + "\n" for record in records))
+    checkpoint['added'] += len(records)
+
+def finish_checkpoint_partition(checkpoint, partition):
+    """Отмечает раздел завершенным: при возобновлении он не опрашивается"""
+    checkpoint['done'].append(partition)
+    _write_state(checkpoint)
+
+def set_checkpoint_watermark(checkpoint, watermark):
+    """
+    Сохраняет метку изменений прерванного экспорта. При возобновлении используется
+    она, а не новая, чтобы изменения, сделанные между запусками, не потерялись
+    """
+    checkpoint['watermark'] = watermark
+    _write_state(checkpoint)
@@ -1,17 +1,482 @@
 # ad_export.py
 import subprocess
-import pandas as pd
-import os
+import argparse
 import logging
-from tqdm import tqdm
+import time
+import queue
+import threading
+from collections import deque
+from pathlib import Path
 import sys
 import json
+import base64
 import unicodedata
-from config import AD_EXPORT_DIR, OUTPUT_DIR
+from config import AD_EXPORT_DIR, OUTPUT_DIR, EMPLOYEES_FILE, GPH_FILE, AD_SNAPSHOT_FILE, setup_logging
+from config import AD_FAST_EXPORT, AD_INCREMENTAL_EXPORT, AD_EXPORT_VIEWS, AD_PARTITIONS, AD_EXPORT_WORKERS
+from config import AD_EXPORT_USN_RANGES
+from ad_snapshot import SNAPSHOT_COLUMNS, EMPLOYEE, GPH, make_users_table, status_text
+from ad_snapshot import load_snapshot, load_users_table, needs_full_export, merge_changes, save_snapshot, user_key
+from ad_snapshot import save_export_error
+from ad_checkpoint import load_checkpoint, add_checkpoint_batch, finish_checkpoint_partition
+from ad_checkpoint import set_checkpoint_watermark, clear_checkpoint
 
 # Получаем специальный логгер для AD экспорта
 logger = logging.getLogger('ad_export')
 
+# Классическая PowerShell команда: GetDirectoryEntry() для каждого пользователя
+PS_COMMAND = """
+$OutputEncoding = [System.Text.Encoding]::UTF8
+[Console]::OutputEncoding = [System.Text.Encoding]::UTF8
+$ErrorActionPreference = 'Stop'
+
+try {
+    # Получаем информацию о текущем домене
+    $currentDomain = [System.DirectoryServices.ActiveDirectory.Domain]::GetCurrentDomain()
+    $domainDN = $currentDomain.GetDirectoryEntry().distinguishedName
+    
+    Write-Host "Подключение к домену: $domainDN"
+    
+    # Используем SearchScope для избежания рефералов
+    $searcher = New-Object System.DirectoryServices.DirectorySearcher
+    $searcher.SearchRoot = "LDAP://$domainDN"
+    $searcher.Filter = "(&(objectCategory=person)(objectClass=user))"
+    $searcher.SearchScope = [System.DirectoryServices.SearchScope]::Subtree
+    $searcher.PageSize = 1000
+    $searcher.PropertiesToLoad.AddRange(@("name", "samAccountName", "userAccountControl", "mail", "company", "distinguishedName"))
+    
+    $results = $searcher.FindAll()
+    Write-Host "Найдено пользователей: $($results.Count)"
+    
+    foreach ($result in $results) {
+        $user = $result.GetDirectoryEntry()
+        $name = $user.Properties["name"][0]
+        $samAccountName = $user.Properties["samAccountName"][0]
+        $userAccountControl = $user.Properties["userAccountControl"][0]
+        $enabled = ($userAccountControl -band 2) -eq 0
+        $email = if ($user.Properties["mail"]) { $user.Properties["mail"][0] } else { "" }
+        $company = if ($user.Properties["company"]) { $user.Properties["company"][0] } else { "" }
+        $distinguishedName = $user.Properties["distinguishedName"][0]
+        
+        $userData = @{
+            Name = $name
+            SamAccountName = $samAccountName
+            Enabled = $enabled
+            EmailAddress = $email
+            Company = $company
+            DistinguishedName = $distinguishedName
+        }
+        
+        [PSCustomObject]$userData | ConvertTo-Json -Depth 2 -Compress
+        Write-Host ""
+    }
+}
+catch {
+    Write-Error "Ошибка при получении данных из AD: $($_.Exception.Message)"
+    Write-Host "Попытка альтернативного метода..."
+    
+    # Альтернативный метод через Get-ADUser (требует модуль ActiveDirectory)
+    try {
+        Import-Module ActiveDirectory -ErrorAction SilentlyContinue
+        if (Get-Command Get-ADUser -ErrorAction SilentlyContinue) {
+            $users = Get-ADUser -Filter * -Properties Name, SamAccountName, Enabled, EmailAddress, Company, DistinguishedName
+            Write-Host "Найдено пользователей (альтернативный метод): $($users.Count)"
+            
+            foreach ($user in $users) {
+                $userData = @{
+                    Name = $user.Name
+                    SamAccountName = $user.SamAccountName
+                    Enabled = $user.Enabled
+                    EmailAddress = if ($user.EmailAddress) { $user.EmailAddress } else { "" }
+                    Company = if ($user.Company) { $user.Company } else { "" }
+                    DistinguishedName = $user.DistinguishedName
+                }
+                
+                [PSCustomObject]$userData | ConvertTo-Json -Depth 2 -Compress
+                Write-Host ""
+            }
+        } else {
+            Write-Error "Модуль ActiveDirectory недоступен"
+        }
+    }
+    catch {
+        Write-Error "Ошибка в альтернативном методе: $($_.Exception.Message)"
+    }
+}
+"""
+
+# Быстрая PowerShell команда: атрибуты берутся прямо из результатов поиска
+# (PropertiesToLoad), без отдельного GetDirectoryEntry() на каждого пользователя.
+# Каждый пользователь выводится одной строкой JSON сразу после получения,
+# FindAll() при этом подгружает страницы по мере перебора.
+# __SERVER__, __SEARCH_BASE__, __SCOPE__ и __USN_FILTER__ подставляются в build_fast_command()
+PS_FAST_COMMAND = """
+$OutputEncoding = [System.Text.Encoding]::UTF8
+[Console]::OutputEncoding = [System.Text.Encoding]::UTF8
+$ErrorActionPreference = 'Stop'
+
+function Get-FirstValue($properties, $name) {
+    $values = $properties[$name]
+    if ($values -and $values.Count -gt 0) { return $values[0] }
+    return ""
+}
+
+try {
+    $currentDomain = [System.DirectoryServices.ActiveDirectory.Domain]::GetCurrentDomain()
+    $domainDN = $currentDomain.GetDirectoryEntry().distinguishedName
+
+    Write-Host "Подключение к домену: $domainDN"
+
+    # uSNChanged локален для контроллера домена, поэтому фиксируем сервер
+    # и берем метку изменений до начала поиска
+    $server = "__SERVER__"
+    $rootDSE = if ($server) { [ADSI]"LDAP://$server/RootDSE" } else { [ADSI]"LDAP://RootDSE" }
+    $dcName = "$($rootDSE.dnsHostName)"
+    Write-Host "Watermark: $dcName $($rootDSE.highestCommittedUSN)"
+
+    # Раздел каталога: относительный DN (OU=cu_users) или полный DN, пусто - весь домен
+    $searchBase = "__SEARCH_BASE__"
+    $searchDN = if (-not $searchBase) { $domainDN } elseif ($searchBase -match 'DC=') { $searchBase } else { "$searchBase,$domainDN" }
+
+    $searcher = New-Object System.DirectoryServices.DirectorySearcher
+    $searcher.SearchRoot = "LDAP://$dcName/$searchDN"
+    $searcher.Filter = "(&(objectCategory=person)(objectClass=user)__USN_FILTER__)"
+    $searcher.SearchScope = [System.DirectoryServices.SearchScope]::__SCOPE__
+    $searcher.PageSize = 1000
+    $searcher.PropertiesToLoad.AddRange(@("name", "samAccountName", "userAccountControl", "mail", "company", "distinguishedName", "objectGUID", "uSNChanged"))
+
+    # Не обращаемся к $results.Count: это выкачало бы весь каталог до начала вывода,
+    # количество пользователей выводится после перебора
+    $results = $searcher.FindAll()
+    $stdout = [Console]::Out
+    $count = 0
+
+    foreach ($result in $results) {
+        # Ключи ResultPropertyCollection хранятся в нижнем регистре
+        $properties = $result.Properties
+        $userAccountControl = [int](Get-FirstValue $properties "useraccountcontrol")
+        $guidBytes = Get-FirstValue $properties "objectguid"
+        $objectGuid = if ($guidBytes) { ([guid]$guidBytes).ToString() } else { "" }
+
+        $userData = [ordered]@{
+            Name = Get-FirstValue $properties "name"
+            SamAccountName = Get-FirstValue $properties "samaccountname"
+            Enabled = ($userAccountControl -band 2) -eq 0
+            EmailAddress = Get-FirstValue $properties "mail"
+            Company = Get-FirstValue $properties "company"
+            DistinguishedName = Get-FirstValue $properties "distinguishedname"
+            ObjectGUID = $objectGuid
+            USNChanged = "$(Get-FirstValue $properties "usnchanged")"
+        }
+
+        $stdout.WriteLine(([PSCustomObject]$userData | ConvertTo-Json -Depth 2 -Compress))
+        $count++
+    }
+    $stdout.Flush()
+    $results.Dispose()
+    Write-Host "Найдено пользователей: $count"
+}
+catch {
+    Write-Error "Ошибка при получении данных из AD: $($_.Exception.Message)" -ErrorAction Continue
+    Write-Host "Попытка альтернативного метода..."
+
+    # Альтернативный метод через Get-ADUser (требует модуль ActiveDirectory) с тем же
+    # фильтром и разделом; пользователи, выведенные до сбоя, отбрасываются при чтении как повторные
+    try {
+        Import-Module ActiveDirectory -ErrorAction SilentlyContinue
+        if (-not (Get-Command Get-ADUser -ErrorAction SilentlyContinue)) {
+            throw "Модуль ActiveDirectory недоступен"
+        }
+        $parameters = @{
+            LDAPFilter = "(&(objectCategory=person)(objectClass=user)__USN_FILTER__)"
+            SearchScope = "__SCOPE__"
+            Properties = @("Name", "SamAccountName", "Enabled", "EmailAddress", "Company", "DistinguishedName", "ObjectGUID", "uSNChanged")
+        }
+        if ($searchDN) { $parameters.SearchBase = $searchDN }
+        if ($dcName) { $parameters.Server = $dcName }
+        $users = @(Get-ADUser @parameters)
+        Write-Host "Найдено пользователей (альтернативный метод): $($users.Count)"
+
+        foreach ($user in $users) {
+            $userData = [ordered]@{
+                Name = $user.Name
+                SamAccountName = $user.SamAccountName
+                Enabled = [bool]$user.Enabled
+                EmailAddress = if ($user.EmailAddress) { $user.EmailAddress } else { "" }
+                Company = if ($user.Company) { $user.Company } else { "" }
+                DistinguishedName = $user.DistinguishedName
+                ObjectGUID = if ($user.ObjectGUID) { $user.ObjectGUID.ToString() } else { "" }
+                USNChanged = "$($user.uSNChanged)"
+            }
+            [PSCustomObject]$userData | ConvertTo-Json -Depth 2 -Compress
+        }
+    }
+    catch {
+        # Ненулевой код завершения: неполный вывод не принимается за список пользователей
+        Write-Error "Ошибка в альтернативном методе: $($_.Exception.Message)" -ErrorAction Continue
+        exit 1
+    }
+}
+"""
+
+# Поиск разделов каталога для параллельного экспорта: контейнеры верхнего уровня
+# домена. Заодно фиксируется контроллер домена и общая для всех разделов метка изменений
+PS_PARTITIONS_COMMAND = """
+$OutputEncoding = [System.Text.Encoding]::UTF8
+[Console]::OutputEncoding = [System.Text.Encoding]::UTF8
+$ErrorActionPreference = 'Stop'
+
+try {
+    $currentDomain = [System.DirectoryServices.ActiveDirectory.Domain]::GetCurrentDomain()
+    $domainDN = $currentDomain.GetDirectoryEntry().distinguishedName
+
+    $server = "__SERVER__"
+    $rootDSE = if ($server) { [ADSI]"LDAP://$server/RootDSE" } else { [ADSI]"LDAP://RootDSE" }
+    $dcName = "$($rootDSE.dnsHostName)"
+    Write-Host "Watermark: $dcName $($rootDSE.highestCommittedUSN)"
+
+    $searcher = New-Object System.DirectoryServices.DirectorySearcher
+    $searcher.SearchRoot = "LDAP://$dcName/$domainDN"
+    $searcher.Filter = "(|(objectClass=organizationalUnit)(objectClass=container))"
+    $searcher.SearchScope = [System.DirectoryServices.SearchScope]::OneLevel
+    $searcher.PropertiesToLoad.Add("distinguishedName") | Out-Null
+
+    foreach ($result in $searcher.FindAll()) {
+        Write-Host "Partition: $($result.Properties["distinguishedname"][0])"
+    }
+}
+catch {
+    Write-Error "Ошибка при получении разделов AD: $($_.Exception.Message)"
+}
+"""
+
+# Поля пользователя в файлах экспорта
+REQUIRED_FIELDS = ['Name', 'SamAccountName', 'Enabled', 'EmailAddress', 'Company', 'DistinguishedName']
+
+# Ограничения памяти при потоковом чтении вывода PowerShell
+MAX_JSON_RECORD_SIZE = 1024 * 1024  # запись длиннее считается поврежденной
+STDERR_MAX_LINES = 1000
+# Пользователи очищаются пачками такого размера
+BATCH_SIZE = 1000
+# Разделы каталога передают записи в общий поток пачками такого размера
+PARTITION_BATCH_SIZE = 100
+
+# Соответствие атрибутов LDAP полям экспорта (для LDIF файлов)
+LDIF_ATTRIBUTES = {
+    'name': 'Name',
+    'samaccountname': 'SamAccountName',
+    'mail': 'EmailAddress',
+    'company': 'Company',
+    'distinguishedname': 'DistinguishedName',
+    'usnchanged': 'USNChanged',
+}
+
+def build_fast_command(watermark=None, search_base='', scope='Subtree', server=None, usn_range=None):
+    """
+    Быстрая PowerShell команда. Если передана метка изменений
+    ({'server': ..., 'usn': ...}), запрашиваются только пользователи,
+    измененные на том же контроллере домена после нее.
+    search_base и scope ограничивают поиск разделом каталога,
+    usn_range (нижняя, верхняя или None) - диапазоном uSNChanged.
+    """
+    usn_filter = f"(uSNChanged>={int(watermark['usn']) + 1})" if watermark else ''
+    if usn_range is not None:
+        low, high = usn_range
+        if low:
+            usn_filter += f"(uSNChanged>={int(low)})"
+        if high is not None:
+            usn_filter += f"(uSNChanged<={int(high)})"
+    if server is None:
+        server = watermark['server'] if watermark else ''
+
+    return (PS_FAST_COMMAND
+            .replace('__SERVER__', str(server))
+            .replace('__SEARCH_BASE__', search_base)
+            .replace('__SCOPE__', scope)
+            .replace('__USN_FILTER__', usn_filter))
+
+def parse_watermark(line):
+    """
+    Метка изменений из строки "Watermark: <DC> <USN>" вывода PowerShell:
+    {'server': ..., 'usn': ...} или None, если строка не является меткой
+    """
+    if not line.startswith("Watermark:"):
+        return None
+    parts = line.split(":", 1)[1].split()
+    if len(parts) != 2 or not parts[1].isdigit():
+        return None
+    return {'server': parts[0], 'usn': int(parts[1])}
+
+def usn_ranges(usn, count=AD_EXPORT_USN_RANGES):
+    """
+    Деление полного экспорта на count диапазонов uSNChanged по метке изменений usn:
+    список (нижняя граница, верхняя граница). Последний диапазон не ограничен сверху,
+    чтобы в него попали пользователи, измененные во время экспорта
+    """
+    count = max(1, count)
+    bounds = [usn * i // count for i in range(count + 1)]
+    ranges = []
+    for i in range(count):
+        low = bounds[i] + 1 if i else 0
+        high = bounds[i + 1] if i < count - 1 else None
+        if high is None or low <= high:
+            ranges.append((low, high))
+    return ranges
+
+def usn_range_name(partition, usn_range):
+    """Имя диапазона в контрольной точке и логе: раздел и границы uSNChanged"""
+    low, high = usn_range
+    return f"{partition or 'корень домена'} [uSNChanged {low}-{'' if high is None else high}]"
+
+def in_usn_range(record, usn_range):
+    """Попадает ли запись в диапазон uSNChanged (запись без USNChanged - в первый)"""
+    try:
+        usn = int(record.get('USNChanged') or 0)
+    except (TypeError, ValueError):
+        usn = 0
+    low, high = usn_range
+    return usn >= low and (high is None or usn <= high)
+
+def iter_ad_records(lines, on_total=None, on_watermark=None):
+    """
+    Потоковый разбор вывода PowerShell (живого процесса или записанного файла).
+    Возвращает пользователей по одному по мере чтения строк.
+    Служебные строки Write-Host пропускаются, JSON может быть разбит на несколько строк.
+    on_total: функция, которой передается количество пользователей, если PowerShell его сообщил
+    on_watermark: функция, которой передается метка изменений {'server': ..., 'usn': ...}
+    """
+    current_json = ""
+
+    for line in lines:
+        stripped = line.strip()
+
+        # Основной случай: компактный JSON целиком в одной строке
+        if not current_json and stripped.startswith('{'):
+            try:
+                yield json.loads(stripped)
+                continue
+            except json.JSONDecodeError:
+                pass
+
+        # Метка изменений для инкрементального экспорта: "Watermark: <DC> <USN>"
+        if stripped.startswith("Watermark:"):
+            watermark = parse_watermark(stripped)
+            if watermark is not None:
+                logger.info(f"Метка изменений AD: контроллер {watermark['server']}, USN {watermark['usn']}")
+                if on_watermark:
+                    on_watermark(watermark)
+            continue
+
+        # Ищем количество пользователей
+        if "Найдено пользователей" in stripped:
+            try:
+                user_count = int(stripped.split(":")[1].strip())
+                logger.info(f"Найдено пользователей: {user_count}")
+                if on_total:
+                    on_total(user_count)
+            except (IndexError, ValueError):
+                pass
+            continue
+
+        # Пустые строки - разделители между JSON в классическом формате
+        if not stripped:
+            if current_json:
+                logger.warning(f"Ошибка декодирования JSON: {current_json}")
+                current_json = ""
+            continue
+
+        # Строки вне JSON - служебный вывод PowerShell
+        if not current_json and not stripped.startswith('{'):
+            logger.debug(f"Служебная строка PowerShell: {stripped}")
+            continue
+
+        current_json += stripped
+        try:
+            user_data = json.loads(current_json)
+        except json.JSONDecodeError:
+            # JSON еще не закончился, ждем следующую строку
+            if len(current_json) > MAX_JSON_RECORD_SIZE:
+                logger.warning(f"Слишком длинная запись JSON отброшена: {current_json[:200]}...")
+                current_json = ""
+            continue
+
+        current_json = ""
+        yield user_data
+
+    # Проверяем завершающий JSON
+    if current_json:
+        logger.warning(f"Ошибка декодирования последнего JSON: {current_json}")
+
+def _ldif_entry_to_user(entry):
+    """Преобразование записи LDIF в формат вывода PowerShell"""
+    user_data = {field: entry.get(attr, "") for attr, field in LDIF_ATTRIBUTES.items()}
+    if not user_data['DistinguishedName']:
+        user_data['DistinguishedName'] = entry.get('dn', "")
+
+    try:
+        user_account_control = int(entry.get('useraccountcontrol') or 0)
+    except ValueError:
+        user_account_control = 0
+    user_data['Enabled'] = (user_account_control & 2) == 0
+    return user_data
+
+def iter_ldif_records(lines):
+    """
+    Потоковый разбор LDIF (например, выгрузки ldifde или ldapsearch).
+    Для многозначных атрибутов берется первое значение, как и в PowerShell команде.
+    """
+    entry = {}
+    previous = None
+
+    def parse_line(raw):
+        attr, _, value = raw.partition(':')
+        if value.startswith(':'):
+            value = base64.b64decode(value[1:].strip()).decode('utf-8', errors='replace')
+        else:
+            value = value.strip()
+        entry.setdefault(attr.strip().lower(), value)
+
+    for line in lines:
+        line = line.rstrip('\r\n')
+
+        # Строка продолжения: начинается с одного пробела
+        if line.startswith(' ') and previous is not None:
+            previous += line[1:]
+            continue
+
+        if previous is not None:
+            parse_line(previous)
+            previous = None
+
+        if not line.strip():
+            if entry:
+                yield _ldif_entry_to_user(entry)
+                entry = {}
+            continue
+
+        if line.startswith('#') or line.lower().startswith('version:'):
+            continue
+
+        previous = line
+
+    if previous is not None:
+        parse_line(previous)
+    if entry:
+        yield _ldif_entry_to_user(entry)
+
+class _ControlCharsTable(dict):
+    """
+    Таблица для str.translate: символы категории C (управляющие, форматные,
+    суррогаты, private use, неназначенные) удаляются, остальные остаются.
+    Заполняется по мере встречи символов, поэтому категория каждого
+    символа вычисляется один раз за весь экспорт.
+    """
+    def __missing__(self, code):
+        value = None if unicodedata.category(chr(code))[0] == "C" else code
+        self[code] = value
+        return value
+
+CONTROL_CHARS_TABLE = _ControlCharsTable()
+
 def clean_value(value):
     """Очистка и преобразование значений"""
     if value is None:
@@ -20,296 +485,630 @@ def clean_value(value):
     # Преобразуем в строку
     cleaned = str(value)
     
-    # Удаляем управляющие символы (0x00-0x1F) и спецсимволы Excel
-    cleaned = ''.join(ch for ch in cleaned if unicodedata.category(ch)[0] != "C")
-    cleaned = cleaned.replace('\x00', '').replace('\x01', '').replace('\x02', '')
+    # Удаляем управляющие символы и спецсимволы Excel. Строка из печатных символов
+    # не содержит символов категории C, поэтому таблица нужна только для остальных
+    if not cleaned.isprintable():
+        cleaned = cleaned.translate(CONTROL_CHARS_TABLE)
     
     return cleaned.strip()
 
-def export_ad_users():
-    # Определяем путь для сохранения файлов
-    script_dir = os.path.dirname(os.path.abspath(__file__))
+def clean_values(values):
+    """
+    Очистка целого столбца значений. Обычно весь столбец состоит из печатных
+    символов, и это проверяется одной операцией над склеенной строкой;
+    таблица применяется только к значениям с управляющими символами.
+    Результат совпадает с clean_value() для каждого значения.
+    """
+    texts = ["" if value is None else str(value) for value in values]
     
-    # Создаем директорию, если она не существует
-    AD_EXPORT_DIR.mkdir(exist_ok=True)
+    if not ''.join(texts).isprintable():
+        texts = [text if text.isprintable() else text.translate(CONTROL_CHARS_TABLE) for text in texts]
     
-    txt_filename = OUTPUT_DIR / 'ad_users_export.txt'
-    xlsx_filename = OUTPUT_DIR / 'ad_users_export.xlsx'
-    employees_filename = AD_EXPORT_DIR / 'сотрудники.txt'
-    gph_filename = AD_EXPORT_DIR / 'ГПХ.txt'
+    return [text.strip() for text in texts]
+
+def start_stderr_reader(process):
+    """
+    Читает stderr PowerShell в отдельном потоке, чтобы переполненный канал ошибок
+    не блокировал вывод данных. Хранятся только последние STDERR_MAX_LINES строк.
+    """
+    stderr_lines = deque(maxlen=STDERR_MAX_LINES)
+    thread = threading.Thread(target=stderr_lines.extend, args=(process.stderr,), daemon=True)
+    thread.start()
+    return thread, stderr_lines
+
+def iter_powershell_records(ps_command, errors, on_total=None, on_watermark=None):
+    """
+    Запускает PowerShell и построчно разбирает его вывод.
+    Текст ошибок из stderr добавляется в список errors после завершения процесса.
+    """
+    logger.debug("Запуск PowerShell команды...")
+    logger.debug(f"Команда PowerShell: {ps_command[:200]}...")  # Логируем начало команды для отладки
     
-    logger.info("="*60)
-    logger.info("Начало экспорта пользователей Active Directory")
-    logger.info(f"Файлы будут сохранены в: {script_dir}")
-    logger.info(f"Разделенные файлы будут сохранены в: {AD_EXPORT_DIR}")
+    process = subprocess.Popen(
+        ["powershell", "-Command", ps_command],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8',
+        errors='replace',
+        bufsize=1
+    )
+    stderr_thread, stderr_lines = start_stderr_reader(process)
     
-    # Обновленная PowerShell команда
-    ps_command = """
-    $OutputEncoding = [System.Text.Encoding]::UTF8
-    [Console]::OutputEncoding = [System.Text.Encoding]::UTF8
-    $ErrorActionPreference = 'Stop'
+    completed = False
+    try:
+        yield from iter_ad_records(process.stdout, on_total=on_total, on_watermark=on_watermark)
+        completed = True
+    finally:
+        # Если чтение прервано, процесс больше не нужен
+        if not completed and process.poll() is None:
+            process.kill()
+        process.wait()
+        stderr_thread.join()
+        stderr = "".join(stderr_lines).strip()
+        if stderr:
+            errors.append(stderr)
     
-    try {
-        # Получаем информацию о текущем домене
-        $currentDomain = [System.DirectoryServices.ActiveDirectory.Domain]::GetCurrentDomain()
-        $domainDN = $currentDomain.GetDirectoryEntry().distinguishedName
-        
-        Write-Host "Подключение к домену: $domainDN"
-        
-        # Используем SearchScope для избежания рефералов
-        $searcher = New-Object System.DirectoryServices.DirectorySearcher
-        $searcher.SearchRoot = "LDAP://$domainDN"
-        $searcher.Filter = "(&(objectCategory=person)(objectClass=user))"
-        $searcher.SearchScope = [System.DirectoryServices.SearchScope]::Subtree
-        $searcher.PageSize = 1000
-        $searcher.PropertiesToLoad.AddRange(@("name", "samAccountName", "userAccountControl", "mail", "company", "distinguishedName"))
-        
-        $results = $searcher.FindAll()
-        Write-Host "Найдено пользователей: $($results.Count)"
+    # Оборванный вывод нельзя принимать за полный список пользователей
+    if process.returncode != 0:
+        raise RuntimeError(f"PowerShell завершился с кодом {process.returncode}")
+
+def read_file_watermark(filename):
+    """Метка изменений из записанного вывода PowerShell (строки до первой записи) или None"""
+    if str(filename).lower().endswith('.ldif'):
+        return None
+    with open(filename, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped.startswith('{'):
+                break
+            watermark = parse_watermark(stripped)
+            if watermark is not None:
+                return watermark
+    return None
+
+def iter_file_records(filename, on_total=None, on_watermark=None, latency=0.0, fail_after=None, usn_range=None):
+    """
+    Чтение записанного вывода PowerShell или LDIF файла (.ldif) вместо домена.
+    latency: задержка в секундах на каждую страницу из BATCH_SIZE записей -
+    имитация медленного контроллера домена при проверке параллельного экспорта.
+    fail_after: прервать чтение ошибкой после стольких записей -
+    имитация сбоя PowerShell при проверке возобновления экспорта.
+    usn_range: выдавать только записи из диапазона uSNChanged, как запрос с фильтром.
+    """
+    logger.info(f"Чтение данных AD из файла: {filename}")
+    with open(filename, 'r', encoding='utf-8', errors='replace') as f:
+        if str(filename).lower().endswith('.ldif'):
+            records = iter_ldif_records(f)
+        else:
+            records = iter_ad_records(f, on_total=on_total, on_watermark=on_watermark)
         
-        foreach ($result in $results) {
-            $user = $result.GetDirectoryEntry()
-            $name = $user.Properties["name"][0]
-            $samAccountName = $user.Properties["samAccountName"][0]
-            $userAccountControl = $user.Properties["userAccountControl"][0]
-            $enabled = ($userAccountControl -band 2) -eq 0
-            $email = if ($user.Properties["mail"]) { $user.Properties["mail"][0] } else { "" }
-            $company = if ($user.Properties["company"]) { $user.Properties["company"][0] } else { "" }
-            $distinguishedName = $user.Properties["distinguishedName"][0]
+        count = 0
+        for record in records:
+            if usn_range is not None and not in_usn_range(record, usn_range):
+                continue
+            if fail_after is not None and count >= fail_after:
+                raise RuntimeError(f"Имитация сбоя источника после {count} записей: {filename}")
+            if latency and count % BATCH_SIZE == 0:
+                time.sleep(latency)
+            count += 1
+            yield record
+
+def discover_partitions(partitions, server=None):
+    """
+    Разделы каталога для параллельного экспорта: (DN раздела, область поиска).
+    Явно указанные OU становятся отдельными разделами, '*' означает остальной
+    каталог - каждый контейнер верхнего уровня домена плюс пользователи,
+    лежащие прямо в корне домена. Возвращает (метка изменений, разделы).
+    """
+    lines = []
+    errors = []
+    watermark = None
+    process = subprocess.run(
+        ["powershell", "-Command", PS_PARTITIONS_COMMAND.replace('__SERVER__', server or '')],
+        capture_output=True,
+        text=True,
+        encoding='utf-8',
+        errors='replace'
+    )
+    for line in process.stdout.splitlines():
+        if line.startswith("Partition:"):
+            lines.append(line.split(":", 1)[1].strip())
+        elif line.startswith("Watermark:"):
+            watermark = parse_watermark(line)
+    if process.stderr.strip():
+        errors.append(process.stderr.strip())
+    
+    result = [(base, 'Subtree') for base in partitions if base != '*']
+    if '*' in partitions:
+        explicit = {base.lower() for base, _ in result}
+        result += [(dn, 'Subtree') for dn in lines
+                   if not any(dn.lower() == base or dn.lower().startswith(base + ',') for base in explicit)]
+        result.append(('', 'OneLevel'))
+    
+    for error in errors:
+        logger.error(f"Ошибка PowerShell: {error}")
+    logger.info(f"Разделов AD для экспорта: {len(result)}")
+    return watermark, result
+
+def iter_partitioned_records(partition_sources, workers=AD_EXPORT_WORKERS, seen=None,
+                             on_batch=None, on_partition_done=None):
+    """
+    Параллельный опрос разделов каталога пулом потоков.
+    partition_sources: список (имя раздела, функция без аргументов, возвращающая итератор записей).
+    Записи всех разделов сливаются в общий поток по мере поступления;
+    пользователь, попавший в несколько разделов, выдается один раз.
+    seen: ключи уже полученных пользователей (при возобновлении экспорта)
+    on_batch, on_partition_done: вызываются в потоке чтения для каждой пачки
+    новых записей (имя раздела, записи) и по завершении раздела (имя раздела)
+    """
+    results = queue.Queue(maxsize=workers * 4)
+    stop = threading.Event()
+    pending = deque(partition_sources)
+    pending_lock = threading.Lock()
+    finished_marker = object()
+    
+    def put(item):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def worker():
+        try:
+            while not stop.is_set():
+                with pending_lock:
+                    if not pending:
+                        break
+                    name, open_records = pending.popleft()
+                
+                started = time.perf_counter()
+                count = 0
+                for batch in iter_batches(open_records(), PARTITION_BATCH_SIZE):
+                    count += len(batch)
+                    if not put((name, batch)):
+                        return
+                if not put((name, None)):
+                    return
+                logger.info(f"Раздел AD {name or 'корень домена'}: {count} пользователей за {time.perf_counter() - started:.1f} с")
+        except Exception as e:
+            put(e)
+        finally:
+            put(finished_marker)
+    
+    threads = [threading.Thread(target=worker, daemon=True)
+               for _ in range(max(1, min(workers, len(partition_sources))))]
+    for thread in threads:
+        thread.start()
+    
+    seen = set() if seen is None else seen
+    duplicates = 0
+    finished = 0
+    try:
+        while finished < len(threads):
+            item = results.get()
+            if item is finished_marker:
+                finished += 1
+                continue
+            if isinstance(item, Exception):
+                raise item
             
-            $userData = @{
-                Name = $name
-                SamAccountName = $samAccountName
-                Enabled = $enabled
-                EmailAddress = $email
-                Company = $company
-                DistinguishedName = $distinguishedName
-            }
+            name, batch = item
+            if batch is None:
+                if on_partition_done:
+                    on_partition_done(name)
+                continue
             
-            [PSCustomObject]$userData | ConvertTo-Json -Depth 2 -Compress
-            Write-Host ""
-        }
-    }
-    catch {
-        Write-Error "Ошибка при получении данных из AD: $($_.Exception.Message)"
-        Write-Host "Попытка альтернативного метода..."
+            new_records = []
+            for record in batch:
+                key = user_key(record)
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                new_records.append(record)
+            if on_batch and new_records:
+                on_batch(name, new_records)
+            yield from new_records
+    finally:
+        stop.set()
+    
+    if duplicates:
+        logger.info(f"Пропущено повторно полученных пользователей: {duplicates}")
+
+def process_users(users):
+    """
+    Очистка пачки пользователей: каждое поле очищается сразу для всего столбца.
+    Возвращает столбцы снимка {поле: список значений}, Enabled остается логическим.
+    """
+    columns = {}
+    for field in SNAPSHOT_COLUMNS:
+        if field == 'Category':
+            continue
+        values = [user.get(field, "") for user in users]
+        if field == 'Enabled':
+            columns[field] = [bool(value) for value in values]
+        else:
+            columns[field] = clean_values(values)
+    
+    columns['Category'] = [
+        classify_user(enabled, dn)
+        for enabled, dn in zip(columns['Enabled'], columns['DistinguishedName'])
+    ]
+    return columns
+
+def iter_batches(records, size=BATCH_SIZE):
+    """Разбивка потока записей на пачки ограниченного размера"""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def classify_user(enabled, distinguished_name):
+    """Разделение пользователей по критериям (только активные): сотрудник, ГПХ или пустая строка"""
+    if not enabled:
+        return ''
+    
+    dn = distinguished_name.lower()
+    # Сотрудники кампуса: DN содержит "cu_users" и не содержит "гпх"
+    if 'cu_users' in dn and 'гпх' not in dn:
+        return EMPLOYEE
+    # Сотрудники ГПХ: DN содержит "external_organizations" или "гпх"
+    if 'external_organizations' in dn or 'гпх' in dn:
+        return GPH
+    return ''
+
+def build_users_table(records, pbar=None):
+    """
+    Потоковая обработка пользователей: записи очищаются и классифицируются
+    пачками по мере чтения (параллельно с работой PowerShell). Исходные записи
+    держатся в памяти только пачкой (BATCH_SIZE), но столбцы снимка растут
+    с числом пользователей: память - O(число пользователей) на девять полей
+    снимка, в конце на время сборки таблицы столбцы существуют в двух копиях
+    (списки и DataFrame). Постоянной памяти нет - снимок целиком нужен для сохранения.
+    """
+    columns = {column: [] for column in SNAPSHOT_COLUMNS}
+    
+    for batch in iter_batches(records):
+        for column, values in process_users(batch).items():
+            columns[column].extend(values)
+        logger.debug(f"Обработана пачка из {len(batch)} пользователей, последний: {batch[-1].get('Name', 'Unknown')}")
+        if pbar is not None:
+            pbar.update(len(batch))
+    
+    return make_users_table(columns)
+
+def write_ad_views(users, views=AD_EXPORT_VIEWS):
+    """
+    Человекочитаемые представления снимка AD, создаются только по запросу:
+    'txt' - ad_users_export.txt, сотрудники.txt и ГПХ.txt,
+    'xlsx' - ad_users_export.xlsx
+    """
+    txt_filename = OUTPUT_DIR / 'ad_users_export.txt'
+    xlsx_filename = OUTPUT_DIR / 'ad_users_export.xlsx'
+    if views:
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    
+    rows = users[REQUIRED_FIELDS].assign(Enabled=users['Enabled'].map(status_text))
+    
+    if 'txt' in views:
+        # Экспорт в TXT (общий файл)
+        logger.info(f"Экспорт в TXT файл: {txt_filename}")
+        with open(txt_filename, 'w', encoding='utf-8') as txt_file:
+            for row in rows.itertuples(index=False):
+                txt_file.write("=" * 80 + "\n")
+                for key, value in zip(REQUIRED_FIELDS, row):
+                    txt_file.write(f"{key}: {value}\n")
+                txt_file.write("\n")
         
-        # Альтернативный метод через Get-ADUser (требует модуль ActiveDirectory)
-        try {
-            Import-Module ActiveDirectory -ErrorAction SilentlyContinue
-            if (Get-Command Get-ADUser -ErrorAction SilentlyContinue) {
-                $users = Get-ADUser -Filter * -Properties Name, SamAccountName, Enabled, EmailAddress, Company, DistinguishedName
-                Write-Host "Найдено пользователей (альтернативный метод): $($users.Count)"
-                
-                foreach ($user in $users) {
-                    $userData = @{
-                        Name = $user.Name
-                        SamAccountName = $user.SamAccountName
-                        Enabled = $user.Enabled
-                        EmailAddress = if ($user.EmailAddress) { $user.EmailAddress } else { "" }
-                        Company = if ($user.Company) { $user.Company } else { "" }
-                        DistinguishedName = $user.DistinguishedName
-                    }
-                    
-                    [PSCustomObject]$userData | ConvertTo-Json -Depth 2 -Compress
-                    Write-Host ""
-                }
-            } else {
-                Write-Error "Модуль ActiveDirectory недоступен"
-            }
-        }
-        catch {
-            Write-Error "Ошибка в альтернативном методе: $($_.Exception.Message)"
-        }
-    }
+        # Экспорт сотрудников кампуса и ГПХ
+        for category, filename in ((EMPLOYEE, EMPLOYEES_FILE), (GPH, GPH_FILE)):
+            logger.info(f"Экспорт {'сотрудников кампуса' if category == EMPLOYEE else 'сотрудников ГПХ'}: {filename}")
+            with open(filename, 'w', encoding='utf-8') as f:
+                for name, status in rows.loc[users['Category'] == category, ['Name', 'Enabled']].itertuples(index=False):
+                    f.write(f"Name: {name}\n")
+                    f.write(f"Status: {status}\n\n")
+    
+    if 'xlsx' in views:
+        # Экспорт в XLSX (общий файл); в режиме write_only строки не держатся в памяти
+        logger.info(f"Экспорт в XLSX файл: {xlsx_filename}")
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(REQUIRED_FIELDS)
+        for row in rows.itertuples(index=False):
+            sheet.append(list(row))
+        workbook.save(xlsx_filename)
+
+def ad_partition_sources(source, fast, watermark, errors, on_total=None, on_watermark=None,
+                         server=None, partitions=AD_PARTITIONS, fail_after=None,
+                         range_watermark=None, range_count=AD_EXPORT_USN_RANGES, file_range_count=1):
     """
+    Источники записей пользователей: список (имя раздела, функция, возвращающая итератор записей).
+    - source - каталог: каждый файл в нем считается отдельным разделом AD
+      (записанный вывод разделов);
+    - source - файл: записанный вывод PowerShell или LDIF, один раздел;
+    - иначе живой домен, при заданных partitions - по разделам каталога.
+    watermark: метка прошлого экспорта для запроса только изменений,
+    server: контроллер домена (при возобновлении - тот же, что в прерванном экспорте).
+    Полный экспорт делит каждый раздел на range_count диапазонов uSNChanged (usn_ranges)
+    по метке изменений на начало экспорта; range_watermark - метка прерванного экспорта,
+    чтобы диапазоны совпали с записанными в контрольной точке. Без метки (классический
+    режим, LDIF, недоступный контроллер) разделы не делятся.
+    Записанные файлы по умолчанию не делятся (file_range_count = 1): файл читается
+    локально, задержки контроллера нет, а каждый диапазон разбирал бы файл целиком
+    заново. file_range_count > 1 делит файлы так же, как домен, по полю USNChanged -
+    для проверки возобновления внутри раздела.
+    Ошибки PowerShell добавляются в список errors.
+    """
+    split = watermark is None and range_count > 1
     
-    logger.debug("Запуск PowerShell команды...")
-    logger.debug(f"Команда PowerShell: {ps_command[:200]}...")  # Логируем начало команды для отладки
+    if source is not None:
+        is_dir = Path(source).is_dir()
+        paths = sorted(path for path in Path(source).iterdir() if path.is_file()) if is_dir else [Path(source)]
+        split = watermark is None and file_range_count > 1
+        if split and range_watermark is None:
+            file_watermarks = [item for item in map(read_file_watermark, paths) if item]
+            if file_watermarks:
+                range_watermark = min(file_watermarks, key=lambda item: item['usn'])
+                on_watermark(range_watermark)
+        
+        if split and range_watermark:
+            return [(usn_range_name(path.name if is_dir else '', usn_range),
+                     lambda path=path, usn_range=usn_range: iter_file_records(
+                         path, on_watermark=on_watermark, fail_after=fail_after, usn_range=usn_range))
+                    for path in paths for usn_range in usn_ranges(range_watermark['usn'], file_range_count)]
+        if is_dir:
+            return [(path.name, lambda path=path: iter_file_records(path, on_watermark=on_watermark,
+                                                                    fail_after=fail_after))
+                    for path in paths]
+        return [('', lambda: iter_file_records(source, on_total=on_total, on_watermark=on_watermark,
+                                               fail_after=fail_after))]
+    
+    if not fast:
+        return [('', lambda: iter_powershell_records(PS_COMMAND, errors, on_total=on_total))]
+    
+    if server is None and watermark:
+        server = watermark['server']
+    
+    # Разделы и метка изменений на начало экспорта (нужна и для деления на диапазоны)
+    bases = None
+    if partitions or split:
+        partition_watermark, discovered = discover_partitions(partitions, server)
+        if partition_watermark:
+            on_watermark(partition_watermark)
+            server = partition_watermark['server']
+            bases = discovered if partitions else [('', 'Subtree')]
+            range_watermark = range_watermark or partition_watermark
+        elif partitions:
+            logger.warning("Не удалось получить разделы AD, выполняется экспорт одним запросом")
+        else:
+            logger.warning("Не удалось получить метку изменений AD, выполняется экспорт одним запросом")
+    
+    if bases is not None and split:
+        return [(usn_range_name(base, usn_range),
+                 lambda base=base, scope=scope, usn_range=usn_range: iter_powershell_records(
+                     build_fast_command(None, base, scope, server, usn_range), errors))
+                for base, scope in bases for usn_range in usn_ranges(range_watermark['usn'], range_count)]
+    if bases is not None:
+        return [(base, lambda base=base, scope=scope: iter_powershell_records(
+                    build_fast_command(watermark, base, scope, server), errors))
+                for base, scope in bases]
+    
+    return [('', lambda: iter_powershell_records(build_fast_command(watermark, server=server), errors,
+                                                 on_total=on_total, on_watermark=on_watermark))]
+
+def iter_checkpointed_records(partition_sources, checkpoint, watermarks, workers=AD_EXPORT_WORKERS):
+    """
+    Чтение разделов с контрольной точкой: сначала выдаются пользователи,
+    сохраненные прерванным экспортом, затем опрашиваются незавершенные разделы.
+    Каждая пачка новых пользователей и каждый завершенный раздел записываются на диск.
+    """
+    seen = set()
+    for record in checkpoint['records']:
+        seen.add(user_key(record))
+        yield record
+    
+    # Метка изменений, по которой разделы поделены на диапазоны, сохраняется
+    # до опроса: при возобновлении диапазоны строятся по ней же
+    if checkpoint['watermark'] is None and watermarks:
+        set_checkpoint_watermark(checkpoint, min(watermarks, key=lambda item: item['usn']))
+    
+    def on_batch(name, records):
+        if checkpoint['watermark'] is None and watermarks:
+            set_checkpoint_watermark(checkpoint, min(watermarks, key=lambda item: item['usn']))
+        add_checkpoint_batch(checkpoint, name, records)
+    
+    remaining = [(name, open_records) for name, open_records in partition_sources
+                 if name not in checkpoint['done']]
+    if len(remaining) < len(partition_sources):
+        logger.info(f"Пропущено разделов и диапазонов, завершенных до сбоя: "
+                    f"{len(partition_sources) - len(remaining)} из {len(partition_sources)}")
     
+    yield from iter_partitioned_records(
+        remaining, workers, seen=seen, on_batch=on_batch,
+        on_partition_done=lambda name: finish_checkpoint_partition(checkpoint, name)
+    )
+
+def fetch_changes(source, watermark, errors, watermarks, fail_after=None):
+    """
+    Пользователи, измененные после метки прошлого экспорта (изменений немного,
+    они собираются списком). Метки изменений разделов добавляются в watermarks.
+    Возвращает None, если запрос изменений к домену не выполнился (например,
+    недоступен контроллер домена) - тогда нужен полный экспорт.
+    Ошибка чтения записанного источника не перехватывается.
+    """
+    partition_sources = ad_partition_sources(source, True, watermark, errors,
+                                             on_watermark=watermarks.append, fail_after=fail_after)
     try:
-        # Запускаем PowerShell процесс
-        process = subprocess.Popen(
-            ["powershell", "-Command", ps_command],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding='utf-8',
-            errors='replace',
-            bufsize=1
-        )
+        changed_users = list(iter_partitioned_records(partition_sources))
+    except RuntimeError as e:
+        if source is not None:
+            raise
+        logger.error(f"Ошибка получения изменений: {e}")
+        return None
+    
+    if source is None and not watermarks:
+        return None
+    return changed_users
+
+def export_source_id(source, fast, partitions=AD_PARTITIONS):
+    """Описание источника экспорта: контрольная точка годится только для того же источника"""
+    if source is not None:
+        return str(Path(source).resolve())
+    return f"AD fast={fast} partitions={list(partitions)}"
+
+def export_ad_users(source=None, fast=AD_FAST_EXPORT, incremental=AD_INCREMENTAL_EXPORT, views=AD_EXPORT_VIEWS,
+                    fail_after=None):
+    """
+    Экспорт пользователей Active Directory в снимок AD.
+    source: путь к записанному выводу PowerShell или LDIF файлу (или каталогу
+        с записанными разделами) вместо живого домена
+    fast: читать атрибуты из результатов поиска без GetDirectoryEntry() на каждого пользователя
+    incremental: запрашивать только измененных с прошлого запуска пользователей
+        и сливать их с сохраненным снимком (при source - файл с измененными пользователями)
+    views: какие человекочитаемые файлы создать дополнительно ('txt', 'xlsx')
+    fail_after: прервать чтение записанного источника после стольких записей (проверка возобновления)
+    
+    Полный экспорт сохраняет полученных пользователей в контрольную точку по мере
+    чтения. Если экспорт прервался, следующий запуск с тем же источником продолжает
+    его: завершенные разделы и диапазоны uSNChanged не опрашиваются повторно,
+    повторяется только прерванный диапазон (см. AD_EXPORT_USN_RANGES).
+    При ошибке сохраненный снимок и его метка изменений не меняются,
+    сбой отмечается в AD_EXPORT_ERROR_FILE.
+    """
+    from tqdm import tqdm
+    
+    # Создаем директорию, если она не существует
+    AD_EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    
+    logger.info("="*60)
+    logger.info("Начало экспорта пользователей Active Directory")
+    logger.info(f"Снимок AD будет сохранен в: {AD_SNAPSHOT_FILE}")
+    
+    # Инкрементальный режим: берем снимок прошлого экспорта и метку изменений
+    snapshot = None
+    if incremental and not fast:
+        logger.warning("Инкрементальный экспорт доступен только в быстром режиме, выполняется полный экспорт")
+        incremental = False
+    if incremental:
+        snapshot = load_snapshot()
+        if snapshot is not None and source is None and needs_full_export(snapshot):
+            logger.info("Снимок AD устарел или не содержит метку изменений, выполняется полный экспорт")
+            snapshot = None
+    
+    checkpoint = None
+    try:
+        watermarks = []
+        errors = []
         
-        # Переменные для сбора данных
-        users = []
-        user_count = 0
-        current_json = ""
-        in_json = False
+        # Изменений немного: собираем их до обработки, чтобы при сбое запроса
+        # выполнить полный экспорт
+        changed_users = None
+        if snapshot is not None:
+            changed_users = fetch_changes(source, snapshot['watermark'], errors, watermarks, fail_after)
+            if changed_users is None:
+                for error in errors:
+                    logger.error(f"Ошибка PowerShell: {error}")
+                logger.warning("Не удалось получить изменения из AD, выполняется полный экспорт")
+                snapshot = None
+                errors.clear()
+                watermarks.clear()
         
-        # Читаем вывод построчно
-        logger.debug("Обработка вывода PowerShell...")
-        with tqdm(desc="Получение данных", unit="польз.") as pbar:
-            while True:
-                line = process.stdout.readline()
-                if not line:  # Конец вывода
-                    break
-                    
-                logger.debug(f"Получена строка: {line.strip()}")
-                    
-                # Ищем количество пользователей
-                if "Найдено пользователей:" in line:
-                    try:
-                        user_count = int(line.split(":")[1].strip())
-                        logger.info(f"Найдено пользователей: {user_count}")
-                        pbar.total = user_count
-                    except:
-                        pass
-                    continue
-                    
-                # Пустые строки - разделители между JSON
-                if line.strip() == "":
-                    if current_json:
-                        try:
-                            user_data = json.loads(current_json)
-                            users.append(user_data)
-                            pbar.update(1)
-                            logger.debug(f"Обработан пользователь: {user_data.get('Name', 'Unknown')}")
-                            current_json = ""
-                            in_json = False
-                        except json.JSONDecodeError:
-                            logger.warning(f"Ошибка декодирования JSON: {current_json}")
-                            current_json = ""
-                    continue
-                    
-                # Собираем JSON строки
-                current_json += line
-                in_json = True
+        # Полный экспорт продолжается с контрольной точки, если прошлый запуск прервался
+        server = None
+        if snapshot is None:
+            checkpoint = load_checkpoint(export_source_id(source, fast))
+            if checkpoint['watermark']:
+                watermarks.append(checkpoint['watermark'])
+                server = checkpoint['watermark']['server']
         
-        # Проверяем завершающий JSON
-        if current_json and in_json:
-            try:
-                user_data = json.loads(current_json)
-                users.append(user_data)
-                pbar.update(1)
-                logger.debug(f"Обработан последний пользователь: {user_data.get('Name', 'Unknown')}")
-            except json.JSONDecodeError:
-                logger.warning(f"Ошибка декодирования последнего JSON: {current_json}")
+        # Читаем вывод построчно, пользователи обрабатываются по мере получения из AD
+        logger.debug("Обработка вывода PowerShell...")
+        with tqdm(desc="Получение и обработка данных", unit="польз.") as pbar:
+            def set_total(user_count):
+                pbar.total = user_count
+            
+            if snapshot is not None:
+                logger.info(f"Получено измененных пользователей: {len(changed_users)}")
+                records = merge_changes(snapshot['users'], changed_users)
+                pbar.total = len(records)
+            else:
+                partition_sources = ad_partition_sources(
+                    source, fast, None, errors, on_total=set_total, on_watermark=watermarks.append,
+                    server=server, fail_after=fail_after, range_watermark=checkpoint['watermark']
+                )
+                records = iter_checkpointed_records(partition_sources, checkpoint, watermarks)
+            
+            users = build_users_table(records, pbar)
         
         # Проверяем ошибки
-        stderr = process.stderr.read()
-        if stderr:
-            logger.error(f"Ошибка PowerShell: {stderr}")
-            if not users:
-                # Создаем пустые файлы, если не удалось получить данные
-                open(employees_filename, 'w', encoding='utf-8').close()
-                open(gph_filename, 'w', encoding='utf-8').close()
-                return 0, 0, 0
+        for error in errors:
+            logger.error(f"Ошибка PowerShell: {error}")
         
-        if not users:
-            logger.warning("Не найдено пользователей в Active Directory")
-            # Создаем пустые файлы
-            open(employees_filename, 'w', encoding='utf-8').close()
-            open(gph_filename, 'w', encoding='utf-8').close()
-            return 0, 0, 0
-        
-        # Обработка данных пользователей
-        logger.info("Обработка данных...")
-        processed_users = []
-        employees = []  # Сотрудники кампуса
-        gph_users = []  # Сотрудники ГПХ
-        
-        required_fields = ['Name', 'SamAccountName', 'Enabled', 'EmailAddress', 'Company', 'DistinguishedName']
-        
-        with tqdm(total=len(users), desc="Обработка данных", unit="польз.") as pbar:
-            for user in users:
-                processed_user = {}
-                for field in required_fields:
-                    value = user.get(field, "")
-                    # Для поля Enabled сохраняем статус активности
-                    if field == 'Enabled':
-                        processed_user[field] = "Активна" if value else "Заблокирована"
-                    else:
-                        processed_user[field] = clean_value(value)
-                
-                processed_users.append(processed_user)
-                logger.debug(f"Обработан пользователь: {processed_user['Name']} (Enabled: {processed_user['Enabled']})")
-                
-                # Разделение пользователей по критериям (только активные)
-                dn = processed_user.get('DistinguishedName', '').lower()
-                is_active = user.get('Enabled', False)
-                
-                if is_active:
-                    # Сотрудники кампуса: DN содержит "cu_users" и не содержит "гпх"
-                    if 'cu_users' in dn and 'гпх' not in dn:
-                        employees.append(processed_user)
-                        logger.debug(f"Добавлен сотрудник: {processed_user['Name']}")
-                    # Сотрудники ГПХ: DN содержит "external_organizations" или "гпх"
-                    elif 'external_organizations' in dn or 'гпх' in dn:
-                        gph_users.append(processed_user)
-                        logger.debug(f"Добавлен ГПХ: {processed_user['Name']}")
-                
-                pbar.update(1)
+        # Общей меткой изменений считается наименьшая из меток разделов, чтобы не пропустить изменения
+        watermark = min(watermarks, key=lambda item: item['usn']) if watermarks else None
         
-        # Экспорт в TXT (общий файл)
-        logger.info(f"Экспорт в TXT файл: {txt_filename}")
-        with open(txt_filename, 'w', encoding='utf-8') as txt_file, \
-             tqdm(total=len(processed_users), desc="Запись в TXT", unit="польз.") as pbar:
-            
-            for user in processed_users:
-                txt_file.write("=" * 80 + "\n")
-                for key, value in user.items():
-                    txt_file.write(f"{key}: {value}\n")
-                txt_file.write("\n")
-                pbar.update(1)
+        # Снимок - основной результат экспорта, его читает обработчик Excel
+        if snapshot is not None:
+            save_snapshot(users, watermark or snapshot['watermark'], snapshot.get('full_export_at'))
+        else:
+            save_snapshot(users, watermark)
+            clear_checkpoint()
         
-        # Экспорт сотрудников кампуса
-        logger.info(f"Экспорт сотрудников кампуса: {employees_filename}")
-        with open(employees_filename, 'w', encoding='utf-8') as emp_file, \
-             tqdm(total=len(employees), desc="Запись сотрудников", unit="польз.") as pbar:
-            
-            for user in employees:
-                emp_file.write(f"Name: {user['Name']}\n")
-                emp_file.write(f"Status: {user['Enabled']}\n\n")
-                pbar.update(1)
+        total = len(users)
+        employees_count = int((users['Category'] == EMPLOYEE).sum())
+        gph_count = int((users['Category'] == GPH).sum())
         
-        # Экспорт сотрудников ГПХ
-        logger.info(f"Экспорт сотрудников ГПХ: {gph_filename}")
-        with open(gph_filename, 'w', encoding='utf-8') as gph_file, \
-             tqdm(total=len(gph_users), desc="Запись ГПХ", unit="польз.") as pbar:
-            
-            for user in gph_users:
-                gph_file.write(f"Name: {user['Name']}\n")
-                gph_file.write(f"Status: {user['Enabled']}\n\n")
-                pbar.update(1)
+        if not total:
+            logger.warning("Не найдено пользователей в Active Directory")
+            return 0, 0, 0
         
-        # Экспорт в XLSX (общий файл)
-        logger.info(f"Экспорт в XLSX файл: {xlsx_filename}")
-        with tqdm(total=1, desc="Создание Excel", leave=False) as pbar:
-            df = pd.DataFrame(processed_users)
-            
-            # Сохраняем в Excel
-            df.to_excel(xlsx_filename, index=False, engine='openpyxl')
-            pbar.update(1)
+        write_ad_views(users, views)
         
         logger.info("Экспорт завершен успешно!")
-        logger.info(f"- TXT файл: {txt_filename}")
-        logger.info(f"- Excel файл: {xlsx_filename}")
-        logger.info(f"- Сотрудники кампуса: {employees_filename}")
-        logger.info(f"- Сотрудники ГПХ: {gph_filename}")
-        logger.info(f"- Всего экспортировано пользователей: {len(processed_users)}")
-        logger.info(f"- Сотрудников кампуса: {len(employees)}")
-        logger.info(f"- Сотрудников ГПХ: {len(gph_users)}")
+        logger.info(f"- Снимок AD: {AD_SNAPSHOT_FILE}")
+        logger.info(f"- Всего экспортировано пользователей: {total}")
+        logger.info(f"- Сотрудников кампуса: {employees_count}")
+        logger.info(f"- Сотрудников ГПХ: {gph_count}")
         
-        return len(processed_users), len(employees), len(gph_users)
+        return total, employees_count, gph_count
     
     except Exception as e:
         logger.exception("Произошла критическая ошибка:")
-        # Создаем пустые файлы при ошибке
+        if checkpoint is not None and (checkpoint['records'] or checkpoint['added'] or checkpoint['done']):
+            logger.info("Полученные данные сохранены в контрольной точке, следующий запуск продолжит экспорт")
+        # Последний удачный снимок и его метка изменений остаются без изменений,
+        # обработка продолжается по ним с предупреждением о сбое
         try:
-            open(employees_filename, 'w', encoding='utf-8').close()
-            open(gph_filename, 'w', encoding='utf-8').close()
-        except:
+            save_export_error(str(e))
+        except OSError:
             pass
         return 0, 0, 0
 
 if __name__ == "__main__":
-    export_ad_users()
\ No newline at end of file
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Экспорт пользователей Active Directory")
+    parser.add_argument('source', nargs='?', help="записанный вывод PowerShell, LDIF файл или каталог разделов вместо домена")
+    parser.add_argument('--views', nargs='*', choices=['txt', 'xlsx'], default=AD_EXPORT_VIEWS,
+                        help="дополнительные человекочитаемые файлы")
+    parser.add_argument('--views-only', action='store_true',
+                        help="только построить файлы по сохраненному снимку, без экспорта")
+    parser.add_argument('--fail-after', type=int, metavar='N',
+                        help="прервать чтение записанного источника после N записей (проверка возобновления)")
+    args = parser.parse_args()
+    
+    if args.views_only:
+        users = load_users_table()
+        if users is None:
+            sys.exit("Снимок AD не найден")
+        write_ad_views(users, args.views)
+    else:
+        export_ad_users(args.source, views=args.views, fail_after=args.fail_after)
\ No newline at end of file
@@ -0,0 +1,204 @@
+# ad_snapshot.py
+import os
+import json
+import logging
+from datetime import datetime, timedelta
+from config import AD_SNAPSHOT_FILE, AD_USERS_FILE, AD_EXPORT_ERROR_FILE, AD_FULL_EXPORT_INTERVAL_DAYS
+from table_store import read_table, table_file, write_table
+
+# Снимок относится к экспорту AD, поэтому пишем в его лог
+logger = logging.getLogger('ad_export')
+
+SNAPSHOT_VERSION = 3
+
+# Столбцы таблицы пользователей AD
+SNAPSHOT_COLUMNS = [
+    'Name', 'SamAccountName', 'Enabled', 'EmailAddress', 'Company',
+    'DistinguishedName', 'ObjectGUID', 'USNChanged', 'Category'
+]
+
+# Категории пользователей в столбце Category
+EMPLOYEE = 'employee'
+GPH = 'gph'
+
+def status_text(enabled):
+    """Текстовый статус учетной записи, как в файлах экспорта"""
+    return "Активна" if enabled else "Заблокирована"
+
+def make_users_table(columns):
+    """
+    Таблица пользователей из столбцов {поле: список значений}.
+    Повторяющиеся значения (категория) хранятся как categorical.
+    """
+    # pandas нужен только для таблицы снимка, импорт модуля его не загружает
+    import pandas as pd
+
+    users = pd.DataFrame({column: columns.get(column, []) for column in SNAPSHOT_COLUMNS})
+    users['Enabled'] = users['Enabled'].astype(bool)
+    users['Category'] = users['Category'].astype('category')
+    return users
+
+def user_key(user):
+    """Ключ пользователя в снимке: samAccountName (уникален в домене), иначе DN"""
+    for field in ('SamAccountName', 'DistinguishedName'):
+        value = user.get(field)
+        if value:
+            return str(value).lower()
+    return None
+
+def _load_meta(meta_filename):
+    """Метаданные снимка AD или None, если их нет, они повреждены или в прежнем формате"""
+    if not meta_filename.exists():
+        return None
+
+    try:
+        with open(meta_filename, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Не удалось прочитать снимок AD {meta_filename}: {e}")
+        return None
+
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        logger.warning(f"Неподдерживаемый формат снимка AD: {meta_filename}")
+        return None
+    return snapshot
+
+def _read_users(snapshot, users_filename):
+    """Таблица пользователей снимка по описанию из метаданных. None, если она повреждена"""
+    try:
+        users = read_table(users_filename, snapshot['table'])
+    except Exception as e:
+        logger.warning(f"Не удалось прочитать снимок AD {users_filename}: {e}")
+        return None
+
+    if list(users.columns) != SNAPSHOT_COLUMNS:
+        logger.warning(f"Неподдерживаемый формат снимка AD: {users_filename}")
+        return None
+
+    return users
+
+def load_users_table(meta_filename=AD_SNAPSHOT_FILE, users_filename=AD_USERS_FILE):
+    """Загрузка таблицы пользователей AD. Возвращает None, если снимка нет или он поврежден"""
+    snapshot = _load_meta(meta_filename)
+    if snapshot is None:
+        return None
+    return _read_users(snapshot, users_filename)
+
+def load_snapshot(meta_filename=AD_SNAPSHOT_FILE, users_filename=AD_USERS_FILE):
+    """
+    Загрузка последнего снимка AD для инкрементального экспорта:
+    метаданные (метка изменений, дата полного экспорта) и пользователи списком словарей.
+    Возвращает None, если снимка нет или он поврежден.
+    """
+    if not meta_filename.exists():
+        logger.info("Снимок AD не найден, будет выполнен полный экспорт")
+        return None
+
+    snapshot = _load_meta(meta_filename)
+    if snapshot is None:
+        return None
+
+    users = _read_users(snapshot, users_filename)
+    if users is None:
+        return None
+
+    snapshot['users'] = users.drop(columns='Category').to_dict('records')
+    logger.info(f"Загружен снимок AD: {len(snapshot['users'])} пользователей, "
+                f"метка изменений: {snapshot.get('watermark')}")
+    return snapshot
+
+def needs_full_export(snapshot, max_age_days=AD_FULL_EXPORT_INTERVAL_DAYS):
+    """
+    Проверяет, нужен ли полный экспорт вместо инкрементального.
+    Поиск по uSNChanged не возвращает удаленные объекты, поэтому снимок
+    периодически полностью перестраивается.
+    """
+    if snapshot is None or not snapshot.get('watermark'):
+        return True
+
+    try:
+        full_export_at = datetime.fromisoformat(snapshot['full_export_at'])
+    except (KeyError, TypeError, ValueError):
+        return True
+
+    return datetime.now() - full_export_at > timedelta(days=max_age_days)
+
+def merge_changes(snapshot_users, changed_users):
+    """
+    Слияние измененных пользователей со снимком.
+    Запись заменяется по objectGUID (переименование учетной записи),
+    иначе по samAccountName/DN. Новые пользователи добавляются.
+    """
+    merged = {}
+    keys_by_guid = {}
+    for user in snapshot_users:
+        key = user_key(user)
+        merged[key] = user
+        if user.get('ObjectGUID'):
+            keys_by_guid[user['ObjectGUID']] = key
+
+    added = 0
+    updated = 0
+    for user in changed_users:
+        key = user_key(user)
+        old_key = keys_by_guid.get(user.get('ObjectGUID')) if user.get('ObjectGUID') else None
+        if old_key is not None and old_key != key:
+            merged.pop(old_key, None)
+
+        if key in merged or old_key is not None:
+            updated += 1
+        else:
+            added += 1
+        merged[key] = user
+        if user.get('ObjectGUID'):
+            keys_by_guid[user['ObjectGUID']] = key
+
+    logger.info(f"Слияние со снимком AD: {updated} изменено, {added} добавлено, всего {len(merged)}")
+    return list(merged.values())
+
+def save_export_error(message, filename=AD_EXPORT_ERROR_FILE):
+    """Отметка о сбое экспорта AD: время и текст ошибки. Снимок при этом не меняется"""
+    error = {'failed_at': datetime.now().isoformat(timespec='seconds'), 'error': message}
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(error, f, ensure_ascii=False, indent=2)
+
+def load_export_error(filename=AD_EXPORT_ERROR_FILE):
+    """Отметка о сбое последнего экспорта AD или None, если он завершился успешно"""
+    if not filename.exists():
+        return None
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'failed_at': None, 'error': None}
+
+def save_snapshot(users, watermark, full_export_at=None,
+                  meta_filename=AD_SNAPSHOT_FILE, users_filename=AD_USERS_FILE, error_filename=AD_EXPORT_ERROR_FILE):
+    """
+    Сохранение снимка AD: таблица пользователей (Parquet или CSV, см. table_store)
+    и метаданные с меткой изменений и типами столбцов в JSON рядом с ней.
+    Отметка о сбое прошлого экспорта удаляется
+    """
+    now = datetime.now().isoformat(timespec='seconds')
+
+    # Файлы пишутся во временные и атомарно заменяются, чтобы прерванная запись не портила снимок
+    table = write_table(users, users_filename)
+
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'table': table,
+        'watermark': watermark,
+        'full_export_at': full_export_at or now,
+        'updated_at': now,
+        'total': len(users),
+        'employees': int((users['Category'] == EMPLOYEE).sum()),
+        'gph': int((users['Category'] == GPH).sum()),
+    }
+    tmp_meta = meta_filename.with_name(meta_filename.name + '.tmp')
+    with open(tmp_meta, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_meta, meta_filename)
+    error_filename.unlink(missing_ok=True)
+
+    logger.info(f"Снимок AD сохранен: {table_file(users_filename, table)} ({len(users)} пользователей, метка изменений: {watermark})")
+    return snapshot
@@ -0,0 +1,239 @@
+# batch.py
+"""
+Запуск обработки без диалога - для планировщика (cron, Планировщик заданий Windows)
+и серий запусков подряд. Источники, типы сотрудников, папки и форматы результатов
+задаются аргументами или файлом настроек JSON (аргументы важнее файла).
+Итоги запуска выводятся в stdout одним JSON документом (лог пишется в stderr и log.txt).
+
+Коды завершения:
+    0 - обработка выполнена
+    1 - ошибка обработки
+    2 - неверные аргументы или файл настроек (или другие папки, чем у уже загруженных в процессе настроек)
+    3 - обработка выполнена с предупреждениями (экспорт AD не вернул пользователей,
+        выбранный источник не загружен или пуст)
+
+Примеры:
+    python batch.py --sources 1c kontur --employee-types employees
+    python batch.py --config ночной_запуск.json --summary вывод/итоги.json
+    python batch.py --input-dir проверка/эксельки --ad-source проверка/ad_export.txt
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from pathlib import Path
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Источники и типы сотрудников - как в диалоге main.py (номера пунктов меню тоже допустимы)
+SOURCE_OPTIONS = {'all': 0, '1c': 1, 'diadoc': 2, 'kontur': 3}
+EMPLOYEE_TYPE_OPTIONS = {'all': 0, 'employees': 1, 'gph': 2}
+REPORT_FORMAT_CHOICES = ['xlsx', 'csv', 'parquet', 'jsonl']
+
+# Ключи файла настроек и их значения по умолчанию
+CONFIG_DEFAULTS = {
+    'sources': ['all'],
+    'employee_types': ['all'],
+    'input_dir': None,
+    'output_dir': None,
+    'report_formats': None,
+    'ad_export': True,
+    'ad_source': None,
+    'summary': None,
+}
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_WARNINGS = 3
+
+class SettingsError(Exception):
+    """Неверный файл настроек или значение параметра"""
+
+def parse_choices(values, options, title):
+    """Названия или номера пунктов меню -> множество номеров, как в диалоге main.py"""
+    numbers = {str(number): number for number in options.values()}
+    selected = set()
+    for value in values:
+        value = str(value).strip().lower()
+        if value in options:
+            selected.add(options[value])
+        elif value in numbers:
+            selected.add(numbers[value])
+        else:
+            raise SettingsError(f"{title}: неизвестное значение '{value}', допустимо: {', '.join(options)}")
+    if not selected:
+        raise SettingsError(f"{title}: не выбрано ни одного значения")
+    return {0} if 0 in selected else selected
+
+def load_settings_file(filename):
+    """Файл настроек JSON; относительные пути в нем - от папки файла"""
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            settings = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SettingsError(f"Не удалось прочитать файл настроек {filename}: {e}")
+    if not isinstance(settings, dict):
+        raise SettingsError(f"Файл настроек {filename} должен содержать объект JSON")
+
+    unknown = set(settings) - set(CONFIG_DEFAULTS)
+    if unknown:
+        raise SettingsError(f"Неизвестные параметры в файле настроек: {', '.join(sorted(unknown))}")
+    for key in ('input_dir', 'output_dir', 'ad_source', 'summary'):
+        if settings.get(key):
+            settings[key] = str(Path(filename).parent / settings[key])
+    return settings
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', help="файл настроек JSON с ключами: " + ", ".join(CONFIG_DEFAULTS))
+    parser.add_argument('--sources', nargs='+', metavar='ИСТОЧНИК',
+                        help="системы для проверки: all, 1c, diadoc (Сфера Курьер), kontur (Контур Диадок); по умолчанию all")
+    parser.add_argument('--employee-types', nargs='+', metavar='ТИП',
+                        help="типы сотрудников: all, employees, gph; по умолчанию all")
+    parser.add_argument('--input-dir', help="папка исходных файлов (вместо эксельки/)")
+    parser.add_argument('--output-dir', help="папка результатов и логов (вместо вывод/)")
+    parser.add_argument('--formats', nargs='+', choices=REPORT_FORMAT_CHOICES, dest='report_formats',
+                        help="форматы результатов (по умолчанию REPORT_FORMATS из config.py)")
+    parser.add_argument('--no-ad-export', action='store_false', dest='ad_export', default=None,
+                        help="не выполнять экспорт AD, использовать сохраненный снимок")
+    parser.add_argument('--ad-source', metavar='ПУТЬ',
+                        help="экспорт AD из записанного вывода PowerShell, LDIF файла или каталога разделов вместо домена")
+    parser.add_argument('--summary', help="дополнительно записать итоги запуска JSON в файл")
+    return parser
+
+def resolve_settings(args):
+    """Настройки запуска: значения по умолчанию, затем файл настроек, затем аргументы"""
+    settings = dict(CONFIG_DEFAULTS)
+    if args.config:
+        settings.update(load_settings_file(args.config))
+    for key in CONFIG_DEFAULTS:
+        value = getattr(args, key)
+        if value is not None:
+            settings[key] = value
+
+    if isinstance(settings['sources'], str) or isinstance(settings['employee_types'], str):
+        raise SettingsError("sources и employee_types задаются списками")
+    settings['selected_options'] = parse_choices(settings['sources'], SOURCE_OPTIONS, "Источники")
+    settings['selected_employee_types'] = parse_choices(settings['employee_types'], EMPLOYEE_TYPE_OPTIONS, "Типы сотрудников")
+    if settings['report_formats'] is not None:
+        unknown = set(settings['report_formats']) - set(REPORT_FORMAT_CHOICES)
+        if unknown:
+            raise SettingsError(f"Неизвестные форматы результатов: {', '.join(sorted(unknown))}")
+    return settings
+
+def run_warnings(run, selected_options):
+    """Предупреждения запуска: пустой экспорт AD и незагруженные источники"""
+    from source_loader import SOURCE_TITLES, selected_sources
+
+    warnings = []
+    if run['ad'] is not None and run['ad'][0] == 0:
+        warnings.append("Экспорт AD не вернул пользователей, результаты сверки могут быть неполными")
+    for name in selected_sources(selected_options):
+        if not run['source_rows'].get(name):
+            warnings.append(f"Источник {SOURCE_TITLES[name]} не загружен или пуст")
+    return warnings
+
+def json_value(value):
+    """Значения итогов, которые json не сериализует сам: таблицы - числом строк, числа numpy, пути"""
+    if hasattr(value, 'columns'):
+        return len(value)
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+def loaded_folder_conflicts(folders):
+    """
+    Запрошенные папки, которые отличаются от папок уже импортированного config.
+    Папки config вычисляются при импорте, поэтому второй запуск в том же процессе
+    с другой папкой записал бы результаты в папку первого
+    """
+    config = sys.modules.get('config')
+    if config is None:
+        return []
+    loaded = {'RECONCILE_INPUT_DIR': config.INPUT_DIR, 'RECONCILE_OUTPUT_DIR': config.OUTPUT_DIR}
+    return [f"{loaded[name]} вместо {folder}" for name, folder in folders.items()
+            if Path(loaded[name]).resolve() != folder]
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        settings = resolve_settings(args)
+    except SettingsError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    folders = {'RECONCILE_INPUT_DIR': settings['input_dir'], 'RECONCILE_OUTPUT_DIR': settings['output_dir']}
+    folders = {name: Path(folder).resolve() for name, folder in folders.items() if folder}
+    stale = loaded_folder_conflicts(folders)
+    if stale:
+        print(f"Ошибка: настройки уже загружены с другими папками ({'; '.join(stale)}). "
+              f"Запуски с другими папками выполняются в отдельном процессе", file=sys.stderr)
+        return EXIT_USAGE
+
+    # Папки задаются до первого импорта config (и наследуются процессами загрузки)
+    for name, folder in folders.items():
+        os.environ[name] = str(folder)
+
+    if settings['ad_source']:
+        settings['ad_source'] = str(Path(settings['ad_source']).resolve())
+
+    from config import INPUT_DIR, OUTPUT_DIR, setup_logging, ensure_directories
+    from main import process
+    
+    setup_logging()
+    ensure_directories()
+
+    started_at = datetime.now()
+    started = time.perf_counter()
+    logger.info("Запуск обработки данных без диалога")
+    try:
+        run = process(settings['selected_options'], settings['selected_employee_types'],
+                      settings['report_formats'], settings['ad_export'], settings['ad_source'])
+    except Exception as e:
+        logger.exception(f"Ошибка запуска: {e}")
+        run = {'ad': None, 'source_rows': {}, 'load_timings': {}, 'results': {}, 'error': str(e), 'metrics_file': None}
+
+    warnings = run_warnings(run, settings['selected_options']) if run['error'] is None else []
+    for warning in warnings:
+        logger.warning(warning)
+    if run['error'] is not None:
+        exit_code = EXIT_ERROR
+    else:
+        exit_code = EXIT_WARNINGS if warnings else EXIT_OK
+
+    summary = {
+        'exit_code': exit_code,
+        'status': {EXIT_OK: 'ok', EXIT_ERROR: 'error', EXIT_WARNINGS: 'warnings'}[exit_code],
+        'started_at': started_at.isoformat(timespec='seconds'),
+        'duration_s': round(time.perf_counter() - started, 3),
+        'sources': [name for name, number in SOURCE_OPTIONS.items() if number in settings['selected_options']],
+        'employee_types': [name for name, number in EMPLOYEE_TYPE_OPTIONS.items()
+                           if number in settings['selected_employee_types']],
+        'input_dir': str(INPUT_DIR),
+        'output_dir': str(OUTPUT_DIR),
+        'ad': None if run['ad'] is None else dict(zip(['total', 'employees', 'gph'], run['ad'])),
+        'source_rows': run['source_rows'],
+        'load_timings_s': {name: round(seconds, 3) for name, seconds in run['load_timings'].items()},
+        'results': run['results'],
+        'metrics_file': run['metrics_file'],
+        'warnings': warnings,
+        'error': run['error'],
+    }
+    document = json.dumps(summary, ensure_ascii=False, indent=2, default=json_value)
+    print(document)
+    if settings['summary']:
+        try:
+            Path(settings['summary']).parent.mkdir(parents=True, exist_ok=True)
+            Path(settings['summary']).write_text(document, encoding='utf-8')
+        except OSError as e:
+            logger.error(f"Не удалось записать итоги запуска {settings['summary']}: {e}")
+    logger.info(f"Обработка без диалога завершена с кодом {exit_code}")
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
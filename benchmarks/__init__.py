@@ -0,0 +1 @@
+# Скрипты замеров производительности
@@ -0,0 +1,141 @@
+# benchmarks/bench_ad_stream.py
+"""
+Сравнение потокового конвейера экспорта AD с прежним циклом чтения.
+
+Генерирует синтетический вывод PowerShell (JSON, пустые строки Write-Host
+и служебные строки) и прогоняет его через оба варианта, измеряя время
+и пиковый объем памяти Python (tracemalloc). Прежний цикл пишет TXT и XLSX,
+новый конвейер - снимок AD.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_ad_stream --records 500000
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+from ad_export import build_users_table, clean_value, iter_ad_records
+from ad_snapshot import EMPLOYEE, GPH, save_snapshot
+
+OUS = ['OU=cu_users', 'OU=external_organizations', 'OU=ГПХ,OU=cu_users', 'OU=service']
+
+def generate_stream(filename, records, noise=False, seed=42):
+    """
+    Синтетический вывод классической PowerShell команды.
+    noise: вставлять служебные строки между записями (прежний цикл на них теряет записи)
+    """
+    rnd = random.Random(seed)
+    with open(filename, 'w', encoding='utf-8') as f:
+        if noise:
+            f.write("Подключение к домену: DC=corp,DC=local\n")
+        f.write(f"Найдено пользователей: {records}\n")
+        for i in range(records):
+            user = {
+                'Name': f"Фамилия{i} Имя{i % 997} Отчество{i % 13}",
+                'SamAccountName': f"user{i}",
+                'Enabled': rnd.random() > 0.2,
+                'EmailAddress': f"user{i}@corp.local",
+                'Company': "Компания\x01" if i % 50 == 0 else "Компания",
+                'DistinguishedName': f"CN=user{i},{rnd.choice(OUS)},DC=corp,DC=local",
+            }
+            f.write(json.dumps(user, ensure_ascii=False) + "\n\n")
+            if noise and i % 10000 == 0:
+                f.write("WARNING: служебное сообщение PowerShell\n")
+
+def legacy_export(filename, out_dir):
+    """Прежний алгоритм: сбор всех пользователей в список, затем обработка и запись"""
+    users = []
+    current_json = ""
+    with open(filename, 'r', encoding='utf-8') as stream:
+        for line in stream:
+            if "Найдено пользователей:" in line:
+                continue
+            if line.strip() == "":
+                if current_json:
+                    try:
+                        users.append(json.loads(current_json))
+                    except json.JSONDecodeError:
+                        pass
+                    current_json = ""
+                continue
+            current_json += line
+
+    required_fields = ['Name', 'SamAccountName', 'Enabled', 'EmailAddress', 'Company', 'DistinguishedName']
+    processed_users, employees, gph_users = [], [], []
+    for user in users:
+        processed_user = {}
+        for field in required_fields:
+            value = user.get(field, "")
+            if field == 'Enabled':
+                processed_user[field] = "Активна" if value else "Заблокирована"
+            else:
+                processed_user[field] = clean_value(value)
+        processed_users.append(processed_user)
+        dn = processed_user['DistinguishedName'].lower()
+        if user.get('Enabled', False):
+            if 'cu_users' in dn and 'гпх' not in dn:
+                employees.append(processed_user)
+            elif 'external_organizations' in dn or 'гпх' in dn:
+                gph_users.append(processed_user)
+
+    with open(out_dir / 'ad_users_export.txt', 'w', encoding='utf-8') as f:
+        for user in processed_users:
+            f.write("=" * 80 + "\n")
+            for key, value in user.items():
+                f.write(f"{key}: {value}\n")
+            f.write("\n")
+    for name, group in (('сотрудники.txt', employees), ('ГПХ.txt', gph_users)):
+        with open(out_dir / name, 'w', encoding='utf-8') as f:
+            for user in group:
+                f.write(f"Name: {user['Name']}\nStatus: {user['Enabled']}\n\n")
+    pd.DataFrame(processed_users).to_excel(out_dir / 'ad_users_export.xlsx', index=False, engine='openpyxl')
+    return len(processed_users), len(employees), len(gph_users)
+
+def stream_export(filename, out_dir):
+    """Новый потоковый конвейер: пачки пользователей в снимок AD"""
+    with open(filename, 'r', encoding='utf-8') as stream:
+        users = build_users_table(iter_ad_records(stream))
+    save_snapshot(users, None, meta_filename=out_dir / 'ad_snapshot.json', users_filename=out_dir / 'ad_users')
+    return len(users), int((users['Category'] == EMPLOYEE).sum()), int((users['Category'] == GPH).sum())
+
+def measure(func, *args):
+    """Время выполнения и пиковая память Python"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=500000, help='количество пользователей в потоке')
+    parser.add_argument('--noise', action='store_true', help='служебные строки PowerShell между записями')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        stream_file = tmp / 'stream.txt'
+        generate_stream(stream_file, args.records, args.noise)
+        print(f"Синтетический поток: {args.records} записей, {stream_file.stat().st_size / 2**20:.1f} МБ")
+
+        results = {}
+        for name, func in (('прежний цикл', legacy_export), ('потоковый конвейер', stream_export)):
+            out_dir = tmp / name.replace(' ', '_')
+            out_dir.mkdir()
+            counts, elapsed, peak = measure(func, stream_file, out_dir)
+            results[name] = counts
+            print(f"{name:>20}: {elapsed:8.2f} с, пик памяти {peak / 2**20:8.1f} МБ, результат {counts}")
+
+        if not args.noise and len(set(results.values())) != 1:
+            raise SystemExit(f"Результаты различаются: {results}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_clean_value.py
+"""
+Замер скорости очистки значений AD.
+
+Сравнивает прежнюю посимвольную очистку (unicodedata.category на каждый символ)
+с табличной clean_value() и пакетной clean_values() на типичных значениях AD.
+Эквивалентность реализаций проверяется тестом tests/test_clean_value.py.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_clean_value --values 200000
+"""
+import argparse
+import random
+import time
+import unicodedata
+
+from ad_export import BATCH_SIZE, clean_value, clean_values
+
+def legacy_clean_value(value):
+    """Прежняя реализация clean_value()"""
+    if value is None:
+        return ""
+    cleaned = str(value)
+    cleaned = ''.join(ch for ch in cleaned if unicodedata.category(ch)[0] != "C")
+    cleaned = cleaned.replace('\x00', '').replace('\x01', '').replace('\x02', '')
+    return cleaned.strip()
+
+def random_unicode(rnd, max_length=20):
+    """Строка из произвольных кодовых точек, включая суррогаты и неназначенные"""
+    return ''.join(chr(rnd.randrange(0x110000)) for _ in range(rnd.randrange(max_length)))
+
+def random_mixed(rnd):
+    """Кириллица, пробелы (включая неразрывный) и управляющие символы вперемешку"""
+    alphabet = 'АБВГДЕЁЖЗабвгдеёжз -.\t\n\r\x00\x01\x02\x7f\xa0​ ﻿'
+    return ''.join(rnd.choice(alphabet) for _ in range(rnd.randrange(30)))
+
+def typical_value(rnd, i):
+    """Значения, похожие на реальные поля AD; управляющие символы встречаются редко"""
+    if rnd.random() < 0.001:
+        return "ООО «Компания»\x01"
+    return rnd.choice([
+        f"Фамилия{i} Имя Отчество",
+        f"user{i}",
+        f"user{i}@corp.local",
+        f"CN=user{i},OU=cu_users,DC=corp,DC=local",
+        " Иванов Иван ",
+        None,
+        12345,
+    ])
+
+def timed(func, values):
+    started = time.perf_counter()
+    func(values)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--values', type=int, default=200000, help='количество значений для замера')
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+
+    # Столбец очищается пачками того же размера, что и при экспорте
+    values = [typical_value(rnd, i) for i in range(args.values)]
+    batches = [values[i:i + BATCH_SIZE] for i in range(0, len(values), BATCH_SIZE)]
+
+    results = [
+        ('прежняя очистка', timed(lambda vs: [legacy_clean_value(v) for v in vs], values)),
+        ('clean_value', timed(lambda vs: [clean_value(v) for v in vs], values)),
+        ('clean_values (столбец)', timed(lambda bs: [clean_values(b) for b in bs], batches)),
+    ]
+    baseline = results[0][1]
+    for name, elapsed in results:
+        print(f"{name:>24}: {elapsed:7.3f} с ({baseline / elapsed:5.1f}x)")
+
+if __name__ == "__main__":
+    main()
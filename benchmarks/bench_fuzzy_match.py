@@ -0,0 +1,127 @@
+# benchmarks/bench_fuzzy_match.py
+"""
+Нечеткое сопоставление ФИО с блокирующим индексом на больших списках.
+
+Генерирует names ФИО "в AD" и столько же ФИО "в системе": часть из них -
+ФИО из AD с опечаткой (замена, пропуск, лишняя буква, "и" вместо "й"),
+часть - ФИО из AD латиницей (как логины 1С), остальные - новые ФИО.
+Выводит время построения индекса и поиска, долю найденных опечаток
+и транслитераций (с правильным ФИО из AD) и число совпадений среди новых ФИО.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_fuzzy_match --names 50000
+"""
+import argparse
+import random
+import time
+
+from fuzzy_match import build_fuzzy_index, find_probable_matches
+from utils import normalize_names
+
+SYLLABLES = ['ба', 'во', 'ге', 'да', 'жу', 'за', 'ки', 'ло', 'ма', 'не', 'по', 'ру', 'се', 'та', 'фи',
+             'хо', 'це', 'чу', 'ша', 'ще', 'ку', 'ли', 'мо', 'ну', 'ро', 'со', 'ту', 'бе', 'ви', 'гу']
+SUFFIXES = ['ов', 'ев', 'ин', 'ский', 'енко', 'ич', 'ук']
+FIRST_NAMES = ['Алексей', 'Андрей', 'Анна', 'Дмитрий', 'Елена', 'Игорь', 'Ирина', 'Марат', 'Мария',
+               'Николай', 'Ольга', 'Павел', 'Сергей', 'Татьяна', 'Юрий', 'Юлия', 'Яна', 'Владимир',
+               'Евгений', 'Наталья', 'Ксения', 'Михаил', 'Виктория', 'Григорий', 'Жанна', 'Эльвира']
+LETTERS = 'абвгдежзиклмнопрстуфхцчшщыэюя'
+
+# Упрощенная транслитерация, как в логинах: отличается от используемой при сравнении
+LOGIN_TRANSLIT = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ж': 'zh', 'з': 'z', 'и': 'i',
+    'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's',
+    'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'c', 'ч': 'ch', 'ш': 'sh', 'щ': 'sch', 'ы': 'y',
+    'ь': '', 'ъ': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+})
+
+def random_person(rnd):
+    """Фамилия и имя"""
+    surname = ''.join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 3))) + rnd.choice(SUFFIXES)
+    return f"{surname.capitalize()} {rnd.choice(FIRST_NAMES)}"
+
+def with_typo(rnd, name):
+    """ФИО с одной опечаткой"""
+    if 'й' in name and rnd.random() < 0.3:
+        return name.replace('й', 'и', 1)
+    position = rnd.randrange(1, len(name))
+    if name[position] == ' ':
+        position -= 1
+    kind = rnd.choice(['replace', 'delete', 'insert'])
+    if kind == 'replace':
+        return name[:position] + rnd.choice(LETTERS) + name[position + 1:]
+    if kind == 'delete':
+        return name[:position] + name[position + 1:]
+    return name[:position] + rnd.choice(LETTERS) + name[position:]
+
+def as_login(rnd, name):
+    """ФИО латиницей, иногда через точку"""
+    login = name.lower().translate(LOGIN_TRANSLIT)
+    return login.replace(' ', '.') if rnd.random() < 0.5 else login.title()
+
+def generate(names, seed=42):
+    """ФИО в AD, ФИО в системе и ожидаемые совпадения {индекс в системе: (вид, ФИО в AD)}"""
+    rnd = random.Random(seed)
+    ad_names = list(dict.fromkeys(random_person(rnd) for _ in range(names)))
+    ad_set = set(ad_names)
+
+    service_names = []
+    expected = {}
+    for i in range(names):
+        roll = rnd.random()
+        if roll < 0.25:
+            source = rnd.choice(ad_names)
+            expected[i] = ('опечатка', source)
+            service_names.append(with_typo(rnd, source))
+        elif roll < 0.4:
+            source = rnd.choice(ad_names)
+            expected[i] = ('латиница', source)
+            service_names.append(as_login(rnd, source))
+        else:
+            name = random_person(rnd)
+            while name in ad_set:
+                name = random_person(rnd)
+            expected[i] = ('новое', None)
+            service_names.append(name)
+    return ad_names, service_names, expected
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--names', type=int, default=50000)
+    args = parser.parse_args()
+
+    ad_names, service_names, expected = generate(args.names)
+    ad_keys = normalize_names(ad_names)
+    service_keys = normalize_names(service_names)
+    print(f"ФИО в AD: {len(ad_names)}, в системе: {len(service_names)}")
+
+    started = time.perf_counter()
+    index = build_fuzzy_index(ad_keys)
+    index_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matches = find_probable_matches(service_keys, index)
+    match_time = time.perf_counter() - started
+    print(f"Индекс: {index_time:.1f} с ({len(index[0])} блоков), поиск: {match_time:.1f} с, "
+          f"всего {index_time + match_time:.1f} с")
+
+    found = dict(zip(matches['ключ'], matches['ключ_совпадения']))
+    ad_key_of = dict(zip(ad_names, ad_keys))
+    totals = {}
+    hits = {}
+    for i, (kind, source) in expected.items():
+        if service_keys[i] in ad_key_of.values() and kind != 'новое':
+            continue  # опечатка не изменила ключ (например, в отчестве)
+        totals[kind] = totals.get(kind, 0) + 1
+        match = found.get(service_keys[i])
+        if kind == 'новое':
+            hits[kind] = hits.get(kind, 0) + (match is not None)
+        else:
+            hits[kind] = hits.get(kind, 0) + (match == ad_key_of[source])
+
+    for kind in ['опечатка', 'латиница']:
+        print(f"  {kind:9} найдено {hits.get(kind, 0)} из {totals.get(kind, 0)} "
+              f"({hits.get(kind, 0) / max(totals.get(kind, 0), 1):.1%})")
+    print(f"  новые ФИО с похожим ФИО в AD: {hits.get('новое', 0)} из {totals.get('новое', 0)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_highlighting.py
+"""
+Подсветка листа "сравнение пользователей": маски строк, применяемые при
+единственной записи книги (utils.write_workbook), против прежнего
+save_with_formatting - запись листа, повторная загрузка через load_workbook,
+заливка PatternFill по ячейкам и повторное сохранение.
+
+Генерирует источники по rows записей (как benchmarks.bench_reconciliation),
+строит лист и подсветку по результатам сверки и выводит время и размер файла
+для записи без подсветки, с подсветкой масками и прежним способом.
+Проверяет, что в обоих файлах залиты одни и те же ячейки одними цветами.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_highlighting --rows 100000
+"""
+import argparse
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from benchmarks.bench_reconciliation import generate_tables
+from excel_processor import SOURCE_COLUMNS, assemble_users_sheet, users_sheet_highlighting
+from reconciliation import reconcile
+from utils import HIGHLIGHT_COLORS, highlight_fill, write_workbook
+
+SHEET = 'сравнение пользователей'
+
+def legacy_highlight(sheet, highlighting, filename):
+    """Прежний способ: запись, загрузка книги, заливка по ячейкам, сохранение"""
+    sheet.to_excel(filename, sheet_name=SHEET, index=False)
+    workbook = load_workbook(filename)
+    worksheet = workbook[SHEET]
+    fills = {color: highlight_fill(rgb) for color, rgb in HIGHLIGHT_COLORS.items()}
+    for column, mask, color in highlighting:
+        position = sheet.columns.get_loc(column) + 1
+        for row in range(len(sheet)):
+            if mask[row]:
+                worksheet.cell(row=row + 2, column=position).fill = fills[color]
+    workbook.save(filename)
+
+def filled_cells(filename):
+    """Залитые ячейки: {(строка, столбец): цвет}"""
+    worksheet = load_workbook(filename, read_only=True)[SHEET]
+    return {(cell.row, cell.column): cell.fill.start_color.rgb
+            for row in worksheet.iter_rows(min_row=2) for cell in row
+            if cell.fill is not None and cell.fill.fill_type}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    tables = generate_tables(args.rows)
+    for source, columns in SOURCE_COLUMNS.items():
+        for column in columns:
+            if column not in tables[source]:
+                tables[source][column] = 'Нет'
+    sheet = assemble_users_sheet(tables)
+    highlighting = users_sheet_highlighting(sheet, reconcile(tables, {0}, fuzzy=False))
+    print(f"Лист: {len(sheet)} строк, отметок подсветки (с пересечениями): {sum(int(mask.sum()) for _, mask, _ in highlighting)}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = {name: Path(directory) / f"{name}.xlsx" for name in ['plain', 'masks', 'legacy']}
+        runs = [
+            ('без подсветки', 'plain', lambda: write_workbook({SHEET: sheet}, files['plain'])),
+            ('маски при записи', 'masks', lambda: write_workbook({SHEET: sheet}, files['masks'],
+                                                                 highlighting={SHEET: highlighting})),
+            ('загрузка и заливка', 'legacy', lambda: legacy_highlight(sheet, highlighting, files['legacy'])),
+        ]
+        for title, name, run in runs:
+            started = time.perf_counter()
+            run()
+            print(f"{title:19} {time.perf_counter() - started:6.1f} с, файл {files[name].stat().st_size / 2**20:.2f} МБ")
+
+        masks = filled_cells(files['masks'])
+        assert masks == filled_cells(files['legacy']), "залитые ячейки различаются"
+        print(f"Залитые ячейки совпадают: {dict(Counter(masks.values()))}")
+
+if __name__ == "__main__":
+    main()
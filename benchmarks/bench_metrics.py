@@ -0,0 +1,48 @@
+# benchmarks/bench_metrics.py
+"""
+Стоимость замеров этапов (metrics.stage): время одного пустого этапа
+и доля замеров во времени сверки.
+
+Замеряет spans пустых этапов, затем генерирует источники по rows записей
+(как benchmarks.bench_reconciliation), выполняет сверку и выводит число
+записанных этапов и оценку их суммарной стоимости относительно времени сверки.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_metrics --rows 100000
+"""
+import argparse
+import time
+
+import metrics
+from benchmarks.bench_reconciliation import generate_tables
+from reconciliation import reconcile
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--spans', type=int, default=100000)
+    args = parser.parse_args()
+
+    metrics.reset()
+    started = time.perf_counter()
+    for _ in range(args.spans):
+        with metrics.stage('empty', rows=0):
+            pass
+    span_cost = (time.perf_counter() - started) / args.spans
+    assert len(metrics.stages) == args.spans
+    print(f"Пустой этап: {span_cost * 1e6:.1f} мкс")
+
+    tables = generate_tables(args.rows)
+    metrics.reset()
+    started = time.perf_counter()
+    with metrics.stage('reconcile'):
+        reconcile(tables, {0})
+    elapsed = time.perf_counter() - started
+    recorded = len(metrics.stages)
+    print(f"Сверка: {elapsed:.2f} с, этапов {recorded}, "
+          f"замеры ~{recorded * span_cost * 1000:.2f} мс ({recorded * span_cost / elapsed:.4%} времени)")
+    for record in metrics.stages:
+        print(f"  {record['stage']:24} {record['wall_s']:7.3f} с, CPU {record['cpu_s']:7.3f} с, строк {record['rows']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# benchmarks/bench_name_keys.py
+"""
+Сравнение поиска дубликатов и пользователей для удаления с общим столбцом
+нормализованного ФИО и прежнего варианта, где каждая проверка заново
+нормализует ФИО построчно.
+
+Генерирует таблицу AD и таблицы трех ЭДО (1С, Сфера Курьер, Контур Диадок)
+и выполняет для каждого ЭДО те же проверки, что process_*_data: дубликаты
+с AD, внутренние дубликаты и пользователи для удаления.
+Считает вызовы нормализации и проверяет, что результаты совпадают.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_name_keys --rows 100000
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from benchmarks.legacy_search import (legacy_find_duplicates, legacy_find_internal_duplicates,
+                                      legacy_masked_find_users_to_remove)
+from utils import normalize_name, normalize_stats, add_name_key
+
+SERVICES = {
+    '1С': ('1C_ФИО', '1C_Активен', ['Да', 'Нет']),
+    'Сфера Курьер': ('Диадок_ФИО', 'Диадок_Активен', ['Да', 'Нет']),
+    'Контур Диадок': ('Контур_ФИО', 'Контур_статус', ['активна', 'заблокирована']),
+}
+
+legacy_calls = {'values': 0}
+
+def counted_normalize_name(full_name):
+    """normalize_name со счетчиком вызовов"""
+    legacy_calls['values'] += 1
+    return normalize_name(full_name)
+
+def random_name(rnd, i):
+    """ФИО в разном написании: регистр, ё, лишние пробелы, без отчества"""
+    name = f"Фамилия{i % 5000} Имя{i % 97} Отчество{i % 13}"
+    roll = rnd.random()
+    if roll < 0.1:
+        name = name.upper()
+    elif roll < 0.2:
+        name = f"  {name.replace('Фамилия', 'Фёдоров')}  "
+    elif roll < 0.3:
+        name = name.rsplit(' ', 1)[0]
+    elif roll < 0.32:
+        return None
+    return name
+
+def generate_tables(rows, seed=42):
+    """Таблица AD и таблицы ЭДО по rows записей"""
+    rnd = random.Random(seed)
+    ad_df = pd.DataFrame({'AD_ФИО': [random_name(rnd, rnd.randrange(rows)) for _ in range(rows)]}).dropna()
+    services = {}
+    for service, (fio_col, status_col, statuses) in SERVICES.items():
+        services[service] = pd.DataFrame({
+            fio_col: [random_name(rnd, rnd.randrange(rows * 2)) for _ in range(rows)],
+            status_col: [rnd.choice(statuses) for _ in range(rows)],
+        }).dropna(subset=[fio_col])
+    return ad_df, services
+
+def legacy_checks(ad_df, services):
+    """Прежние проверки: каждая нормализует ФИО заново через apply/iterrows"""
+    results = {}
+    for service, (fio_col, _, _) in SERVICES.items():
+        edo_df = services[service]
+
+        names1 = set(ad_df['AD_ФИО'].apply(counted_normalize_name).dropna())
+        names2 = set(edo_df[fio_col].apply(counted_normalize_name).dropna())
+        duplicates = names1.intersection(names2)
+
+        counts = edo_df[fio_col].apply(counted_normalize_name).value_counts()
+        internal = set(counts[counts > 1].index)
+
+        # Штатные сотрудники и ГПХ берутся из одной таблицы AD, как в process_*_data
+        all_valid_names = set()
+        for staff_df in (ad_df, ad_df):
+            all_valid_names.update(staff_df['AD_ФИО'].apply(counted_normalize_name).dropna())
+        users_to_remove = []
+        for _, row in edo_df.iterrows():
+            if pd.isna(row[fio_col]):
+                continue
+            if counted_normalize_name(row[fio_col]) not in all_valid_names:
+                if 'Контур_статус' in edo_df.columns and row['Контур_статус'] == 'активна':
+                    users_to_remove.append(row)
+                elif 'Диадок_Активен' in edo_df.columns and row['Диадок_Активен'] == 'Да':
+                    users_to_remove.append(row)
+                elif '1C_Активен' in edo_df.columns and row['1C_Активен'] == 'Да':
+                    users_to_remove.append(row)
+
+        results[service] = (duplicates, internal, pd.DataFrame(users_to_remove))
+    return results
+
+def keyed_checks(ad_df, services):
+    """Новые проверки: столбец ключей считается один раз для каждой таблицы"""
+    add_name_key(ad_df, 'AD_ФИО')
+    results = {}
+    for service, (fio_col, _, _) in SERVICES.items():
+        edo_df = add_name_key(services[service], fio_col)
+        results[service] = (
+            legacy_find_duplicates(ad_df, edo_df, 'AD_ФИО', fio_col),
+            legacy_find_internal_duplicates(edo_df, fio_col),
+            legacy_masked_find_users_to_remove(edo_df, ad_df, ad_df),
+        )
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    ad_df, services = generate_tables(args.rows)
+    print(f"AD: {len(ad_df)} записей, ЭДО: {', '.join(f'{s} {len(df)}' for s, df in services.items())}")
+
+    started = time.perf_counter()
+    legacy = legacy_checks(ad_df.copy(), {s: df.copy() for s, df in services.items()})
+    legacy_time = time.perf_counter() - started
+    print(f"Прежние проверки:  {legacy_time:7.2f} с, нормализовано значений: {legacy_calls['values']}")
+
+    started = time.perf_counter()
+    keyed = keyed_checks(ad_df.copy(), {s: df.copy() for s, df in services.items()})
+    keyed_time = time.perf_counter() - started
+    print(f"Со столбцом ключей: {keyed_time:7.2f} с, нормализовано значений: {normalize_stats['values']} "
+          f"({normalize_stats['calls']} вызовов)")
+    print(f"Ускорение: {legacy_time / keyed_time:.1f}x")
+
+    for service in SERVICES:
+        old_duplicates, old_internal, old_remove = legacy[service]
+        new_duplicates, new_internal, new_remove = keyed[service]
+        assert old_duplicates == new_duplicates, f"{service}: дубликаты с AD различаются"
+        assert old_internal == new_internal, f"{service}: внутренние дубликаты различаются"
+        assert old_remove.equals(new_remove), f"{service}: пользователи для удаления различаются"
+    print("Результаты совпадают")
+
+if __name__ == "__main__":
+    main()
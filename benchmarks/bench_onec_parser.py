@@ -0,0 +1,137 @@
+# benchmarks/bench_onec_parser.py
+"""
+Сравнение однопроходного разбора отчета 1С с прежним алгоритмом.
+
+Генерирует отчет 1С в формате выгрузки "Пользователи" (шапка с параметрами,
+строка заголовка "Пользователь", столбец E "Недействителен", служебные
+записи и пустые строки) и разбирает его обоими способами. Прежний алгоритм
+читает лист дважды через pd.read_excel и обходит строки iterrows(),
+новый - один проход openpyxl в режиме только для чтения.
+Проверяет, что результаты совпадают.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_onec_parser --rows 200000
+"""
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import Workbook
+
+from processors.onec_processor import read_onec_file
+
+HEADER = ['Пользователь', None, None, None, 'Недействителен', 'Подразделение', 'Физическое лицо',
+          'Комментарий', 'Служебный', 'Подготовлен', 'Идентификатор пользователя ИБ',
+          'Табельный номер', 'Физ. лицо', 'Идентификатор пользователя сервиса']
+
+def generate_report(filename, rows, seed=42):
+    """Синтетический отчет 1С: rows строк пользователей после шапки"""
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Лист_1')
+    ws.append([None] * len(HEADER))
+    ws.append(['Параметры:', None, 'Тип объекта: Справочник'])
+    ws.append([None, None, 'Имя объекта: Пользователи'])
+    ws.append([None, None, 'Имя таблицы: Основные данные'])
+    ws.append([None])
+    ws.append(HEADER)
+
+    for i in range(rows):
+        roll = rnd.random()
+        if roll < 0.01:
+            ws.append([None] * len(HEADER))
+            continue
+        if roll < 0.02:
+            name = rnd.choice(['Сервис Библиотека', 'robot', 'Робот обмена']) + f" {i}"
+        else:
+            name = f"Фамилия{i} Имя{i % 997} Отчество{i % 13}"
+        status = None if roll > 0.99 else rnd.choice(['Нет', 'Нет', 'Нет', 'Да'])
+        ws.append([f"  {name} " if i % 100 == 0 else name, None, None, None, status,
+                   f"Подразделение {i % 50}", name, None, 'Нет', 'Нет',
+                   f"{i:08d}-0000-0000-0000-000000000000", i, None, None])
+    wb.save(filename)
+
+def legacy_read_onec_file(onec_file):
+    """Прежний алгоритм: два чтения листа через pandas и обход строк iterrows()"""
+    df_raw = pd.read_excel(onec_file, sheet_name='Лист_1', header=None)
+
+    start_row = None
+    for i in range(len(df_raw)):
+        if (pd.notna(df_raw.iloc[i, 0]) and
+            str(df_raw.iloc[i, 0]).strip() == 'Пользователь'):
+            start_row = i
+            break
+
+    if start_row is None:
+        return pd.DataFrame(columns=['1C_ФИО', '1C_Активен'])
+
+    df_data = pd.read_excel(onec_file, sheet_name='Лист_1', skiprows=start_row + 1, header=None)
+
+    data = []
+    for index, row in df_data.iterrows():
+        if pd.isna(row.iloc[0]) or str(row.iloc[0]).strip() == '':
+            continue
+        user_name = str(row.iloc[0]).strip()
+        if len(row) > 4 and pd.notna(row.iloc[4]):
+            status = str(row.iloc[4]).strip()
+            active_status = 'Да' if status == 'Нет' else 'Нет'
+        else:
+            active_status = 'Да'
+        if any(service in user_name.lower() for service in ['сервис', 'robot', 'робот']):
+            continue
+        data.append({'1C_ФИО': user_name, '1C_Активен': active_status})
+
+    return pd.DataFrame(data)
+
+def measure(func, *args, memory=False):
+    """
+    Время вызова func. При memory - еще и пиковый объем памяти Python
+    (tracemalloc заметно замедляет разбор, поэтому время меряется отдельным вызовом)
+    """
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+def report_line(title, elapsed, peak, records):
+    """Строка результата замера"""
+    memory = f", пик памяти {peak / 1024 / 1024:7.1f} МБ" if peak is not None else ""
+    return f"{title:18} {elapsed:7.2f} с{memory}, записей: {records}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--memory', action='store_true', help="замерить пиковый объем памяти (дольше)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = Path(tmp) / 'Users.1C.xlsx'
+        started = time.perf_counter()
+        generate_report(report, args.rows)
+        print(f"Отчет 1С: {args.rows} строк, {report.stat().st_size / 1024 / 1024:.1f} МБ "
+              f"(сгенерирован за {time.perf_counter() - started:.1f} с)")
+
+        legacy, legacy_time, legacy_peak = measure(legacy_read_onec_file, report, memory=args.memory)
+        print(report_line("Прежний разбор:", legacy_time, legacy_peak, len(legacy)))
+
+        streaming, streaming_time, streaming_peak = measure(read_onec_file, report, memory=args.memory)
+        print(report_line("Однопроходный:", streaming_time, streaming_peak, len(streaming)))
+        print(f"Ускорение: {legacy_time / streaming_time:.1f}x")
+
+        assert legacy.reset_index(drop=True).equals(streaming.reset_index(drop=True)), \
+            "результаты прежнего и однопроходного разбора различаются"
+        print("Результаты совпадают")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/bench_patronymic_keys.py
+"""
+Сверка по составному ключу ФИО (с отчеством) и по краткому ключу (фамилия и имя)
+на данных с однофамильцами.
+
+Генерирует AD, где у многих сотрудников есть тезки с другим отчеством,
+и систему 1С: часть сотрудников AD записана с полным отчеством, с инициалом
+или без отчества, остальные записи - уволенные (их нет в AD), многие из них -
+тезки сотрудников AD. По известным для каждой записи людям считает найденных
+уволенных, ложные удаления и ложные внутренние дубликаты для обеих схем
+и выводит время сверки.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_patronymic_keys --people 50000
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from excel_processor import prepare_table
+from reconciliation import reconcile
+from utils import name_key_column
+
+SYLLABLES = ['ба', 'во', 'ге', 'да', 'жу', 'за', 'ки', 'ло', 'ма', 'не', 'по', 'ру', 'се', 'та', 'фи']
+FIRST_NAMES = ['Алексей', 'Андрей', 'Дмитрий', 'Игорь', 'Марат', 'Николай', 'Павел', 'Сергей', 'Юрий', 'Владимир']
+PATRONYMICS = ['Иванович', 'Игоревич', 'Петрович', 'Павлович', 'Сергеевич', 'Андреевич', 'Алексеевич',
+               'Николаевич', 'Дмитриевич', 'Юрьевич', 'Олегович', 'Борисович']
+
+def random_person(rnd, surnames):
+    """Фамилия, имя и отчество; фамилий мало, поэтому тезки встречаются часто"""
+    return f"{rnd.choice(surnames)} {rnd.choice(FIRST_NAMES)} {rnd.choice(PATRONYMICS)}"
+
+def written(rnd, person):
+    """ФИО в системе: полное, с инициалом отчества или без отчества"""
+    surname, first_name, patronymic = person.split()
+    roll = rnd.random()
+    if roll < 0.25:
+        return f"{surname} {first_name} {patronymic[0]}."
+    if roll < 0.35:
+        return f"{surname} {first_name}"
+    return person
+
+def generate(people, seed=42):
+    """Таблицы AD и 1С и для каждой записи 1С - уволен ли этот человек"""
+    rnd = random.Random(seed)
+    surnames = list({''.join(rnd.choice(SYLLABLES) for _ in range(4)).capitalize() + 'ов'
+                     for _ in range(max(people // 2, 1))})
+
+    ad_people = list(dict.fromkeys(random_person(rnd, surnames) for _ in range(people)))
+    ad_set = set(ad_people)
+    leavers = []
+    while len(leavers) < people // 5:
+        person = random_person(rnd, surnames)
+        if person not in ad_set:
+            leavers.append(person)
+            ad_set.add(person)
+
+    service_people = rnd.sample(ad_people, len(ad_people) * 7 // 10) + leavers
+    rnd.shuffle(service_people)
+    left = set(leavers)
+
+    tables = {
+        'ad_employees': pd.DataFrame({'AD_сотрудники': pd.Series(ad_people, dtype=object), 'AD_Статус_сотрудники': 'Активен'}),
+        'ad_gph': pd.DataFrame({'AD_ГПХ': pd.Series([], dtype=object), 'AD_Статус_ГПХ': pd.Series([], dtype=object)}),
+        'onec': pd.DataFrame({'1C_ФИО': pd.Series([written(rnd, person) for person in service_people], dtype=object),
+                              '1C_Активен': 'Да'}),
+    }
+    for table in tables.values():
+        prepare_table(table)
+    return tables, pd.Series([person in left for person in service_people])
+
+def short_key_reconcile(tables):
+    """Прежняя сверка по краткому ключу: удаление и внутренние дубликаты в 1С"""
+    ad_keys = set(tables['ad_employees'][name_key_column('AD_сотрудники')])
+    keys = tables['onec'][name_key_column('1C_ФИО')]
+    return ~keys.isin(ad_keys), keys.duplicated(keep=False)
+
+def report(title, removed, duplicated, left):
+    """Найденные уволенные, ложные удаления и ложные дубликаты"""
+    print(f"{title}: уволенных найдено {int((removed & left).sum())} из {int(left.sum())}, "
+          f"ложных удалений {int((removed & ~left).sum())}, "
+          f"записей в ложных дубликатах {int(duplicated.sum())}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--people', type=int, default=50000)
+    args = parser.parse_args()
+
+    tables, left = generate(args.people)
+    print(f"AD: {len(tables['ad_employees'])} сотрудников, 1С: {len(tables['onec'])} записей, уволенных {int(left.sum())}")
+
+    started = time.perf_counter()
+    removed, duplicated = short_key_reconcile(tables)
+    short_time = time.perf_counter() - started
+    report(f"Краткий ключ ({short_time:.2f} с)", removed, duplicated, left)
+
+    started = time.perf_counter()
+    results = reconcile(tables, {0}, fuzzy=False)
+    composite_time = time.perf_counter() - started
+    onec = tables['onec']
+    report(f"Составной ключ ({composite_time:.2f} с)", onec.index.isin(results['users_to_remove_1c'].index),
+           onec.index.isin(results['duplicates_1c'].index), left)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# benchmarks/bench_pipeline.py
+"""
+Замер всего конвейера на синтетических наборах (benchmarks.synthetic_data)
+разного объема и сравнение с сохраненным базовым замером.
+
+Для каждого размера набора (число учетных записей AD) генерирует исходные файлы,
+затем runs раз запускает batch.py в отдельном процессе: экспорт AD из записанного
+вывода PowerShell, загрузка источников, сверка, отчет об изменениях и запись отчета.
+Первый запуск - без кэша исходных файлов (холодный), следующие - с кэшем
+(теплый, берется самый быстрый). Время этапов и пик памяти берутся из метрик
+запуска, итоги сверки проверяются по ожидаемым из манифеста набора.
+
+С --save-baseline замеры сохраняются как базовые (размеры, замеренные раньше,
+остаются в файле). Без него замеры сравниваются с базовыми: запуск или этап,
+ставший медленнее больше чем на tolerance и больше чем на min-delta секунд,
+считается регрессией - код завершения 1. Базовый замер зависит от машины:
+сохранять и сравнивать его нужно на одной машине, поэтому в репозиторий он не входит.
+Размеры и запуски без базового замера не сравниваются - они перечисляются в конце
+вывода; с --require-baseline отсутствие базы для замеряемого размера - ошибка
+(код завершения 2, до начала замеров), например для проверки в CI.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_pipeline --sizes 1000 10000 100000 --save-baseline
+    python -m benchmarks.bench_pipeline --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.synthetic_data import AD_SOURCE_FILE, DEFAULTS, MANIFEST_FILE, generate_dataset
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+BASELINE_FILE = PROJECT_DIR / 'benchmarks' / 'baseline.json'
+MODES = {'cold': 'холодный', 'warm': 'теплый'}
+
+def prepare_dataset(directory, users, seed):
+    """Набор исходных файлов; готовый набор с теми же параметрами используется повторно"""
+    manifest_file = directory / MANIFEST_FILE
+    if manifest_file.exists():
+        manifest = json.loads(manifest_file.read_text(encoding='utf-8'))
+        if manifest['users'] == users and manifest['parameters'] == {**DEFAULTS, 'seed': seed}:
+            print(f"{users}: используется готовый набор {directory}")
+            return manifest
+    started = time.perf_counter()
+    manifest = generate_dataset(directory, users, seed=seed)
+    print(f"{users}: набор сгенерирован за {time.perf_counter() - started:.1f} с, строк {manifest['rows']}")
+    return manifest
+
+def run_pipeline(data_dir, output_dir, formats):
+    """
+    Один запуск batch.py: (замер, итоги сверки). Замер - время всего процесса,
+    пик памяти и время каждого этапа из файла метрик запуска (одноименные этапы суммируются)
+    """
+    command = [sys.executable, 'batch.py', '--input-dir', str(data_dir), '--output-dir', str(output_dir),
+               '--ad-source', str(data_dir / AD_SOURCE_FILE), '--formats', *formats]
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=PROJECT_DIR, capture_output=True, text=True, encoding='utf-8')
+    total = time.perf_counter() - started
+    if result.returncode:
+        raise RuntimeError(f"batch.py завершился с кодом {result.returncode}: "
+                           + "\n".join(result.stderr.strip().splitlines()[-5:]))
+
+    summary = json.loads(result.stdout)
+    document = json.loads(Path(summary['metrics_file']).read_text(encoding='utf-8'))
+    stages = {}
+    for record in document['stages']:
+        stages[record['stage']] = round(stages.get(record['stage'], 0) + record['wall_s'], 4)
+    return {'total': round(total, 3), 'peak_memory_mb': document['peak_memory_mb'], 'stages': stages}, summary['results']
+
+def measure(data_dir, output_dir, runs, formats, expected):
+    """Холодный и теплый запуски набора с проверкой итогов сверки"""
+    shutil.rmtree(data_dir / 'кэш', ignore_errors=True)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    measurements = []
+    for _ in range(runs):
+        run, results = run_pipeline(data_dir, output_dir, formats)
+        mismatches = {key: (value, results.get(key)) for key, value in expected.items() if results.get(key) != value}
+        assert not mismatches, f"итоги сверки отличаются от ожидаемых (ожидалось, получено): {mismatches}"
+        measurements.append(run)
+    modes = {'cold': measurements[0]}
+    if runs > 1:
+        modes['warm'] = min(measurements[1:], key=lambda run: run['total'])
+    return modes
+
+def regressions(current, baseline, tolerance, min_delta):
+    """Названия замеров (total и этапы), ставших медленнее базовых больше допустимого"""
+    pairs = [('total', current['total'], baseline['total'])]
+    pairs += [(name, seconds, baseline['stages'][name]) for name, seconds in current['stages'].items()
+              if name in baseline['stages']]
+    return [name for name, seconds, base in pairs
+            if seconds > base * (1 + tolerance) and seconds - base > min_delta]
+
+def report(users, mode, current, baseline, slow):
+    """Замер запуска и этапов (от 10 мс) рядом с базовым"""
+    def line(name, seconds, base):
+        change = f"{seconds / base - 1:+7.0%}" if base else ""
+        mark = "  РЕГРЕССИЯ" if name in slow else ""
+        base_text = f"{base:8.2f}" if base is not None else "       -"
+        return f"  {name:40} {seconds:8.2f} {base_text} {change}{mark}"
+
+    base_stages = baseline['stages'] if baseline else {}
+    print(f"{users} пользователей, {MODES[mode]} запуск, пик памяти {current['peak_memory_mb']} МБ"
+          + (f" (база {baseline['peak_memory_mb']} МБ)" if baseline else ""))
+    print(f"  {'этап':40} {'сейчас':>8} {'база':>8}")
+    print(line('total', current['total'], baseline['total'] if baseline else None))
+    for name, seconds in current['stages'].items():
+        if seconds >= 0.01 or name in slow:
+            print(line(name, seconds, base_stages.get(name)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--runs', type=int, default=2, help="запусков на размер: первый холодный, остальные теплые")
+    parser.add_argument('--seed', type=int, default=DEFAULTS['seed'])
+    parser.add_argument('--formats', nargs='+', default=['xlsx'])
+    parser.add_argument('--data-dir', help="папка для наборов (сохраняются между замерами), по умолчанию временная")
+    parser.add_argument('--baseline', default=str(BASELINE_FILE))
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--require-baseline', action='store_true',
+                        help="завершиться с кодом 2, если для замеряемого размера нет базового замера")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--min-delta', type=float, default=0.1)
+    args = parser.parse_args()
+
+    baseline_file = Path(args.baseline)
+    baseline = json.loads(baseline_file.read_text(encoding='utf-8')) if baseline_file.exists() else {'sizes': {}}
+    missing = [] if args.save_baseline else [users for users in args.sizes if str(users) not in baseline['sizes']]
+    if missing:
+        sizes = ' '.join(str(users) for users in missing)
+        problem = (f"Базовый замер {baseline_file} не найден" if not baseline_file.exists()
+                   else f"В базовом замере {baseline_file} нет размеров {sizes}")
+        hint = f"записать: python -m benchmarks.bench_pipeline --sizes {sizes} --save-baseline"
+        if args.require_baseline:
+            print(f"{problem} ({hint})", file=sys.stderr)
+            sys.exit(2)
+        print(f"{problem}, сравнение размеров {sizes} пропускается ({hint})")
+
+    measured = {}
+    slow = []
+    not_compared = []
+    with tempfile.TemporaryDirectory() as directory:
+        data_root = Path(args.data_dir) if args.data_dir else Path(directory)
+        for users in args.sizes:
+            data_dir = (data_root / f"пользователей_{users}").resolve()
+            manifest = prepare_dataset(data_dir, users, args.seed)
+            measured[str(users)] = measure(data_dir, Path(directory) / f"вывод_{users}", args.runs, args.formats,
+                                           manifest['expected'])
+            for mode, current in measured[str(users)].items():
+                base = None if args.save_baseline else baseline['sizes'].get(str(users), {}).get(mode)
+                mode_slow = regressions(current, base, args.tolerance, args.min_delta) if base else []
+                if not args.save_baseline and not base:
+                    not_compared.append(f"{users} {MODES[mode]}")
+                report(users, mode, current, base, mode_slow)
+                slow += [f"{users} {MODES[mode]}: {name}" for name in mode_slow]
+    print("Итоги сверки совпадают с ожидаемыми по манифестам наборов")
+
+    if args.save_baseline:
+        baseline['sizes'].update(measured)
+        baseline.update(written_at=datetime.now().isoformat(timespec='seconds'), python=platform.python_version(),
+                        platform=platform.platform(), cpu_count=os.cpu_count())
+        baseline_file.write_text(json.dumps(baseline, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"Базовый замер сохранен: {baseline_file}")
+        return
+    if not_compared:
+        print(f"Без базового замера, не сравнивались: {', '.join(not_compared)}")
+    if slow:
+        print(f"Регрессии (медленнее базы больше чем на {args.tolerance:.0%} и {args.min_delta} с):")
+        for name in slow:
+            print(f"  {name}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
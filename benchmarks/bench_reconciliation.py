@@ -0,0 +1,121 @@
+# benchmarks/bench_reconciliation.py
+"""
+Сравнение сверки по одной матрице присутствия (reconciliation.reconcile)
+с прежней схемой, где каждый процессор отдельно пересекал свой источник
+с AD, а process_excel_data повторял проход по каждой системе для листов
+"дубли" и "удалить из".
+
+Генерирует AD (сотрудники и ГПХ), штатное расписание и три системы,
+выполняет обе схемы и проверяет, что счетчики и листы совпадают.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_reconciliation --rows 100000
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from excel_processor import prepare_table
+from reconciliation import SERVICES, SOURCE_FIO_COLUMNS, reconcile
+from benchmarks.legacy_search import legacy_find_duplicates, legacy_find_internal_duplicates
+from utils import name_key_column
+
+def random_name(rnd, n):
+    """ФИО из n возможных, с повторами и разным написанием"""
+    i = rnd.randrange(n)
+    name = f"Фамилия{i} Имя{i % 97} Отчество{i % 13}"
+    roll = rnd.random()
+    if roll < 0.01:
+        return None
+    if roll < 0.1:
+        return name.upper()
+    if roll < 0.2:
+        return name.rsplit(' ', 1)[0]
+    return name
+
+def generate_tables(rows, seed=42):
+    """Подготовленные таблицы источников (как в process_excel_data после prepare_table)"""
+    rnd = random.Random(seed)
+    names = lambda count: [random_name(rnd, rows * 2) for _ in range(count)]
+    tables = {
+        'ad_employees': pd.DataFrame({'AD_сотрудники': names(rows), 'AD_Статус_сотрудники': 'Активен'}),
+        'ad_gph': pd.DataFrame({'AD_ГПХ': names(rows // 10), 'AD_Статус_ГПХ': 'Активен'}),
+        'shtat': pd.DataFrame({'Штатное_ФИО': names(rows)}),
+    }
+    for service in SERVICES:
+        active = service['active_value']
+        tables[service['source']] = pd.DataFrame({
+            SOURCE_FIO_COLUMNS[service['source']]: names(rows),
+            service['status_col']: [rnd.choice([active, f" {active} ", 'Нет', None]) for _ in range(rows)],
+        })
+    for table in tables.values():
+        prepare_table(table)
+    return tables
+
+def legacy_reconcile(tables):
+    """Прежняя схема: отдельные проходы по каждой системе в процессорах и в process_excel_data"""
+    ad_employees_df = pd.DataFrame({'AD_ФИО': pd.concat([tables['ad_employees']['AD_сотрудники'],
+                                                         tables['ad_gph']['AD_ГПХ']], ignore_index=True)})
+    ad_employees_df[name_key_column('AD_ФИО')] = pd.concat([
+        tables['ad_employees'][name_key_column('AD_сотрудники')],
+        tables['ad_gph'][name_key_column('AD_ГПХ')]], ignore_index=True)
+
+    all_ad_names = set()
+    for name, col in [('ad_employees', 'AD_сотрудники'), ('ad_gph', 'AD_ГПХ')]:
+        table = tables[name]
+        all_ad_names.update(table.loc[table[col].notna(), name_key_column(col)])
+
+    results = {}
+    for service in SERVICES:
+        suffix = service['result_suffix']
+        fio_col = SOURCE_FIO_COLUMNS[service['source']]
+        status_col = service['status_col']
+        key_col = name_key_column(fio_col)
+        df = tables[service['source']]
+
+        # Процессор
+        service_df = df[[fio_col, status_col, key_col]].dropna(subset=[fio_col])
+        results[f'duplicates_ad_{suffix}'] = len(legacy_find_duplicates(ad_employees_df, service_df, 'AD_ФИО', fio_col))
+        results[f'internal_duplicates_{suffix}'] = len(legacy_find_internal_duplicates(service_df, fio_col))
+
+        # process_excel_data
+        service_fio_data = df[[fio_col, key_col]].dropna(subset=[fio_col])
+        duplicates = legacy_find_internal_duplicates(service_fio_data, fio_col)
+        results[f'duplicates_{suffix}'] = service_fio_data.loc[service_fio_data[key_col].isin(duplicates), [fio_col]]
+
+        service_data = df[[fio_col, status_col, key_col]].dropna(subset=[fio_col])
+        service_data.loc[:, status_col] = service_data[status_col].astype(str).str.strip()
+        mask = (service_data[status_col].str.lower() == service['active_value'].lower()) & \
+            (~service_data[key_col].isin(all_ad_names))
+        results[f'users_to_remove_{suffix}'] = service_data.loc[mask, [fio_col, status_col]]
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    tables = generate_tables(args.rows)
+    print(f"Источники по {args.rows} записей: {', '.join(tables)}")
+
+    started = time.perf_counter()
+    legacy = legacy_reconcile(tables)
+    legacy_time = time.perf_counter() - started
+    print(f"Отдельные проходы по системам: {legacy_time:6.2f} с")
+
+    started = time.perf_counter()
+    results = reconcile(tables, {0}, fuzzy=False)
+    matrix_time = time.perf_counter() - started
+    print(f"Матрица присутствия:           {matrix_time:6.2f} с ({len(results['matrix'])} уникальных ФИО)")
+
+    for key, value in legacy.items():
+        if isinstance(value, pd.DataFrame):
+            assert value.astype(object).equals(results[key].astype(object)), f"{key}: листы различаются"
+        else:
+            assert value == results[key], f"{key}: {value} != {results[key]}"
+    print("Результаты совпадают")
+
+if __name__ == "__main__":
+    main()
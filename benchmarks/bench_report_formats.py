@@ -0,0 +1,80 @@
+# benchmarks/bench_report_formats.py
+"""
+Чтение списка "удалить из 1С" скриптом автоматизации: из книги Excel
+результатов против машиночитаемых файлов (utils.write_result_files).
+
+Генерирует источники по rows записей (как benchmarks.bench_reconciliation),
+записывает отчет в каждом формате (Parquet - если установлен pyarrow)
+и выводит время записи, размер и время чтения списка для удаления,
+затем проверяет, что прочитанные списки совпадают.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_report_formats --rows 100000
+"""
+import argparse
+import importlib.util
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.bench_reconciliation import generate_tables
+from excel_processor import SOURCE_COLUMNS, assemble_users_sheet, result_sets, result_sheets
+from reconciliation import reconcile
+from utils import write_result_files, write_workbook
+
+READERS = {
+    'csv': lambda path: pd.read_csv(path, dtype=str, keep_default_na=False),
+    'jsonl': lambda path: pd.read_json(path, lines=True, dtype=False),
+    'parquet': pd.read_parquet,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    tables = generate_tables(args.rows)
+    for source, columns in SOURCE_COLUMNS.items():
+        for column in columns:
+            if column not in tables[source]:
+                tables[source][column] = 'Нет'
+    results = reconcile(tables, {0}, fuzzy=False)
+    sets = result_sets(results, tables['ad_employees']['AD_сотрудники'], tables['shtat']['Штатное_ФИО'])
+    sheet_name, expected = sets['users_to_remove_1c']
+    print(f"Наборов результатов: {len(sets)}, в списке для удаления из 1С: {len(expected)} записей")
+
+    formats = ['csv', 'jsonl'] + (['parquet'] if importlib.util.find_spec('pyarrow') else [])
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        workbook = directory / 'отчет.xlsx'
+        started = time.perf_counter()
+        write_workbook({'сравнение пользователей': assemble_users_sheet(tables), **result_sheets(sets)}, workbook)
+        write_time = time.perf_counter() - started
+        started = time.perf_counter()
+        loaded = {'xlsx': pd.read_excel(workbook, sheet_name=sheet_name, dtype=str)}
+        read_times = {'xlsx': time.perf_counter() - started}
+        print(f"{'xlsx':8} запись {write_time:6.2f} с, файл {workbook.stat().st_size / 2**20:6.2f} МБ, "
+              f"чтение списка {read_times['xlsx']:6.3f} с")
+
+        for file_format in formats:
+            started = time.perf_counter()
+            write_result_files({name: df for name, (_, df) in sets.items()}, directory, [file_format])
+            write_time = time.perf_counter() - started
+            path = directory / f"users_to_remove_1c.{file_format}"
+            started = time.perf_counter()
+            loaded[file_format] = READERS[file_format](path)
+            read_times[file_format] = time.perf_counter() - started
+            size = sum(file.stat().st_size for file in directory.glob(f"*.{file_format}"))
+            print(f"{file_format:8} запись {write_time:6.2f} с, файлы {size / 2**20:6.2f} МБ, "
+                  f"чтение списка {read_times[file_format]:6.3f} с "
+                  f"({read_times['xlsx'] / max(read_times[file_format], 1e-9):.0f}x быстрее xlsx)")
+
+    expected = expected.reset_index(drop=True).astype(object)
+    for file_format, df in loaded.items():
+        assert df.astype(object).equals(expected), f"{file_format}: список различается"
+    print("Списки совпадают")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_run_diff.py
+"""
+Отчет об изменениях с прошлого запуска (run_state): сохранение и загрузка
+состояния, хеш-соединение состояний по (набор, ключ).
+
+Генерирует состояние прошлого запуска на identities записей по наборам
+результатов и текущее состояние, в котором доля churn записей устранена
+и столько же добавлено. Выводит время сохранения, загрузки, сравнения
+и размер файла состояния, затем проверяет изменения разностью множеств.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_run_diff --identities 100000 --churn 0.05
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from run_state import NEW, RESOLVED, STATE_COLUMNS, load_state, save_state, state_changes
+from table_store import table_file
+
+SETS = ['missing_in_shtat', 'missing_in_ad', 'users_to_remove_1c', 'duplicates_1c',
+        'users_to_remove_kontur', 'duplicates_kontur', 'users_to_remove_diadoc', 'duplicates_diadoc']
+
+def state(records):
+    """Состояние из записей (набор, ключ, ФИО), как reconciliation.tracked_results"""
+    df = pd.DataFrame(records, columns=STATE_COLUMNS).astype(object)
+    df['набор'] = pd.Categorical(df['набор'], categories=SETS)
+    return df
+
+def generate(identities, churn, seed=42):
+    """Записи прошлого и текущего запусков"""
+    rnd = random.Random(seed)
+    records = [(rnd.choice(SETS), f"ФАМИЛИЯ{i} ИМЯ{i % 97} ОТЧЕСТВО{i % 13}", f"Фамилия{i} Имя{i % 97} Отчество{i % 13}")
+               for i in range(identities)]
+    changed = int(identities * churn)
+    resolved = set(rnd.sample(range(identities), changed))
+    added = [(rnd.choice(SETS), f"ФАМИЛИЯ{i} ИМЯ{i % 97}", f"Фамилия{i} Имя{i % 97}")
+             for i in range(identities, identities + changed)]
+    current = [record for i, record in enumerate(records) if i not in resolved] + added
+    rnd.shuffle(current)
+    return records, current
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--identities', type=int, default=100000)
+    parser.add_argument('--churn', type=float, default=0.05)
+    args = parser.parse_args()
+
+    previous_records, current_records = generate(args.identities, args.churn)
+    previous, current = state(previous_records), state(current_records)
+    print(f"Записей: было {len(previous)}, стало {len(current)}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = Path(directory) / 'сверка'
+        meta_filename = Path(directory) / 'сверка.json'
+        started = time.perf_counter()
+        meta = save_state(previous, filename=filename, meta_filename=meta_filename)
+        save_time = time.perf_counter() - started
+        started = time.perf_counter()
+        loaded, _ = load_state(filename, meta_filename)
+        load_time = time.perf_counter() - started
+        size = table_file(filename, meta['table']).stat().st_size
+
+    started = time.perf_counter()
+    changes = state_changes(loaded, current)
+    diff_time = time.perf_counter() - started
+    print(f"Сохранение {save_time * 1000:6.1f} мс, загрузка {load_time * 1000:6.1f} мс, "
+          f"файл {size / 2**20:.2f} МБ")
+    print(f"Сравнение  {diff_time * 1000:6.1f} мс: {changes['изменение'].value_counts().to_dict()}")
+
+    previous_keys = {(name, key) for name, key, _ in previous_records}
+    current_keys = {(name, key) for name, key, _ in current_records}
+    found = {change: set(zip(group['набор'], group['ключ'])) for change, group in changes.groupby('изменение')}
+    assert found.get(NEW, set()) == current_keys - previous_keys, "новые записи различаются"
+    assert found.get(RESOLVED, set()) == previous_keys - current_keys, "устраненные записи различаются"
+    print("Изменения совпадают с разностью множеств")
+
+if __name__ == "__main__":
+    main()
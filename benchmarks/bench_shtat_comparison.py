@@ -0,0 +1,99 @@
+# benchmarks/bench_shtat_comparison.py
+"""
+Сравнение AD и штатного расписания: сверка по матрице присутствия
+(reconciliation.reconcile и excel_processor.comparison_table) против прежнего
+create_comparison_sheet, где исходное написание каждого отсутствующего ФИО
+искалось повторной нормализацией всего списка AD.
+
+Генерирует names сотрудников AD и столько же записей штатного расписания
+с долей расхождений mismatch в каждую сторону (часть ФИО в штатном расписании
+записана в другом регистре и через "ё"). Прежний поиск квадратичный, поэтому
+он выполняется для --legacy-sample отсутствующих ФИО, и время пересчитывается
+на все. Проверяет, что найдены ровно ожидаемые расхождения в исходном написании.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_shtat_comparison --names 50000 --mismatch 0.2
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from excel_processor import comparison_table, prepare_table
+from reconciliation import reconcile
+from utils import normalize_name
+
+def person(i):
+    """ФИО с уникальными фамилией и именем"""
+    return f"Фамилия{i}ев Имя{i % 97} Отчество{i % 13}"
+
+def shtat_spelling(rnd, name):
+    """ФИО в штатном расписании: иногда в верхнем регистре или через "ё" """
+    roll = rnd.random()
+    if roll < 0.1:
+        return name.upper()
+    if roll < 0.2:
+        return name.replace('е', 'ё')
+    return name
+
+def generate(names, mismatch, seed=42):
+    """Списки ФИО AD и штатного расписания, ожидаемые расхождения в обе стороны"""
+    rnd = random.Random(seed)
+    missing = int(names * mismatch)
+    ad_names = [person(i) for i in range(names)]
+    shtat = {i: shtat_spelling(rnd, person(i)) for i in range(missing, names + missing)}
+    expected_in_ad = set(ad_names[:missing])
+    expected_in_shtat = {shtat[i] for i in range(names, names + missing)}
+
+    shtat_names = list(shtat.values())
+    rnd.shuffle(ad_names)
+    rnd.shuffle(shtat_names)
+    return ad_names, shtat_names, expected_in_ad, expected_in_shtat
+
+def legacy_missing_in_shtat(ad_names, shtat_names, sample):
+    """Прежний create_comparison_sheet: множества ключей и поиск исходного написания для sample ФИО"""
+    ad_set = set(normalize_name(name) for name in ad_names)
+    shtat_set = set(normalize_name(name) for name in shtat_names)
+    missing = sorted(ad_set - shtat_set)
+    originals = [next((n for n in ad_names if normalize_name(n) == name), name) for name in missing[:sample]]
+    return missing, originals
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--names', type=int, default=50000)
+    parser.add_argument('--mismatch', type=float, default=0.2)
+    parser.add_argument('--legacy-sample', type=int, default=200)
+    args = parser.parse_args()
+
+    ad_names, shtat_names, expected_in_ad, expected_in_shtat = generate(args.names, args.mismatch)
+    print(f"AD: {len(ad_names)}, штатное расписание: {len(shtat_names)}, "
+          f"расхождений: {len(expected_in_ad)} + {len(expected_in_shtat)}")
+
+    started = time.perf_counter()
+    missing, originals = legacy_missing_in_shtat(ad_names, shtat_names, args.legacy_sample)
+    legacy_time = (time.perf_counter() - started) * len(missing) / max(len(originals), 1)
+    print(f"Прежний поиск (только AD -> штатка): ~{legacy_time:8.1f} с "
+          f"(пересчитано с {len(originals)} из {len(missing)} ФИО)")
+
+    started = time.perf_counter()
+    tables = {
+        'ad_employees': pd.DataFrame({'AD_сотрудники': pd.Series(ad_names, dtype=object), 'AD_Статус_сотрудники': 'Активен'}),
+        'ad_gph': pd.DataFrame({'AD_ГПХ': pd.Series([], dtype=object), 'AD_Статус_ГПХ': pd.Series([], dtype=object)}),
+        'shtat': pd.DataFrame({'Штатное_ФИО': pd.Series(shtat_names, dtype=object)}),
+    }
+    for table in tables.values():
+        prepare_table(table)
+    results = reconcile(tables, {0}, fuzzy=False)
+    comparison = comparison_table(results['missing_in_shtat'], ad_names, results['missing_in_ad'], shtat_names)
+    new_time = time.perf_counter() - started
+    print(f"Матрица присутствия (обе стороны):   {new_time:8.1f} с")
+
+    statuses = comparison['Статус'].str.startswith('Активен в AD')
+    assert set(comparison.loc[statuses, 'ФИО']) == expected_in_ad, "AD -> штатка: расхождения различаются"
+    assert set(comparison.loc[~statuses, 'ФИО']) == expected_in_shtat, "штатка -> AD: расхождения различаются"
+    assert set(originals) <= expected_in_ad and len(missing) == len(expected_in_ad)
+    print("Результаты совпадают с ожидаемыми")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/bench_source_tables.py
+"""
+Сравнение отдельных таблиц источников с прежней широкой таблицей
+на MAX_ROWS строк.
+
+Прежняя схема заранее создавала таблицу 10000 x 13 из object-столбцов и
+обрезала каждый источник до ее длины; теперь каждый источник хранится
+в таблице своего размера, а лист "сравнение пользователей" собирается
+только при выгрузке. Для каждого размера входных данных выводит число
+сохраненных строк, объем памяти таблиц и время подготовки; если данные
+помещаются в 10000 строк, проверяет, что итоговый лист совпадает с прежним.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_source_tables --rows 500 10000 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from excel_processor import FIO_COLUMNS, SOURCE_COLUMNS, prepare_table, assemble_users_sheet
+from utils import replace_yo
+
+LEGACY_MAX_ROWS = 10000
+
+def generate_tables(rows):
+    """Таблицы источников по rows записей (у AD - сотрудники и ГПХ поровну)"""
+    index = np.arange(rows)
+    names = pd.Series([f"Фёдоров{i} Имя{i % 97} Отчество{i % 13}" for i in range(rows)], dtype=object)
+    yes_no = pd.Series(np.where(index % 3, 'Да', 'Нет'), dtype=object)
+    half = rows // 2
+    return {
+        'shtat': pd.DataFrame({'Штатное_ФИО': names}),
+        'ad_employees': pd.DataFrame({'AD_сотрудники': names[:half], 'AD_Статус_сотрудники': 'Активен'}),
+        'ad_gph': pd.DataFrame({'AD_ГПХ': names[half:].reset_index(drop=True), 'AD_Статус_ГПХ': 'Активен'}),
+        'kontur': pd.DataFrame({'Контур_Диадок_ФИО': names, 'Контур_Диадок_Администратор': 'нет',
+                                'Контур_Диадок_статус': np.where(index % 5, 'активна', 'заблокирована')}),
+        'diadoc': pd.DataFrame({'Сфера_Курьер_ФИО': names, 'Сфера_Курьер_Активен': yes_no,
+                                'Сфера_Курьер_Администратор': 'Нет'}),
+        'onec': pd.DataFrame({'1C_ФИО': names, '1C_Активен': yes_no}),
+    }
+
+def legacy_wide_table(sources):
+    """Прежняя схема: широкая таблица на MAX_ROWS строк, источники обрезаются до ее длины"""
+    columns = [col for table_columns in SOURCE_COLUMNS.values() for col in table_columns]
+    df = pd.DataFrame(index=range(LEGACY_MAX_ROWS), columns=columns)
+    for table in sources.values():
+        for col in table.columns:
+            df[col] = pd.Series(table[col][:len(df)])
+
+    for col in FIO_COLUMNS:
+        df.loc[:, col] = df[col].apply(lambda x: replace_yo(x) if pd.notna(x) else x)
+    df = df.replace('', np.nan)
+    return df, df.dropna(how='all')
+
+def table_bytes(tables):
+    """Объем памяти таблиц вместе со строками"""
+    return sum(int(table.memory_usage(deep=True).sum()) for table in tables)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[500, 10000, 1000000])
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        sources = generate_tables(rows)
+        print(f"Источники по {rows} записей:")
+
+        started = time.perf_counter()
+        wide, legacy_sheet = legacy_wide_table({name: table.copy() for name, table in sources.items()})
+        legacy_time = time.perf_counter() - started
+        print(f"  Широкая таблица:    {legacy_time:6.2f} с, {table_bytes([wide]) / 1024 / 1024:8.1f} МБ, "
+              f"строк на листе: {len(legacy_sheet)}")
+
+        started = time.perf_counter()
+        tables = {name: prepare_table(table.copy()) for name, table in sources.items()}
+        sheet = assemble_users_sheet(tables)
+        new_time = time.perf_counter() - started
+        print(f"  Таблицы источников: {new_time:6.2f} с, {table_bytes(tables.values()) / 1024 / 1024:8.1f} МБ "
+              f"(с ключами ФИО), строк на листе: {len(sheet)}")
+
+        assert len(sheet) == rows, "лист сравнения потерял строки"
+        if rows <= LEGACY_MAX_ROWS:
+            # Типы столбцов могут отличаться (object и str), сравниваются значения
+            assert legacy_sheet.astype(object).equals(sheet.astype(object)), "лист сравнения отличается от прежнего"
+            print("  Лист совпадает с прежним")
+        else:
+            print(f"  Прежняя схема потеряла {rows - len(legacy_sheet)} строк")
+
+if __name__ == "__main__":
+    main()
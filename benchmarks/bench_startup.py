@@ -0,0 +1,72 @@
+# benchmarks/bench_startup.py
+"""
+Время запуска: импорт точек входа (python -X importtime) в отдельных процессах.
+
+Для каждого модуля выводит медиану накопленного времени импорта и загружаемые
+тяжелые библиотеки (pandas, numpy, openpyxl, tqdm), затем проверяет:
+- config, main, batch, ad_export и input_cache импортируются без тяжелых библиотек;
+- импорт ничего не создает на диске (папки исходных файлов и результатов
+  задаются во временном каталоге через RECONCILE_INPUT_DIR/RECONCILE_OUTPUT_DIR)
+  и не настраивает логирование.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+HEAVY_PACKAGES = ['pandas', 'numpy', 'openpyxl', 'tqdm']
+# Точки входа, которым тяжелые библиотеки при импорте не нужны
+LIGHT_MODULES = ['config', 'main', 'batch', 'ad_export', 'input_cache']
+MODULES = LIGHT_MODULES + ['excel_processor']
+
+def import_profile(module, env):
+    """Импорт модуля в новом процессе: (накопленное время в мс, загруженные тяжелые библиотеки)"""
+    code = f"import logging, {module}; assert not logging.root.handlers, 'импорт настроил логирование'"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=PROJECT_DIR, env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"{module}: {result.stderr.strip().splitlines()[-1]}")
+
+    cumulative = None
+    packages = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, total, name = line.split('|')
+        name = name.strip()
+        packages.add(name.split('.')[0])
+        if name == module:
+            cumulative = int(total) / 1000
+    return cumulative, sorted(packages & set(HEAVY_PACKAGES))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ,
+                   RECONCILE_INPUT_DIR=str(Path(directory) / 'эксельки'),
+                   RECONCILE_OUTPUT_DIR=str(Path(directory) / 'вывод'))
+        heavy = {}
+        for module in MODULES:
+            runs = [import_profile(module, env) for _ in range(args.repeat)]
+            heavy[module] = runs[0][1]
+            print(f"{module:16} {statistics.median(ms for ms, _ in runs):7.1f} мс  "
+                  f"тяжелые библиотеки: {', '.join(heavy[module]) or 'нет'}")
+        created = sorted(path.name for path in Path(directory).iterdir())
+
+    for module in LIGHT_MODULES:
+        assert not heavy[module], f"{module}: при импорте загружаются {', '.join(heavy[module])}"
+    assert not created, f"импорт создал на диске: {', '.join(created)}"
+    print("Точки входа импортируются без тяжелых библиотек, импорт ничего не создает на диске")
+
+if __name__ == "__main__":
+    main()
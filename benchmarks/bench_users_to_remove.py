@@ -0,0 +1,162 @@
+# benchmarks/bench_users_to_remove.py
+"""
+Сравнение поиска пользователей для удаления из ЭДО на булевых масках
+(benchmarks.legacy_search) с прежним обходом строк iterrows() (utils и comparison).
+
+Генерирует таблицы ЭДО в форматах 1С, Сферы Курьер и Контура (включая
+пустые ФИО, повторяющиеся индексы и пустые таблицы), выполняет поиск
+прежним и новым способом и проверяет, что списки на удаление совпадают.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_users_to_remove --rows 100000
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from benchmarks.legacy_search import (legacy_masked_comparison_find_users_to_remove,
+                                      legacy_masked_find_users_to_remove)
+from utils import normalize_name, add_name_key
+
+def legacy_utils_find_users_to_remove(edo_df, staff_df, gph_df):
+    """Прежний utils.find_users_to_remove"""
+    all_valid_names = set()
+
+    if not staff_df.empty and 'AD_ФИО' in staff_df.columns:
+        all_valid_names.update(staff_df['AD_ФИО'].apply(normalize_name).dropna())
+
+    if not gph_df.empty and 'AD_ФИО' in gph_df.columns:
+        all_valid_names.update(gph_df['AD_ФИО'].apply(normalize_name).dropna())
+
+    users_to_remove = []
+
+    for _, row in edo_df.iterrows():
+        fio_column = edo_df.columns[0]
+        if pd.isna(row[fio_column]):
+            continue
+
+        normalized_name = normalize_name(row[fio_column])
+
+        if normalized_name not in all_valid_names:
+            if 'Контур_статус' in edo_df.columns and row['Контур_статус'] == 'активна':
+                users_to_remove.append(row)
+            elif 'Диадок_Активен' in edo_df.columns and row['Диадок_Активен'] == 'Да':
+                users_to_remove.append(row)
+            elif '1C_Активен' in edo_df.columns and row['1C_Активен'] == 'Да':
+                users_to_remove.append(row)
+
+    return pd.DataFrame(users_to_remove)
+
+def legacy_comparison_find_users_to_remove(edo_df, staff_df, gph_df):
+    """Прежний comparison.find_users_to_remove"""
+    staff_names = set(staff_df.iloc[:, 0].apply(normalize_name).dropna())
+    gph_names = set(gph_df.iloc[:, 0].apply(normalize_name).dropna())
+    all_valid_names = staff_names.union(gph_names)
+
+    users_to_remove = []
+
+    for _, row in edo_df.iterrows():
+        fio_column = edo_df.columns[0]
+        normalized_name = normalize_name(row[fio_column])
+
+        if normalized_name not in all_valid_names:
+            if 'Контур_Дата_блокировки' in edo_df.columns and pd.isna(row['Контур_Дата_блокировки']):
+                users_to_remove.append(row)
+            elif 'Диадок_Активен' in edo_df.columns and row['Диадок_Активен'] == 'Да':
+                users_to_remove.append(row)
+            elif '1C_Активен' in edo_df.columns and row['1C_Активен'] == 'Да':
+                users_to_remove.append(row)
+
+    return pd.DataFrame(users_to_remove)
+
+def random_name(rnd, n):
+    """ФИО из n возможных, иногда в другом написании или пустое"""
+    i = rnd.randrange(n)
+    roll = rnd.random()
+    if roll < 0.02:
+        return None
+    name = f"Фамилия{i} Имя{i % 97} Отчество{i % 13}"
+    if roll < 0.1:
+        return name.upper().replace('Е', 'Ё')
+    if roll < 0.2:
+        return f" {name.rsplit(' ', 1)[0]} "
+    return name
+
+def generate_cases(rows, seed=42):
+    """Таблицы AD (сотрудники и ГПХ) и набор таблиц ЭДО: {название: (таблица, модуль)}"""
+    rnd = random.Random(seed)
+    staff_df = pd.DataFrame({'AD_ФИО': [random_name(rnd, rows) for _ in range(rows // 2)]})
+    gph_df = pd.DataFrame({'AD_ФИО': [random_name(rnd, rows) for _ in range(rows // 10)]})
+
+    def edo(columns):
+        data = {'ФИО': [random_name(rnd, rows * 2) for _ in range(rows)]}
+        for column, values in columns.items():
+            data[column] = [rnd.choice(values) for _ in range(rows)]
+        return pd.DataFrame(data)
+
+    cases = {
+        '1С': edo({'1C_Активен': ['Да', 'Нет', None]}),
+        'Сфера Курьер': edo({'Диадок_Активен': ['Да', 'Нет']}),
+        'Контур (статус)': edo({'Контур_статус': ['активна', 'заблокирована', None]}),
+        'Контур (дата блокировки)': edo({'Контур_Дата_блокировки': [None, None, '01.02.2024']}),
+        'Несколько статусов': edo({'Диадок_Активен': ['Да', 'Нет'], '1C_Активен': ['Да', 'Нет']}),
+        'Без статуса': edo({'Подразделение': ['ИТ', 'Бухгалтерия']}),
+    }
+    repeated = edo({'1C_Активен': ['Да', 'Нет']})
+    repeated.index = [i // 3 for i in range(len(repeated))]
+    cases['Повторяющиеся индексы'] = repeated
+    cases['Все в AD'] = pd.DataFrame({'ФИО': staff_df['AD_ФИО'].dropna()[:100], '1C_Активен': 'Да'})
+    cases['Пустая таблица'] = pd.DataFrame(columns=['ФИО', '1C_Активен'])
+    return staff_df, gph_df, cases
+
+def same_result(old, new):
+    """Одинаковые строки на удаление (прежняя версия собирала таблицу из строк, типы столбцов могли отличаться)"""
+    if old.empty or new.empty:
+        return old.empty and new.empty and list(old.columns) == list(new.columns)
+    return (list(old.columns) == list(new.columns) and list(old.index) == list(new.index)
+            and old.astype(object).equals(new.astype(object)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    staff_df, gph_df, cases = generate_cases(args.rows)
+    print(f"AD: {len(staff_df)} сотрудников, {len(gph_df)} ГПХ; ЭДО: до {args.rows} записей")
+
+    implementations = [
+        ('utils', legacy_utils_find_users_to_remove, legacy_masked_find_users_to_remove),
+        ('comparison', legacy_comparison_find_users_to_remove, legacy_masked_comparison_find_users_to_remove),
+    ]
+    # Как в process_*_data: столбцы ключей посчитаны заранее
+    keyed_staff_df = add_name_key(staff_df.copy(), 'AD_ФИО')
+    keyed_gph_df = add_name_key(gph_df.copy(), 'AD_ФИО')
+    keyed_cases = {title: add_name_key(edo_df.copy(), 'ФИО') for title, edo_df in cases.items()}
+
+    for module, legacy, vectorized in implementations:
+        legacy_total = vectorized_total = keyed_total = 0.0
+        for title, edo_df in cases.items():
+            started = time.perf_counter()
+            old = legacy(edo_df, staff_df, gph_df)
+            legacy_total += time.perf_counter() - started
+
+            started = time.perf_counter()
+            new = vectorized(edo_df, staff_df, gph_df)
+            vectorized_total += time.perf_counter() - started
+
+            started = time.perf_counter()
+            keyed = vectorized(keyed_cases[title], keyed_staff_df, keyed_gph_df)
+            keyed_total += time.perf_counter() - started
+
+            assert same_result(old, new), f"{module}, {title}: списки на удаление различаются"
+            assert same_result(old, keyed.drop(columns=['ФИО_ключ'], errors='ignore')), \
+                f"{module}, {title}: списки на удаление с готовыми ключами различаются"
+            print(f"  {module:10} {title:26} на удаление: {len(new)}")
+        print(f"{module}: прежний обход {legacy_total:.2f} с, маски {vectorized_total:.3f} с "
+              f"(с готовыми ключами {keyed_total * 1000:.0f} мс), ускорение {legacy_total / vectorized_total:.0f}x")
+    print("Результаты совпадают")
+
+if __name__ == "__main__":
+    main()
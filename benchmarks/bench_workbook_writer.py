@@ -0,0 +1,108 @@
+# benchmarks/bench_workbook_writer.py
+"""
+Запись файла результатов за один раз (utils.write_workbook, openpyxl write_only)
+против прежней схемы: основной лист через pd.ExcelWriter, затем повторное
+открытие книги в режиме дозаписи для остальных листов.
+
+Генерирует источники по rows записей (как benchmarks.bench_reconciliation),
+собирает основной лист и листы сверки и сохраняет отчет каждым способом
+в отдельном процессе, чтобы пиковая память (RSS) не смешивалась.
+Выводит время формирования отчета (сборка листов, сверка, запись),
+время записи и пиковую память, затем проверяет, что листы в файлах совпадают.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_workbook_writer --rows 100000
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.bench_reconciliation import generate_tables
+from excel_processor import SOURCE_COLUMNS, assemble_users_sheet, result_sets, result_sheets
+from reconciliation import reconcile
+from utils import write_workbook
+
+def legacy_write(sheets, filename):
+    """Прежняя запись: основной лист, затем дозапись остальных листов в ту же книгу"""
+    names = list(sheets)
+    with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+        sheets[names[0]].to_excel(writer, sheet_name=names[0], index=False)
+    with pd.ExcelWriter(filename, engine='openpyxl', mode='a') as writer:
+        for name in names[1:]:
+            sheets[name].to_excel(writer, sheet_name=name, index=False)
+
+def build_report(rows, mode, filename):
+    """Формирование отчета одним способом; возвращает замеры"""
+    tables = generate_tables(rows)
+    for source, columns in SOURCE_COLUMNS.items():
+        for column in columns:
+            if column not in tables[source]:
+                tables[source][column] = 'Нет'
+    prepared_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    started = time.perf_counter()
+    sheets = {'сравнение пользователей': assemble_users_sheet(tables)}
+    results = reconcile(tables, {0}, fuzzy=False)
+    employees_names = tables['ad_employees']['AD_сотрудники']
+    sheets.update(result_sheets(result_sets(results, employees_names, tables['shtat']['Штатное_ФИО'])))
+
+    write_started = time.perf_counter()
+    if mode == 'legacy':
+        legacy_write(sheets, filename)
+    else:
+        write_workbook(sheets, filename)
+    finished = time.perf_counter()
+
+    return {
+        'total': finished - started,
+        'write': finished - write_started,
+        'prepared_rss_mb': prepared_rss / 1024,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'sheet_rows': {name: len(df) for name, df in sheets.items()},
+    }
+
+def run_child(rows, mode, filename):
+    """Замер в отдельном процессе"""
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_workbook_writer', '--rows', str(rows),
+                             '--mode', mode, '--output', str(filename)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--mode', choices=['legacy', 'one-shot'])
+    parser.add_argument('--output')
+    parser.add_argument('--no-check', action='store_true', help="не сравнивать листы в файлах")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(build_report(args.rows, args.mode, args.output)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = {mode: Path(directory) / f"{mode}.xlsx" for mode in ['legacy', 'one-shot']}
+        for mode, filename in files.items():
+            stats = run_child(args.rows, mode, filename)
+            print(f"{mode:9} отчет {stats['total']:6.1f} с, запись {stats['write']:6.1f} с, "
+                  f"пиковая память {stats['peak_rss_mb']:6.0f} МБ (до отчета {stats['prepared_rss_mb']:.0f} МБ), "
+                  f"файл {filename.stat().st_size / 2**20:.1f} МБ")
+        print(f"Листы: {stats['sheet_rows']}")
+
+        if not args.no_check:
+            legacy = pd.read_excel(files['legacy'], sheet_name=None)
+            one_shot = pd.read_excel(files['one-shot'], sheet_name=None)
+            assert list(legacy) == list(one_shot), "порядок листов различается"
+            for name in legacy:
+                assert legacy[name].equals(one_shot[name]), f"{name}: листы различаются"
+            print("Листы совпадают")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/legacy_search.py
+"""
+Прежние поиски дубликатов и пользователей для удаления на булевых масках
+(utils и comparison до сверки по матрице присутствия, reconciliation.reconcile).
+В проекте не используются: сохранены для замеров и тестов, которые сравнивают
+их с обходом строк iterrows() и со сверкой по матрице присутствия.
+Статусы проверяются по столбцам прежнего формата таблиц ЭДО
+(Контур_статус, Диадок_Активен, 1C_Активен).
+"""
+import numpy as np
+import pandas as pd
+
+from utils import is_name_key, name_key_column, normalize_names
+
+# Значения статуса, при которых учетная запись в ЭДО считалась активной
+ACTIVE_STATUS_VALUES = {
+    'Контур_статус': 'активна',
+    'Диадок_Активен': 'Да',
+    '1C_Активен': 'Да',
+}
+
+def name_keys(df, column):
+    """Нормализованные ФИО столбца: готовый столбец ключей, если он есть, иначе вычисляются"""
+    key_column = name_key_column(column)
+    if key_column in df.columns:
+        return df[key_column]
+    return normalize_names(df[column])
+
+def drop_name_keys(df):
+    """Таблица без служебных столбцов ключей"""
+    return df.drop(columns=[column for column in df.columns if is_name_key(column)])
+
+def legacy_find_duplicates(df1, df2, col1, col2):
+    """Прежний utils.find_duplicates: общие ключи ФИО двух таблиц"""
+    names1 = set(name_keys(df1, col1).dropna())
+    names2 = set(name_keys(df2, col2).dropna())
+    return names1.intersection(names2)
+
+def legacy_find_internal_duplicates(df, column):
+    """Прежний utils.find_internal_duplicates: ключи ФИО, встречающиеся в столбце несколько раз"""
+    normalized_names = name_keys(df, column)
+    value_counts = normalized_names.value_counts()
+    return set(value_counts[value_counts > 1].index)
+
+def legacy_masked_find_users_to_remove(edo_df, staff_df, gph_df):
+    """Прежний utils.find_users_to_remove на масках"""
+    all_valid_names = set()
+    if not staff_df.empty and 'AD_ФИО' in staff_df.columns:
+        all_valid_names.update(name_keys(staff_df, 'AD_ФИО').dropna())
+    if not gph_df.empty and 'AD_ФИО' in gph_df.columns:
+        all_valid_names.update(name_keys(gph_df, 'AD_ФИО').dropna())
+
+    if edo_df.empty:
+        return pd.DataFrame()
+
+    # Первый столбец - ФИО
+    fio_column = edo_df.columns[0]
+    not_in_ad = edo_df[fio_column].notna().to_numpy() & ~name_keys(edo_df, fio_column).isin(all_valid_names).to_numpy()
+
+    active = np.zeros(len(edo_df), dtype=bool)
+    for column, active_value in ACTIVE_STATUS_VALUES.items():
+        if column in edo_df.columns:
+            active |= (edo_df[column] == active_value).to_numpy()
+
+    users_to_remove = edo_df[not_in_ad & active]
+    if users_to_remove.empty:
+        return pd.DataFrame()
+    return drop_name_keys(users_to_remove)
+
+def legacy_masked_comparison_find_users_to_remove(edo_df, staff_df, gph_df):
+    """Прежний comparison.find_users_to_remove на масках (Контур - по пустой дате блокировки)"""
+    staff_names = set(name_keys(staff_df, staff_df.columns[0]).dropna())
+    gph_names = set(name_keys(gph_df, gph_df.columns[0]).dropna())
+    all_valid_names = staff_names.union(gph_names)
+
+    # Первый столбец - ФИО
+    fio_column = edo_df.columns[0]
+    not_in_ad = ~name_keys(edo_df, fio_column).isin(all_valid_names).to_numpy()
+
+    active = np.zeros(len(edo_df), dtype=bool)
+    if 'Контур_Дата_блокировки' in edo_df.columns:
+        active |= edo_df['Контур_Дата_блокировки'].isna().to_numpy()
+    if 'Диадок_Активен' in edo_df.columns:
+        active |= (edo_df['Диадок_Активен'] == 'Да').to_numpy()
+    if '1C_Активен' in edo_df.columns:
+        active |= (edo_df['1C_Активен'] == 'Да').to_numpy()
+
+    users_to_remove = edo_df[not_in_ad & active]
+    if users_to_remove.empty:
+        return pd.DataFrame()
+    return users_to_remove
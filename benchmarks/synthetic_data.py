@@ -0,0 +1,320 @@
+# benchmarks/synthetic_data.py
+"""
+Синтетические исходные файлы для замеров всего конвейера: согласованные между
+собой вывод PowerShell экспорта AD, отчет 1С ("Лист_1" с шапкой параметров),
+выгрузки Контур Диадок и Сфера Курьер и штатное расписание.
+
+Все источники строятся из одного списка людей:
+- users учетных записей AD (доля gph - ГПХ) и служебные учетные записи; доля
+  disabled учетных записей заблокирована - для сверки таких людей в AD нет;
+- уволенные (доля leavers от users) - есть в системах, но не в AD;
+- новые сотрудники (доля new_hires) - есть в штатном расписании, но не в AD;
+- в каждую систему человек попадает с вероятностью overlap, десятая часть
+  записей заблокирована; у доли duplicates людей в системе две записи
+  (вторая - с ё, в верхнем регистре или с лишними пробелами);
+- у доли namesakes людей те же фамилия и имя, что у другого человека,
+  но другое отчество; доля short_names записей систем - без отчества
+  (только у людей без однофамильцев, чтобы запись была однозначной);
+- в штатном расписании сотрудник AD есть с вероятностью in_shtat.
+
+Ожидаемые итоги сверки по всем системам и типам сотрудников записываются
+в manifest.json - по ним benchmarks.bench_pipeline проверяет результаты.
+
+Запуск из корня проекта:
+    python -m benchmarks.synthetic_data --users 100000 --output синтетика/100k
+"""
+import argparse
+import json
+import random
+import time
+from collections import Counter
+from pathlib import Path
+
+from benchmarks.bench_onec_parser import HEADER as ONEC_HEADER
+
+# Параметры набора по умолчанию (доли - от числа людей)
+DEFAULTS = {
+    'seed': 42,
+    'overlap': 0.7,
+    'leavers': 0.05,
+    'new_hires': 0.01,
+    'gph': 0.1,
+    'disabled': 0.05,
+    'in_shtat': 0.95,
+    'duplicates': 0.01,
+    'namesakes': 0.02,
+    'short_names': 0.05,
+}
+
+# Файлы набора относительно его папки (папка набора - INPUT_DIR конвейера)
+AD_SOURCE_FILE = 'ad_export.txt'
+MANIFEST_FILE = 'manifest.json'
+SOURCE_FILES = {
+    'onec': '1С/Users.1C.xlsx',
+    'kontur': 'эдо_контур_диадок/Контур_Диадок.xlsx',
+    'diadoc': 'эдо_сфера_курьер/Сфера_Курьер.xlsx',
+    'shtat': 'штатка/Штатное расписание.xlsx',
+}
+SYSTEMS = {'onec': '1c', 'kontur': 'kontur', 'diadoc': 'diadoc'}
+
+SURNAME_ROOTS = [
+    'Иван', 'Петр', 'Сидор', 'Смирн', 'Кузнец', 'Поп', 'Васил', 'Сокол', 'Михайл', 'Новик',
+    'Федор', 'Мороз', 'Волк', 'Лавр', 'Лебед', 'Семен', 'Егор', 'Павл', 'Козл', 'Степан',
+    'Никол', 'Орл', 'Ждан', 'Макар', 'Никит', 'Захар', 'Зайц', 'Солов', 'Борис', 'Яков',
+    'Гриш', 'Роман', 'Вороб', 'Сурк', 'Кузьм', 'Фрол', 'Александр', 'Дмитр', 'Корол', 'Гус',
+    'Кисел', 'Иль', 'Максим', 'Поляк', 'Сорок', 'Виноград', 'Ковал', 'Бел', 'Медвед', 'Антон',
+    'Тарас', 'Жук', 'Баран', 'Филипп', 'Комар', 'Давыд', 'Беляк', 'Герасим', 'Богдан', 'Осип',
+    'Сидорк', 'Мохн', 'Тит', 'Марк', 'Мирон', 'Крыл', 'Кулик', 'Карп', 'Влас', 'Мельник',
+    'Денис', 'Гаврил', 'Тихон', 'Казак', 'Афон', 'Данил', 'Савел', 'Тимош', 'Фом', 'Черн',
+    'Абрам', 'Мартын', 'Ефим', 'Федот', 'Щерб', 'Назар', 'Калин', 'Исаак', 'Черныш', 'Быч',
+    'Шуб', 'Горбун', 'Колесник', 'Журавл', 'Ерш', 'Лук', 'Сафон', 'Рыбак', 'Трофим', 'Сусл',
+]
+SURNAME_INFIXES = ['', 'ан', 'ен', 'ор', 'ур', 'ил', 'ац', 'ик', 'уш', 'ач', 'ар', 'ет', 'ох', 'ыш',
+                   'он', 'ул', 'ян', 'юк', 'ел']
+# Окончания фамилий: (мужская форма, женская форма)
+SURNAME_ENDINGS = [('ов', 'ова'), ('ин', 'ина'), ('ский', 'ская')]
+MALE_NAMES = [
+    'Александр', 'Алексей', 'Андрей', 'Антон', 'Артем', 'Борис', 'Вадим', 'Валентин', 'Василий', 'Виктор',
+    'Владимир', 'Вячеслав', 'Геннадий', 'Георгий', 'Глеб', 'Григорий', 'Даниил', 'Денис', 'Дмитрий', 'Евгений',
+    'Егор', 'Иван', 'Игорь', 'Илья', 'Кирилл', 'Константин', 'Леонид', 'Максим', 'Марк', 'Михаил',
+    'Никита', 'Николай', 'Олег', 'Павел', 'Петр', 'Роман', 'Сергей', 'Станислав', 'Тимур', 'Юрий',
+]
+FEMALE_NAMES = [
+    'Александра', 'Алина', 'Алла', 'Анастасия', 'Анна', 'Валентина', 'Валерия', 'Вера', 'Виктория', 'Галина',
+    'Дарья', 'Диана', 'Екатерина', 'Елена', 'Елизавета', 'Жанна', 'Зоя', 'Инна', 'Ирина', 'Карина',
+    'Кристина', 'Ксения', 'Лариса', 'Лидия', 'Любовь', 'Людмила', 'Маргарита', 'Марина', 'Мария', 'Надежда',
+    'Наталья', 'Нина', 'Оксана', 'Ольга', 'Полина', 'Светлана', 'Софья', 'Татьяна', 'Юлия', 'Яна',
+]
+# Отчества: (мужская форма, женская форма)
+PATRONYMICS = [
+    ('Александрович', 'Александровна'), ('Алексеевич', 'Алексеевна'), ('Андреевич', 'Андреевна'),
+    ('Антонович', 'Антоновна'), ('Борисович', 'Борисовна'), ('Вадимович', 'Вадимовна'),
+    ('Васильевич', 'Васильевна'), ('Викторович', 'Викторовна'), ('Владимирович', 'Владимировна'),
+    ('Геннадьевич', 'Геннадьевна'), ('Георгиевич', 'Георгиевна'), ('Григорьевич', 'Григорьевна'),
+    ('Денисович', 'Денисовна'), ('Дмитриевич', 'Дмитриевна'), ('Евгеньевич', 'Евгеньевна'),
+    ('Егорович', 'Егоровна'), ('Иванович', 'Ивановна'), ('Игоревич', 'Игоревна'),
+    ('Ильич', 'Ильинична'), ('Кириллович', 'Кирилловна'), ('Константинович', 'Константиновна'),
+    ('Леонидович', 'Леонидовна'), ('Максимович', 'Максимовна'), ('Михайлович', 'Михайловна'),
+    ('Николаевич', 'Николаевна'), ('Олегович', 'Олеговна'), ('Павлович', 'Павловна'),
+    ('Петрович', 'Петровна'), ('Романович', 'Романовна'), ('Сергеевич', 'Сергеевна'),
+    ('Станиславович', 'Станиславовна'), ('Юрьевич', 'Юрьевна'),
+]
+DEPARTMENTS = ['Бухгалтерия', 'Отдел кадров', 'Юридический отдел', 'Отдел продаж', 'Служба ИТ',
+               'Отдел закупок', 'Канцелярия', 'Планово-экономический отдел', 'Служба безопасности', 'Склад']
+BLOCKS = ['Финансы', 'Персонал', 'Коммерция', 'Операции', 'Администрация']
+POSITIONS = ['Специалист', 'Ведущий специалист', 'Главный специалист', 'Начальник отдела', 'Инженер',
+             'Бухгалтер', 'Менеджер', 'Аналитик', 'Юрисконсульт', 'Оператор']
+GPH_OUS = ['OU=external_organizations', 'OU=ГПХ,OU=cu_users']
+
+def surname_forms():
+    """Мужские и женские формы фамилий: корень + вставка + окончание (совпадающие сочетания - один раз)"""
+    return list(dict.fromkeys((root + infix + male, root + infix + female)
+                              for root in SURNAME_ROOTS for infix in SURNAME_INFIXES
+                              for male, female in SURNAME_ENDINGS))
+
+def generate_people(count, rnd, namesakes):
+    """
+    count людей с разными ФИО: список (фамилия, имя, отчество, пол).
+    Доле namesakes достаются фамилия и имя другого человека того же пола с другим отчеством.
+    """
+    surnames = surname_forms()
+    per_gender = len(surnames) * len(MALE_NAMES) * len(PATRONYMICS)
+    if count > 2 * per_gender:
+        raise ValueError(f"Не больше {2 * per_gender} людей с разными ФИО")
+
+    people = []
+    for number in rnd.sample(range(2 * per_gender), count):
+        gender, number = divmod(number, per_gender)
+        number, patronymic = divmod(number, len(PATRONYMICS))
+        surname, name = divmod(number, len(MALE_NAMES))
+        people.append((surname, name, patronymic, gender))
+
+    taken = set(people)
+    for i in rnd.sample(range(count), int(count * namesakes)):
+        gender = people[i][3]
+        other = people[rnd.randrange(count)]
+        while other[3] != gender:
+            other = people[rnd.randrange(count)]
+        for patronymic in rnd.sample(range(len(PATRONYMICS)), len(PATRONYMICS)):
+            candidate = (other[0], other[1], patronymic, gender)
+            if candidate not in taken:
+                taken.discard(people[i])
+                taken.add(candidate)
+                people[i] = candidate
+                break
+
+    return [(surnames[surname][gender], (FEMALE_NAMES if gender else MALE_NAMES)[name],
+             PATRONYMICS[patronymic][gender], gender)
+            for surname, name, patronymic, gender in people]
+
+def name_variant(fio, rnd):
+    """То же ФИО в другом написании: ё вместо е, верхний регистр или лишние пробелы"""
+    kind = rnd.randrange(3)
+    if kind == 0 and 'е' in fio:
+        return fio.replace('е', 'ё', 1)
+    if kind == 1:
+        return fio.upper()
+    return ' ' + fio.replace(' ', '  ', 1) + ' '
+
+def system_records(people, candidates, rnd, params, short_allowed):
+    """
+    Записи системы: список (ФИО в системе, активна, номер человека).
+    Каждый из candidates попадает в систему с вероятностью overlap.
+    """
+    records = []
+    for person in candidates:
+        if rnd.random() >= params['overlap']:
+            continue
+        surname, name, patronymic, _ = people[person]
+        fio = f"{surname} {name} {patronymic}"
+        if rnd.random() < params['duplicates']:
+            records.append((name_variant(fio, rnd), rnd.random() >= 0.1, person))
+        elif person in short_allowed and rnd.random() < params['short_names']:
+            fio = f"{surname} {name}"
+        records.append((fio, rnd.random() >= 0.1, person))
+    rnd.shuffle(records)
+    return records
+
+def write_workbook(filename, sheet_name, header, rows, preamble=()):
+    """Книга Excel с одним листом в режиме только для записи"""
+    from openpyxl import Workbook
+
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    for row in preamble:
+        ws.append(row)
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    wb.save(filename)
+
+def write_ad_source(filename, accounts):
+    """Вывод классической команды PowerShell: JSON пользователя и пустая строка Write-Host"""
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(f"Найдено пользователей: {len(accounts)}\n")
+        for account in accounts:
+            f.write(json.dumps(account, ensure_ascii=False) + "\n\n")
+
+def expected_results(records, ad_people, ad_employees, shtat_people):
+    """Итоги сверки, которые должен получить конвейер по всем системам и типам сотрудников"""
+    expected = {}
+    for source, suffix in SYSTEMS.items():
+        counts = Counter(person for _, _, person in records[source])
+        expected[f'users_to_remove_{suffix}'] = sum(1 for _, active, person in records[source]
+                                                    if active and person not in ad_people)
+        expected[f'internal_duplicates_{suffix}'] = sum(1 for count in counts.values() if count > 1)
+        expected[f'duplicates_ad_{suffix}'] = sum(1 for person in counts if person in ad_people)
+    expected['missing_in_shtat_count'] = len(ad_employees - shtat_people)
+    expected['missing_in_ad_count'] = len(shtat_people - ad_employees)
+    expected['comparison_count'] = expected['missing_in_shtat_count'] + expected['missing_in_ad_count']
+    return expected
+
+def generate_dataset(directory, users, **params):
+    """
+    Набор исходных файлов на users учетных записей AD в папке directory
+    (структура как у эксельки/, вывод PowerShell - в AD_SOURCE_FILE).
+    Параметры - см. DEFAULTS. Возвращает манифест набора (он же пишется в MANIFEST_FILE).
+    """
+    params = {**DEFAULTS, **params}
+    rnd = random.Random(params['seed'])
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    leavers = int(users * params['leavers'])
+    new_hires = int(users * params['new_hires'])
+    people = generate_people(users + leavers + new_hires, rnd, params['namesakes'])
+    # В сверке участвуют только активные учетные записи AD
+    gph_people = {person for person in range(users) if rnd.random() < params['gph']}
+    disabled_people = {person for person in range(users) if rnd.random() < params['disabled']}
+    ad_people = set(range(users)) - disabled_people
+    ad_employees = ad_people - gph_people
+    short_counts = Counter((surname, name) for surname, name, _, _ in people)
+    short_allowed = {person for person, (surname, name, _, _) in enumerate(people)
+                     if short_counts[surname, name] == 1}
+
+    # Учетные записи AD и служебные учетные записи (не сотрудники и не ГПХ)
+    accounts = []
+    for person in range(users):
+        surname, name, patronymic, _ = people[person]
+        login = f"user{person}"
+        ou = rnd.choice(GPH_OUS) if person in gph_people else 'OU=cu_users'
+        accounts.append({
+            'Name': f"{surname} {name} {patronymic}",
+            'SamAccountName': login,
+            'Enabled': person not in disabled_people,
+            'EmailAddress': f"{login}@corp.local",
+            'Company': "Компания",
+            'DistinguishedName': f"CN={login},{ou},DC=corp,DC=local",
+        })
+    for number in range(max(1, users // 100)):
+        login = f"svc{number}"
+        accounts.append({'Name': f"Служба обмена {number}", 'SamAccountName': login, 'Enabled': True,
+                         'EmailAddress': "", 'Company': "",
+                         'DistinguishedName': f"CN={login},OU=service,DC=corp,DC=local"})
+    rnd.shuffle(accounts)
+    write_ad_source(directory / AD_SOURCE_FILE, accounts)
+
+    in_systems = range(users + leavers)
+    records = {source: system_records(people, in_systems, rnd, params, short_allowed) for source in SYSTEMS}
+
+    onec_preamble = [[None] * len(ONEC_HEADER), ['Параметры:', None, 'Тип объекта: Справочник'],
+                     [None, None, 'Имя объекта: Пользователи'], [None, None, 'Имя таблицы: Основные данные'], [None]]
+    onec_rows = [[fio, None, None, None, 'Нет' if active else 'Да', DEPARTMENTS[person % len(DEPARTMENTS)],
+                  fio, None, 'Нет', 'Нет', f"{person:08d}-0000-0000-0000-000000000000", person, None, None]
+                 for fio, active, person in records['onec']]
+    # Служебные записи 1С, которые разбор пропускает
+    for number in range(max(1, len(onec_rows) // 200)):
+        name = rnd.choice(['Сервис Библиотека', 'robot', 'Робот обмена']) + f" {number}"
+        onec_rows.append([name, None, None, None, 'Нет'] + [None] * 9)
+    rnd.shuffle(onec_rows)
+    write_workbook(directory / SOURCE_FILES['onec'], 'Лист_1', ONEC_HEADER, onec_rows, onec_preamble)
+
+    write_workbook(directory / SOURCE_FILES['kontur'], 'Sheet1',
+                   ['Идентификатор пользователя', 'ФИО', 'Должность', 'Логин', 'Администратор', 'Дата блокировки'],
+                   ([f"{person:08d}-kontur", fio, POSITIONS[person % len(POSITIONS)], f"user{person}@corp.local",
+                     'true' if person % 97 == 0 else 'false', None if active else '2024-01-01']
+                    for fio, active, person in records['kontur']))
+
+    write_workbook(directory / SOURCE_FILES['diadoc'], 'Sheet1', ['USER_ID', 'ФИО', 'Активен', 'Администратор'],
+                   ([person, fio, 'Да' if active else 'Нет', 'Да' if person % 97 == 0 else 'Нет']
+                    for fio, active, person in records['diadoc']))
+
+    shtat_people = {person for person in ad_employees if rnd.random() < params['in_shtat']}
+    shtat_people.update(range(users + leavers, users + leavers + new_hires))
+    shtat_order = sorted(shtat_people, key=lambda person: (person % len(DEPARTMENTS), person))
+    write_workbook(directory / SOURCE_FILES['shtat'], 'Sheet1',
+                   ['Блок', 'Структурное подразделение', 'Должность', 'Ф.И.О.'],
+                   ([BLOCKS[person % len(DEPARTMENTS) % len(BLOCKS)], DEPARTMENTS[person % len(DEPARTMENTS)],
+                     POSITIONS[person % len(POSITIONS)], " ".join(people[person][:3])]
+                    for person in shtat_order))
+
+    manifest = {
+        'users': users,
+        'parameters': params,
+        'ad_source': AD_SOURCE_FILE,
+        'files': SOURCE_FILES,
+        'rows': {'ad': len(accounts), 'shtat': len(shtat_people),
+                 **{source: len(source_records) for source, source_records in records.items()}},
+        'expected': expected_results(records, ad_people, ad_employees, shtat_people),
+    }
+    (directory / MANIFEST_FILE).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding='utf-8')
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--output', required=True, help="папка набора (будет INPUT_DIR конвейера)")
+    for name, value in DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    manifest = generate_dataset(args.output, args.users, **{name: getattr(args, name) for name in DEFAULTS})
+    print(f"Набор на {args.users} пользователей AD: {time.perf_counter() - started:.1f} с, {args.output}")
+    print(f"Строк: {manifest['rows']}")
+    print(f"Ожидаемые итоги: {manifest['expected']}")
+    print(f"Конвейер: python batch.py --input-dir {args.output} --ad-source {Path(args.output) / AD_SOURCE_FILE}")
+
+if __name__ == "__main__":
+    main()
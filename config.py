@@ -2,12 +2,13 @@
 import os
 import logging
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
 
-# Базовые пути
+# Базовые пути. Папки исходных файлов и результатов можно переопределить переменными
+# окружения RECONCILE_INPUT_DIR и RECONCILE_OUTPUT_DIR (их задает batch.py)
 BASE_DIR = Path(__file__).parent
-INPUT_DIR = BASE_DIR / "эксельки"
-OUTPUT_DIR = BASE_DIR / "вывод"
+INPUT_DIR = Path(os.environ.get('RECONCILE_INPUT_DIR', BASE_DIR / "эксельки"))
+OUTPUT_DIR = Path(os.environ.get('RECONCILE_OUTPUT_DIR', BASE_DIR / "вывод"))
 LOG_DIR = OUTPUT_DIR / "log"
 AD_EXPORT_DIR = INPUT_DIR / "AD"
 SHTAT_DIR = INPUT_DIR / "штатка"
@@ -15,22 +16,113 @@ KONTUR_DIR = INPUT_DIR / "эдо_контур_диадок"
 DIADOC_DIR = INPUT_DIR / "эдо_сфера_курьер"
 ONEC_DIR = INPUT_DIR / "1С"
 
-# Создаем директории, если они не существуют
-INPUT_DIR.mkdir(exist_ok=True)
-OUTPUT_DIR.mkdir(exist_ok=True)
-LOG_DIR.mkdir(exist_ok=True)
-AD_EXPORT_DIR.mkdir(exist_ok=True)
-SHTAT_DIR.mkdir(exist_ok=True)
-KONTUR_DIR.mkdir(exist_ok=True)
-DIADOC_DIR.mkdir(exist_ok=True)
-ONEC_DIR.mkdir(exist_ok=True)
+
+def ensure_directories():
+    """
+    Создание папок исходных файлов и результатов, если они не существуют.
+    Вызывается точками входа (main.py, batch.py): импорт config ничего не создает
+    """
+    for directory in (INPUT_DIR, OUTPUT_DIR, LOG_DIR, AD_EXPORT_DIR, SHTAT_DIR, KONTUR_DIR, DIADOC_DIR, ONEC_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
 
 # Настройка актуальности файлов (в днях)
 MAX_FILE_AGE_DAYS = 180
 
-# Генерация имени файла с датой и временем
-current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
-OUTPUT_FILE = OUTPUT_DIR / f"результат_обработки_{current_time}.xlsx"
+# Кэш разобранных исходных файлов: таблица источника сохраняется после разбора
+# и используется повторно, пока файл не изменился (путь, размер, время изменения)
+INPUT_CACHE_ENABLED = True
+INPUT_CACHE_DIR = INPUT_DIR / "кэш"
+# Предельный размер кэша в мегабайтах, давно не использованные записи вытесняются
+INPUT_CACHE_MAX_MB = 200
+# Дополнительно сверять SHA-256 содержимого (если время изменения ненадежно)
+INPUT_CACHE_HASH_CONTENT = False
+
+# Экспорт AD и разбор исходных файлов выполняются одновременно:
+# файлы разбираются в пуле процессов, экспорт AD - в отдельном потоке
+PARALLEL_LOADING = True
+# Количество процессов для разбора файлов (None - по числу ядер)
+LOAD_WORKERS = None
+
+def report_paths(started_at=None):
+    """
+    Пути результатов запуска с датой и временем в имени: книга Excel
+    и папка машиночитаемых наборов. Вычисляются при каждой обработке,
+    а не при импорте, чтобы запуски подряд в одном процессе не совпадали
+    """
+    stamp = (started_at or datetime.now()).strftime("%Y%m%d_%H%M%S")
+    return OUTPUT_DIR / f"результат_обработки_{stamp}.xlsx", OUTPUT_DIR / f"результат_обработки_{stamp}"
+
+def metrics_file(started_at=None):
+    """Файл метрик запуска (время, CPU, строки и память по этапам) в папке логов"""
+    stamp = (started_at or datetime.now()).strftime("%Y%m%d_%H%M%S")
+    return LOG_DIR / f"метрики_{stamp}.json"
+
+# Метрики этапов запуска (экспорт AD, загрузка источников, сверка, запись отчета):
+# время, CPU, строки и пик памяти сохраняются в JSON в папке логов (metrics_file).
+# Замеры дешевые, поэтому по умолчанию включены
+METRICS_ENABLED = True
+
+# Форматы результатов: 'xlsx' - книга Excel (см. report_paths); 'csv', 'parquet' (нужен pyarrow),
+# 'jsonl' (JSON Lines) - по файлу на каждый набор результатов (дубли, удаление,
+# расхождения AD и штатки) в папке результатов запуска, например users_to_remove_1c.csv
+REPORT_FORMATS = ['xlsx']
+
+# Отчет об изменениях с прошлого запуска (новые и устраненные удаления, дубли,
+# расхождения AD и штатки) на листе "изменения"; результаты сверки каждого
+# запуска сохраняются по ключам ФИО для сравнения со следующим
+RUN_DIFF_ENABLED = True
+RUN_STATE_DIR = OUTPUT_DIR / "состояние"
+# Таблица состояния - сверка.parquet, если установлен pyarrow, иначе сверка.csv (см. table_store.py)
+RUN_STATE_FILE = RUN_STATE_DIR / "сверка"
+RUN_STATE_META_FILE = RUN_STATE_DIR / "сверка.json"
+
+# Быстрый экспорт AD: атрибуты читаются из результатов поиска без GetDirectoryEntry()
+AD_FAST_EXPORT = True
+
+# Инкрементальный экспорт AD: запрашиваются только пользователи, измененные
+# после сохраненной метки uSNChanged, и сливаются с локальным снимком
+AD_INCREMENTAL_EXPORT = False
+
+# Снимок AD: таблица пользователей (читается обработчиком Excel) и метаданные экспорта
+# (метка изменений, дата полного экспорта, типы столбцов таблицы). Таблица пишется
+# в ad_users.parquet, если установлен pyarrow, иначе в ad_users.csv (см. table_store.py)
+AD_USERS_FILE = AD_EXPORT_DIR / "ad_users"
+AD_SNAPSHOT_FILE = AD_EXPORT_DIR / "ad_snapshot.json"
+# Отметка о сбое последнего экспорта AD: снимок при сбое не меняется,
+# обработка продолжается по последнему удачному снимку
+AD_EXPORT_ERROR_FILE = AD_EXPORT_DIR / "ad_export_error.json"
+# Человекочитаемые файлы экспорта, создаются только по запросу:
+# 'txt' - ad_users_export.txt, сотрудники.txt, ГПХ.txt; 'xlsx' - ad_users_export.xlsx
+AD_EXPORT_VIEWS = []
+# Снимок полностью перестраивается не реже этого срока (в днях),
+# чтобы учесть удаленные из AD учетные записи
+AD_FULL_EXPORT_INTERVAL_DAYS = 7
+
+# Параллельный экспорт AD по разделам каталога (только быстрый режим).
+# Список OU (относительный или полный DN), '*' - все остальные контейнеры
+# верхнего уровня домена. Пустой список - один запрос на весь домен.
+# Пример: ["OU=cu_users", "OU=GPH", "*"]
+AD_PARTITIONS = []
+# Сколько разделов опрашивается одновременно
+AD_EXPORT_WORKERS = 4
+
+# Контрольная точка полного экспорта AD: полученные пользователи сохраняются
+# по мере чтения, и прерванный экспорт продолжается при следующем запуске
+AD_CHECKPOINT_DIR = AD_EXPORT_DIR / "checkpoint"
+# Более старая контрольная точка не используется, экспорт начинается заново
+AD_CHECKPOINT_MAX_AGE_HOURS = 12
+# Полный экспорт каждого раздела (или всего домена) делится на столько диапазонов
+# uSNChanged по метке изменений на начало экспорта. Диапазон - единица возобновления:
+# после сбоя повторно опрашивается только прерванный диапазон. Диапазоны опрашиваются
+# параллельно, как разделы (AD_EXPORT_WORKERS). 1 - без деления.
+# Записанные файлы вместо домена не делятся (см. ad_export.ad_partition_sources)
+AD_EXPORT_USN_RANGES = 8
+
+# Нечеткое сопоставление ФИО: пользователи для удаления, похожие на ФИО в AD
+# (опечатка, транслитерация латиницей), выводятся на лист "вероятные совпадения"
+FUZZY_MATCHING = True
+# Минимальное сходство от 0 до 1 (1 - расстояние Левенштейна / длина ФИО)
+FUZZY_MIN_SCORE = 0.85
 
 # Файлы сотрудников и ГПХ (создаются автоматически)
 EMPLOYEES_FILE = AD_EXPORT_DIR / "сотрудники.txt"
@@ -42,7 +134,10 @@ COMPARISON_SHEET = "сравнение AD и Штатки"
 KONTUR_SHEET = "Контур Диадок данные"
 DIADOC_SHEET = "Сфера Курьер данные"
 ONEC_SHEET = "1С данные"
-MAX_ROWS = 10000
+FUZZY_SHEET = "вероятные совпадения"
+CHANGES_SHEET = "изменения"
+# Предел строк на листе Excel (с заголовком); более длинные таблицы продолжаются на следующих листах
+EXCEL_MAX_ROWS = 1048576
 RED_COLOR = (255, 199, 206)
 YELLOW_COLOR = (255, 235, 156)
 
@@ -51,7 +146,12 @@ LOG_LEVEL = logging.INFO
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
 def setup_logging():
-    """Настройка логирования для всего приложения"""
+    """
+    Настройка логирования для всего приложения. Вызывается точками входа
+    (main.py, batch.py, ad_export.py), импорт config логирование не меняет
+    """
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    
     # Очищаем существующие обработчики
     for handler in logging.root.handlers[:]:
         logging.root.removeHandler(handler)
@@ -80,6 +180,3 @@ def setup_logging():
     ad_logger.addHandler(ad_console_handler)
     
     ad_logger.propagate = False
-
-# Инициализируем логирование при импорте конфига
-setup_logging()
\ No newline at end of file
@@ -1,18 +1,35 @@
 # excel_processor.py
 import pandas as pd
 import numpy as np
-from config import OUTPUT_FILE, SHEET_NAME, COMPARISON_SHEET, MAX_ROWS, EMPLOYEES_FILE, GPH_FILE
-from config import SHTAT_DIR
-from utils import replace_yo, normalize_name, find_internal_duplicates
-from utils import load_shtat_data, create_comparison_sheet
-from processors.onec_processor import process_onec_data
-from processors.kontur_processor import process_kontur_data
-from processors.diadoc_processor import process_diadoc_data
-from utils import replace_yo, normalize_name, find_internal_duplicates
-from utils import load_shtat_data, create_comparison_sheet
+from config import report_paths, SHEET_NAME, COMPARISON_SHEET, FUZZY_SHEET, EMPLOYEES_FILE, GPH_FILE
+from config import REPORT_FORMATS, RUN_DIFF_ENABLED, CHANGES_SHEET
+from ad_snapshot import load_users_table, load_export_error, status_text, EMPLOYEE, GPH
+from input_cache import cache_stats
+from utils import replace_yo
+from utils import load_shtat_data
+from processors.onec_processor import process_onec_data, ONEC_COLUMNS
+from processors.kontur_processor import process_kontur_data, KONTUR_COLUMNS
+from processors.diadoc_processor import process_diadoc_data, DIADOC_COLUMNS
+from utils import add_name_key, name_key_column, is_name_key, write_workbook, write_result_files
+from reconciliation import reconcile, tracked_results, selected_ad_sources, SERVICES, SOURCE_FIO_COLUMNS
+from run_state import load_state, merge_states, save_state, state_changes
+from metrics import stage
 import logging
 logger = logging.getLogger(__name__)
 
+# Столбцы с ФИО на основном листе
+FIO_COLUMNS = ['Штатное_ФИО', 'AD_сотрудники', 'AD_ГПХ', 'Контур_Диадок_ФИО', 'Сфера_Курьер_ФИО', '1C_ФИО']
+
+# Таблицы источников и их столбцы в порядке следования на листе "сравнение пользователей"
+SOURCE_COLUMNS = {
+    'shtat': ['Штатное_ФИО'],
+    'ad_employees': ['AD_сотрудники', 'AD_Статус_сотрудники'],
+    'ad_gph': ['AD_ГПХ', 'AD_Статус_ГПХ'],
+    'kontur': KONTUR_COLUMNS,
+    'diadoc': DIADOC_COLUMNS,
+    'onec': ONEC_COLUMNS,
+}
+
 def read_names_and_statuses_from_file(filename):
     """Чтение имен и статусов из файла в формате 'Name: ФИО' и 'Status: Статус'"""
     names = []
@@ -44,179 +61,274 @@ def read_names_and_statuses_from_file(filename):
         logger.error(f"Ошибка при чтении файла {filename}: {e}")
         return [], []
 
-def process_excel_data(selected_options=None, employee_types=None):
-    """Основная функция обработки Excel данных"""
-    if selected_options is None:
-        selected_options = {0}  # По умолчанию проверяем всё
+def load_ad_names_and_statuses():
+    """
+    Имена и статусы сотрудников и ГПХ из снимка AD.
+    Если снимка нет (например, файлы AD подготовлены вручную), читаются текстовые файлы.
+    Возвращает (имена сотрудников, статусы сотрудников, имена ГПХ, статусы ГПХ).
+    """
+    error = load_export_error()
+    if error is not None:
+        logger.warning(f"Последний экспорт AD завершился ошибкой ({error.get('failed_at')}: {error.get('error')}), "
+                       f"используются данные предыдущего экспорта")
     
-    if employee_types is None:
-        employee_types = {0}  # По умолчанию все типы сотрудников
+    users = load_users_table()
+    if users is None:
+        logger.info("Снимок AD не найден, чтение текстовых файлов сотрудников и ГПХ")
+        employees_names, employees_statuses = read_names_and_statuses_from_file(EMPLOYEES_FILE)
+        gph_names, gph_statuses = read_names_and_statuses_from_file(GPH_FILE)
+        return employees_names, employees_statuses, gph_names, gph_statuses
     
-    # Создаем новый DataFrame с нужной структурой
-    df = pd.DataFrame(index=range(MAX_ROWS), columns=[
-        'Штатное_ФИО',
-        'AD_сотрудники',
-        'AD_Статус_сотрудники',
-        'AD_ГПХ',
-        'AD_Статус_ГПХ',
-        'Контур_Диадок_ФИО',  # ← ИЗМЕНИЛ: Контур → Контур_Диадок
-        'Контур_Диадок_Администратор',  # ← ИЗМЕНИЛ
-        'Контур_Диадок_статус',  # ← ИЗМЕНИЛ
-        'Сфера_Курьер_ФИО',  # ← ИЗМЕНИЛ: Диадок → Сфера_Курьер
-        'Сфера_Курьер_Активен',  # ← ИЗМЕНИЛ
-        'Сфера_Курьер_Администратор',  # ← ИЗМЕНИЛ
-        '1C_ФИО',
-        '1C_Активен'
-    ])
-    
-    # Чтение сотрудников из AD с фильтрацией по типам
-    employees_names, employees_statuses = read_names_and_statuses_from_file(EMPLOYEES_FILE)
-    gph_names, gph_statuses = read_names_and_statuses_from_file(GPH_FILE)
-    
-    # Заполняем столбцы AD
-    df['AD_сотрудники'] = pd.Series(employees_names)
-    df['AD_Статус_сотрудники'] = pd.Series(employees_statuses)
-    df['AD_ГПХ'] = pd.Series(gph_names)
-    df['AD_Статус_ГПХ'] = pd.Series(gph_statuses)
-    
-    # Создаем объединенный DataFrame AD сотрудников для сравнения
-    ad_employees_data = []
-    
-    # Добавляем сотрудников, если выбраны
-    if 1 in employee_types or 0 in employee_types:
-        for i, name in enumerate(employees_names):
-            if i < len(employees_statuses):
-                ad_employees_data.append({'AD_ФИО': name, 'AD_Статус': employees_statuses[i]})
-    
-    # Добавляем ГПХ, если выбраны
-    if 2 in employee_types or 0 in employee_types:
-        for i, name in enumerate(gph_names):
-            if i < len(gph_statuses):
-                ad_employees_data.append({'AD_ФИО': name, 'AD_Статус': gph_statuses[i]})
-    
-    # Создаем DataFrame для сравнения
-    if ad_employees_data:
-        ad_employees_df = pd.DataFrame(ad_employees_data)
-    else:
-        ad_employees_df = pd.DataFrame(columns=['AD_ФИО', 'AD_Статус'])
-    
-    # Загружаем данные из штатного расписания
-    shtat_data = load_shtat_data()
-    if not shtat_data.empty:
-        df['Штатное_ФИО'] = pd.Series(shtat_data['Штатное_ФИО'])
-    
-    # Обработка данных из различных источников
-    df, _ = process_onec_data(df, ad_employees_df, selected_options, employee_types)
-    df, _ = process_kontur_data(df, ad_employees_df, selected_options, employee_types)
-    df, _ = process_diadoc_data(df, ad_employees_df, selected_options, employee_types)
-    
-    # Замена ё на е во всех столбцах с ФИО
-    for col in ['Штатное_ФИО', 'AD_сотрудники', 'AD_ГПХ', 'Контур_Диадок_ФИО', 'Сфера_Курьер_ФИО', '1C_ФИО']:  # ← ИЗМЕНИЛ
+    result = []
+    for category in (EMPLOYEE, GPH):
+        category_users = users[users['Category'] == category]
+        result.append(category_users['Name'].tolist())
+        result.append(category_users['Enabled'].map(status_text).tolist())
+    
+    logger.info(f"Загружено из снимка AD: {len(result[0])} сотрудников, {len(result[2])} ГПХ")
+    return tuple(result)
+
+def prepare_table(df):
+    """
+    Подготовка таблицы источника к сравнению и выгрузке: замена ё на е в ФИО,
+    пустые строки - как отсутствующие значения, ключи ФИО для всех столбцов ФИО
+    """
+    for col in FIO_COLUMNS:
         if col in df.columns:
-            df.loc[:, col] = df[col].apply(lambda x: replace_yo(x) if pd.notna(x) else x)
+            df[col] = df[col].apply(lambda x: replace_yo(x) if pd.notna(x) else x)
+            # Ключи считаются один раз на столбец (замена ё на е их не меняет)
+            if name_key_column(col) not in df.columns:
+                add_name_key(df, col)
     
+    value_columns = [col for col in df.columns if not is_name_key(col)]
+    df[value_columns] = df[value_columns].replace('', np.nan)
+    return df
+
+def assemble_users_sheet(tables):
+    """
+    Лист "сравнение пользователей": таблицы источников рядом друг с другом.
+    Собирается только при выгрузке; строк столько, сколько в самой длинной таблице,
+    столбцы невыбранных источников остаются пустыми
+    """
+    parts = []
+    for name, columns in SOURCE_COLUMNS.items():
+        table = tables.get(name)
+        if table is None:
+            table = pd.DataFrame(columns=columns)
+        parts.append(table[columns].reset_index(drop=True))
+    
+    sheet = pd.concat(parts, axis=1)
     # Удаляем полностью пустые строки
-    df = df.replace('', np.nan).dropna(how='all')
+    return sheet.dropna(how='all')
+
+def users_sheet_highlighting(sheet, results, shtat_loaded=True):
+    """
+    Подсветка листа "сравнение пользователей" по результатам сверки (для write_workbook):
+    красным - внутренние дубликаты в системах, желтым - пользователи для удаления
+    и расхождения AD со штатным расписанием. Строка листа соответствует записи
+    с тем же номером в таблице источника, поэтому маски строятся по номерам записей.
+    """
+    def rows_mask(rows):
+        mask = np.zeros(len(sheet), dtype=bool)
+        mask[sheet.index.get_indexer(rows)] = True
+        return mask
     
-    # Сохранение основного листа
-    df.to_excel(OUTPUT_FILE, sheet_name=SHEET_NAME, index=False)
+    highlighting = []
+    if shtat_loaded:
+        highlighting.append(('AD_сотрудники', rows_mask(results['missing_in_shtat']), 'yellow'))
+        highlighting.append(('Штатное_ФИО', rows_mask(results['missing_in_ad']), 'yellow'))
+    for service in SERVICES:
+        suffix = service['result_suffix']
+        if f'duplicates_{suffix}' not in results:
+            continue
+        fio_col = SOURCE_FIO_COLUMNS[service['source']]
+        highlighting.append((fio_col, rows_mask(results[f'users_to_remove_{suffix}'].index), 'yellow'))
+        highlighting.append((fio_col, rows_mask(results[f'duplicates_{suffix}'].index), 'red'))
+    return highlighting
+
+def comparison_table(missing_in_shtat, employees_names, missing_in_ad, shtat_names):
+    """
+    Расхождения AD и Штатного расписания: сотрудники AD, ФИО которых нет в штатном расписании,
+    и сотрудники из штатного расписания без учетной записи в AD.
+    missing_in_shtat и missing_in_ad - номера записей в списке сотрудников AD и в штатном
+    расписании (по одной на человека), ФИО выводится в исходном написании.
+    """
+    return pd.concat([
+        pd.DataFrame({
+            'ФИО': pd.Series(employees_names, dtype=object).iloc[missing_in_shtat].to_numpy(),
+            'Статус': 'Активен в AD, но отсутствует в штатном расписании',
+        }),
+        pd.DataFrame({
+            'ФИО': pd.Series(shtat_names, dtype=object).iloc[missing_in_ad].to_numpy(),
+            'Статус': 'Есть в штатном расписании, но отсутствует в AD',
+        }),
+    ], ignore_index=True)
+
+def changes_table(changes):
+    """
+    Изменения с прошлого запуска для листа "изменения" (см. run_state.state_changes):
+    вид изменения, набор результатов - по названию его листа, ФИО
+    """
+    titles = {
+        'missing_in_shtat': 'в AD, но не в штатном расписании',
+        'missing_in_ad': 'в штатном расписании, но не в AD',
+    }
+    for service in SERVICES:
+        titles[f"users_to_remove_{service['result_suffix']}"] = service['remove_sheet']
+        titles[f"duplicates_{service['result_suffix']}"] = service['duplicates_sheet']
+    return pd.DataFrame({
+        'Изменение': changes['изменение'].to_numpy(),
+        'Набор': changes['набор'].map(titles).to_numpy(),
+        'ФИО': changes['ФИО'].to_numpy(),
+    })
+
+def result_sets(results, employees_names, shtat_names=None, changes=None):
+    """
+    Наборы результатов сверки в порядке листов: {имя набора: (имя листа, DataFrame)}.
+    Имя набора - ключ results (duplicates_1c, users_to_remove_1c, ...), для расхождений
+    AD и штатного расписания - ad_shtat_mismatches (если штатное расписание загружено),
+    для изменений с прошлого запуска - changes (если есть состояние прошлого запуска).
+    """
+    sets = {}
+    if shtat_names is not None:
+        sets['ad_shtat_mismatches'] = (COMPARISON_SHEET, comparison_table(
+            results['missing_in_shtat'], employees_names, results['missing_in_ad'], shtat_names))
     
-    # Создание листа сравнения AD и Штатного расписания
-    shtat_names = shtat_data['Штатное_ФИО'].tolist() if not shtat_data.empty else []
-    comparison_count = create_comparison_sheet(employees_names, shtat_names, OUTPUT_FILE)
+    for service in SERVICES:
+        suffix = service['result_suffix']
+        if f'duplicates_{suffix}' not in results:
+            continue
+        sets[f'duplicates_{suffix}'] = (service['duplicates_sheet'], results[f'duplicates_{suffix}'])
+        sets[f'users_to_remove_{suffix}'] = (service['remove_sheet'], results[f'users_to_remove_{suffix}'])
     
-    # Создаем набор всех AD имен для сравнения
-    all_ad_names = set()
-    for col in ['AD_сотрудники', 'AD_ГПХ']:
-        if col in df.columns:
-            names = df[col].dropna().apply(normalize_name)
-            all_ad_names.update(names)
-    
-    # Сохранение результатов в отдельные листы
-    with pd.ExcelWriter(OUTPUT_FILE, engine='openpyxl', mode='a') as writer:
-        # Обрабатываем каждый сервис
-        services = [
-            {
-                'name': 'Контур Диадок',  # ← ИЗМЕНИЛ
-                'fio_col': 'Контур_Диадок_ФИО',  # ← ИЗМЕНИЛ
-                'status_col': 'Контур_Диадок_статус',  # ← ИЗМЕНИЛ
-                'active_value': 'активна',
-                'remove_sheet': 'удалить из Контур Диадок',  # ← ИЗМЕНИЛ
-                'duplicates_sheet': 'дубли в Контур Диадок'  # ← ИЗМЕНИЛ
-            },
-            {
-                'name': 'Сфера Курьер',  # ← ИЗМЕНИЛ
-                'fio_col': 'Сфера_Курьер_ФИО',  # ← ИЗМЕНИЛ
-                'status_col': 'Сфера_Курьер_Активен',  # ← ИЗМЕНИЛ
-                'active_value': 'Да',
-                'remove_sheet': 'удалить из Сфера Курьер',  # ← ИЗМЕНИЛ
-                'duplicates_sheet': 'дубли в Сфера Курьер'  # ← ИЗМЕНИЛ
-            },
-            {
-                'name': '1С',
-                'fio_col': '1C_ФИО',
-                'status_col': '1C_Активен',
-                'active_value': 'Да',
-                'remove_sheet': 'удалить из 1С',
-                'duplicates_sheet': 'дубли в 1С'
-            }
-        ]
+    if results.get('probable_matches') is not None:
+        sets['probable_matches'] = (FUZZY_SHEET, results['probable_matches'])
+    if changes is not None:
+        sets['changes'] = (CHANGES_SHEET, changes_table(changes))
+    return sets
+
+def result_sheets(sets):
+    """
+    Листы результатов сверки в порядке следования: {имя листа: DataFrame}.
+    Листы сравнения AD и Штатного расписания и изменений выводятся всегда, пустые листы
+    дубликатов, удаления и вероятных совпадений - нет.
+    """
+    sheets = {}
+    for sheet_name, df in sets.values():
+        if df.empty and sheet_name not in (COMPARISON_SHEET, CHANGES_SHEET):
+            logger.debug(f"Нет данных для листа {sheet_name}")
+            continue
+        sheets[sheet_name] = df
+        logger.info(f"Лист {sheet_name}: {len(df)} записей")
+    return sheets
+
+def process_excel_data(selected_options=None, employee_types=None, sources=None, report_formats=None,
+                       started_at=None):
+    """
+    Основная функция обработки Excel данных.
+    sources: заранее загруженные таблицы источников {'shtat', 'onec', 'diadoc', 'kontur'}
+    (см. source_loader.load_sources), недостающие загружаются здесь.
+    report_formats: форматы результатов (по умолчанию REPORT_FORMATS из config)
+    started_at: время запуска для имен файлов результатов (по умолчанию - текущее)
+    """
+    if report_formats is None:
+        report_formats = REPORT_FORMATS
+    if selected_options is None:
+        selected_options = {0}  # По умолчанию проверяем всё
+    
+    if employee_types is None:
+        employee_types = {0}  # По умолчанию все типы сотрудников
+    
+    if sources is None:
+        sources = {}
+    
+    # Каждый источник хранится в отдельной таблице своего размера,
+    # общий лист собирается только при выгрузке
+    tables = {}
+    
+    with stage('ad_tables') as span:
+        # Чтение сотрудников из AD с фильтрацией по типам
+        employees_names, employees_statuses, gph_names, gph_statuses = load_ad_names_and_statuses()
         
-        for service in services:
-            fio_col = service['fio_col']
-            status_col = service['status_col']
-            active_value = service['active_value']
-            remove_sheet = service['remove_sheet']
-            duplicates_sheet = service['duplicates_sheet']
-            
-            # Пропускаем если столбцы не существуют
-            if fio_col not in df.columns:
-                logger.debug(f"Пропускаем {service['name']}: столбец {fio_col} не найден")
-                continue
-            
-            # 1. Поиск и сохранение дубликатов
-            service_fio_data = df[[fio_col]].dropna(subset=[fio_col])
-            duplicates = find_internal_duplicates(service_fio_data, fio_col)
-            if duplicates:
-                duplicate_df = service_fio_data[service_fio_data[fio_col].apply(normalize_name).isin(duplicates)]
-                if not duplicate_df.empty:
-                    duplicate_df.to_excel(writer, sheet_name=duplicates_sheet, index=False)
-                    logger.info(f"Создан лист {duplicates_sheet} с {len(duplicate_df)} записями")
-            
-            # 2. Поиск и сохранение пользователей для удаления
-            if status_col not in df.columns:
-                logger.debug(f"Пропускаем {remove_sheet}: столбец {status_col} не найден")
-                continue
-                
-            # Берем только строки с заполненным ФИО
-            service_data = df[[fio_col, status_col]].dropna(subset=[fio_col])
-            # Приводим статус к строке и обрезаем пробелы
-            service_data.loc[:, status_col] = service_data[status_col].astype(str).str.strip()
-            
-            # Фильтруем: активные пользователи, которых нет в AD
-            mask = (service_data[status_col].str.lower() == active_value.lower()) & \
-                (~service_data[fio_col].apply(normalize_name).isin(all_ad_names))
-            users_to_remove = service_data[mask]
-            
-            if not users_to_remove.empty:
-                users_to_remove.to_excel(writer, sheet_name=remove_sheet, index=False)
-                logger.info(f"Создан лист {remove_sheet} с {len(users_to_remove)} записями")
-            else:
-                logger.debug(f"Нет данных для листа {remove_sheet}")
+        # Таблицы AD
+        tables['ad_employees'] = pd.DataFrame({
+            'AD_сотрудники': pd.Series(employees_names, dtype=object),
+            'AD_Статус_сотрудники': pd.Series(employees_statuses, dtype=object),
+        })
+        tables['ad_gph'] = pd.DataFrame({
+            'AD_ГПХ': pd.Series(gph_names, dtype=object),
+            'AD_Статус_ГПХ': pd.Series(gph_statuses, dtype=object),
+        })
         
-        # Дополнительная проверка для Контур Диадок
-        if 'Контур_Диадок_ФИО' in df.columns and 'Контур_Диадок_статус' in df.columns:  # ← ИЗМЕНИЛ
-            kontur_data = df[['Контур_Диадок_ФИО', 'Контур_Диадок_статус']].dropna(subset=['Контур_Диадок_ФИО'])  # ← ИЗМЕНИЛ
-            kontur_data.loc[:, 'Контур_Диадок_статус'] = kontur_data['Контур_Диадок_статус'].astype(str).str.strip()  # ← ИЗМЕНИЛ
-            
-            # Проверяем, есть ли активные пользователи в Контур Диадок
-            active_kontur_users = kontur_data[kontur_data['Контур_Диадок_статус'].str.lower() == 'активна']  # ← ИЗМЕНИЛ
-            logger.debug(f"Активных пользователей в Контур Диадок: {len(active_kontur_users)}")  # ← ИЗМЕНИЛ
-            
-            # Проверяем, сколько из них нет в AD
-            kontur_users_not_in_ad = active_kontur_users[
-                ~active_kontur_users['Контур_Диадок_ФИО'].apply(normalize_name).isin(all_ad_names)  # ← ИЗМЕНИЛ
-            ]
-            logger.debug(f"Активных пользователей в Контур Диадок, которых нет в AD: {len(kontur_users_not_in_ad)}")  # ← ИЗМЕНИЛ
+        # Есть ли учетные записи AD выбранных типов сотрудников, с которыми сверяются системы
+        ad_available = any(not tables[source].empty for source in selected_ad_sources(employee_types))
+        span['rows'] = len(employees_names) + len(gph_names)
+    
+    with stage('prepare_sources') as span:
+        # Загружаем данные из штатного расписания
+        shtat_data = sources['shtat'] if 'shtat' in sources else load_shtat_data()
+        if not shtat_data.empty:
+            tables['shtat'] = shtat_data[['Штатное_ФИО']].reset_index(drop=True)
+        
+        # Обработка данных из различных источников
+        tables = process_onec_data(tables, ad_available, selected_options, sources.get('onec'))
+        tables = process_kontur_data(tables, ad_available, selected_options, sources.get('kontur'))
+        tables = process_diadoc_data(tables, ad_available, selected_options, sources.get('diadoc'))
         
-    return {'comparison_count': comparison_count}
\ No newline at end of file
+        # Замена ё на е во всех столбцах с ФИО
+        for table in tables.values():
+            prepare_table(table)
+        span['rows'] = sum(len(table) for table in tables.values())
+    
+    # Сверка всех источников по одной матрице присутствия
+    with stage('reconcile', rows=sum(len(table) for table in tables.values())):
+        results = reconcile(tables, employee_types)
+    shtat_names = shtat_data['Штатное_ФИО'] if not shtat_data.empty else None
+    
+    # Изменения с прошлого запуска: сравнение с сохраненным состоянием по ключам ФИО
+    with stage('run_diff') as span:
+        state = tracked_results(results, tables)
+        changes = None
+        previous = None
+        if RUN_DIFF_ENABLED:
+            previous = load_state()
+            if previous is not None:
+                changes = state_changes(previous[0], state)
+        span['rows'] = len(state)
+    sets = result_sets(results, employees_names, shtat_names, changes)
+    
+    output_file, report_data_dir = report_paths(started_at)
+    report_files = []
+    if 'xlsx' in report_formats:
+        # Все листы собираются в памяти и записываются в файл за один раз
+        with stage('assemble_sheets') as span:
+            sheets = {SHEET_NAME: assemble_users_sheet(tables)}
+            sheets.update(result_sheets(sets))
+            highlighting = {SHEET_NAME: users_sheet_highlighting(sheets[SHEET_NAME], results, shtat_names is not None)}
+            span['rows'] = sum(len(df) for df in sheets.values())
+        with stage('write_xlsx', rows=sum(len(df) for df in sheets.values())):
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            write_workbook(sheets, output_file, highlighting=highlighting)
+        report_files.append(output_file)
+    
+    # Наборы результатов в машиночитаемых форматах (для скриптов удаления учетных записей)
+    with stage('write_result_files', rows=sum(len(df) for _, df in sets.values())):
+        report_files += write_result_files({name: df for name, (_, df) in sets.items()}, report_data_dir, report_formats)
+    
+    if RUN_DIFF_ENABLED:
+        with stage('save_state', rows=len(state)):
+            # Наборы систем, не выбранных в этом запуске, остаются базой для следующего
+            save_state(merge_states(previous[0] if previous else None, state), report_files)
+    
+    missing_in_shtat_count = len(results['missing_in_shtat']) if shtat_names is not None else 0
+    missing_in_ad_count = len(results['missing_in_ad']) if shtat_names is not None else 0
+    
+    logger.info(f"Кэш исходных файлов: попаданий {cache_stats['hits']}, промахов {cache_stats['misses']}")
+    summary = {key: value for key, value in results.items()
+               if key.startswith(('duplicates_ad_', 'internal_duplicates_', 'users_to_remove_'))}
+    summary.update(comparison_count=missing_in_shtat_count + missing_in_ad_count,
+                   missing_in_shtat_count=missing_in_shtat_count, missing_in_ad_count=missing_in_ad_count,
+                   cache=dict(cache_stats), report_files=[str(path) for path in report_files],
+                   probable_matches=len(results.get('probable_matches', ())),
+                   changes=None if changes is None else changes['изменение'].value_counts().to_dict())
+    return summary
\ No newline at end of file
@@ -0,0 +1,104 @@
+# fuzzy_match.py
+import re
+import logging
+import pandas as pd
+from config import FUZZY_MIN_SCORE
+
+logger = logging.getLogger(__name__)
+
+# Латинское написание (логины 1С) переводится в кириллицу: сначала буквосочетания, затем буквы.
+# Каждая буква кириллицы остается одним символом, поэтому опечатка - одна правка
+LATIN_TO_CYRILLIC = [
+    ('SHCH', 'Щ'), ('SCH', 'Щ'), ('SH', 'Ш'), ('CH', 'Ч'), ('ZH', 'Ж'), ('KH', 'Х'), ('TS', 'Ц'),
+    ('TC', 'Ц'), ('YU', 'Ю'), ('IU', 'Ю'), ('YA', 'Я'), ('IA', 'Я'), ('YO', 'Е'), ('X', 'КС'),
+]
+LATIN_LETTERS = str.maketrans({
+    'A': 'А', 'B': 'Б', 'C': 'Ц', 'D': 'Д', 'E': 'Е', 'F': 'Ф', 'G': 'Г', 'H': 'Х', 'I': 'И',
+    'J': 'Й', 'K': 'К', 'L': 'Л', 'M': 'М', 'N': 'Н', 'O': 'О', 'P': 'П', 'Q': 'К', 'R': 'Р',
+    'S': 'С', 'T': 'Т', 'U': 'У', 'V': 'В', 'W': 'В', 'Y': 'Ы', 'Z': 'З',
+})
+
+# Буквы, которые пишут по-разному (Алексей/Алексеи/Aleksey, Эдуард/Edward)
+CYRILLIC_FOLDING = str.maketrans({'Й': 'И', 'Ы': 'И', 'Ё': 'Е', 'Э': 'Е', 'Ь': None, 'Ъ': None})
+
+def fuzzy_key(key):
+    """
+    Ключ для нечеткого сравнения: нормализованное ФИО кириллицей (латиница
+    транслитерируется) без букв, которые пишут по-разному; разделители
+    (точки, подчеркивания) - пробелы
+    """
+    text = str(key).upper()
+    for latin, cyrillic in LATIN_TO_CYRILLIC:
+        text = text.replace(latin, cyrillic)
+    text = text.translate(LATIN_LETTERS).translate(CYRILLIC_FOLDING)
+    return ' '.join(re.sub(r'[^А-Я0-9]+', ' ', text).split())
+
+def deletion_variants(text):
+    """Строка и все ее варианты без одного символа - ключи блокирующего индекса"""
+    return {text} | {text[:i] + text[i + 1:] for i in range(len(text))}
+
+def levenshtein(a, b):
+    """Расстояние Левенштейна (для коротких строк - кандидатов из индекса)"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+def similarity(a, b):
+    """Сходство ключей от 0 до 1: 1 - расстояние Левенштейна / длина большего"""
+    if not a and not b:
+        return 1.0
+    return 1 - levenshtein(a, b) / max(len(a), len(b))
+
+def build_fuzzy_index(keys):
+    """
+    Блокирующий индекс по ключам ФИО: {вариант без одного символа: ключи для нечеткого сравнения}
+    и {ключ для нечеткого сравнения: исходные ключи}. Кандидатами для ФИО становятся
+    только ключи с общим вариантом - это все ключи на расстоянии одной правки
+    (замена, вставка, удаление, перестановка соседних букв) после транслитерации,
+    поэтому сравнение близко к линейному, а не попарному.
+    """
+    originals = {}
+    for key in pd.unique(pd.Series(keys, dtype=object).dropna()):
+        originals.setdefault(fuzzy_key(key), []).append(key)
+
+    blocks = {}
+    for folded in originals:
+        for variant in deletion_variants(folded):
+            blocks.setdefault(variant, set()).add(folded)
+    return blocks, originals
+
+def find_probable_matches(query_keys, index, min_score=FUZZY_MIN_SCORE):
+    """
+    Вероятные совпадения ключей query_keys с ключами индекса build_fuzzy_index.
+    Для каждого ключа - лучший кандидат со сходством не ниже min_score
+    (точные совпадения ключей не считаются).
+    Возвращает DataFrame со столбцами 'ключ', 'ключ_совпадения', 'сходство'.
+    """
+    blocks, originals = index
+    matches = []
+    for key in pd.unique(pd.Series(query_keys, dtype=object).dropna()):
+        folded = fuzzy_key(key)
+        if not folded:
+            continue
+
+        candidates = set()
+        for variant in deletion_variants(folded):
+            candidates.update(blocks.get(variant, ()))
+
+        scored = []
+        for candidate in candidates:
+            score = similarity(folded, candidate)
+            if score >= min_score:
+                scored.extend((score, original) for original in originals[candidate] if original != key)
+        if scored:
+            # Лучшее сходство, при равенстве - первый по алфавиту (результат не зависит от порядка)
+            score, original = min(scored, key=lambda item: (-item[0], item[1]))
+            matches.append({'ключ': key, 'ключ_совпадения': original, 'сходство': round(score, 3)})
+
+    return pd.DataFrame(matches, columns=['ключ', 'ключ_совпадения', 'сходство'])
@@ -0,0 +1,190 @@
+# input_cache.py
+import os
+import sys
+import json
+import argparse
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from config import INPUT_CACHE_DIR, INPUT_CACHE_ENABLED, INPUT_CACHE_MAX_MB, INPUT_CACHE_HASH_CONTENT, setup_logging
+from table_store import read_table, remove_table, table_file, write_table
+
+logger = logging.getLogger(__name__)
+
+# Увеличивается при изменении формата кэша, старые записи при этом не используются
+CACHE_VERSION = 3
+
+# Файлы прежних версий кэша (общий индекс и таблицы pickle), удаляются при сбросе кэша
+LEGACY_PATTERNS = ("index.json", "*.pkl")
+
+# Счетчики обращений к кэшу за время работы программы
+cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+def file_fingerprint(file_path, hash_content=INPUT_CACHE_HASH_CONTENT):
+    """
+    Отпечаток исходного файла: путь, размер и время изменения,
+    при hash_content - еще и SHA-256 содержимого (если mtime ненадежен, например после копирования)
+    """
+    stat = file_path.stat()
+    fingerprint = {
+        'path': str(file_path.resolve()),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+    if hash_content:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+def _load_entry(cache_dir, key):
+    """Описание записи кэша из ее файла метаданных или None, если записи нет"""
+    meta_file = cache_dir / f"{key}.json"
+    if not meta_file.exists():
+        return None
+
+    try:
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Не удалось прочитать запись кэша {meta_file}: {e}")
+        return None
+
+    if entry.get('version') != CACHE_VERSION:
+        return None
+    return entry
+
+def _load_entries(cache_dir):
+    """Все записи кэша: {ключ: описание записи}"""
+    if not cache_dir.exists():
+        return {}
+    entries = {}
+    for meta_file in cache_dir.glob("*.json"):
+        entry = _load_entry(cache_dir, meta_file.stem)
+        if entry is not None:
+            entries[meta_file.stem] = entry
+    return entries
+
+def _save_entry(cache_dir, key, entry):
+    """
+    Атомарная запись метаданных записи кэша. У каждой записи свой файл рядом с таблицей,
+    поэтому источники, загружаемые параллельно в разных процессах, не перезаписывают
+    изменения друг друга, как было бы с общим индексом
+    """
+    meta_file = cache_dir / f"{key}.json"
+    tmp_file = meta_file.with_name(f"{meta_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(dict(entry, version=CACHE_VERSION), f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, meta_file)
+
+def _remove_entry(cache_dir, entries, key):
+    """Удаление записи кэша: сначала метаданные, затем таблица"""
+    entries.pop(key, None)
+    (cache_dir / f"{key}.json").unlink(missing_ok=True)
+    remove_table(cache_dir / key)
+
+def _evict(cache_dir, entries, max_bytes):
+    """Вытеснение давно не использованных записей, пока кэш больше max_bytes"""
+    total = sum(entry['bytes'] for entry in entries.values())
+    for key in sorted(entries, key=lambda key: entries[key]['last_used']):
+        if total <= max_bytes:
+            break
+        total -= entries[key]['bytes']
+        logger.debug(f"Вытеснена запись кэша: {entries[key]['source']} ({entries[key]['path']})")
+        _remove_entry(cache_dir, entries, key)
+        cache_stats['evictions'] += 1
+
+def load_cached(source, file_path, parse, parser_version=1, cache_dir=INPUT_CACHE_DIR,
+                enabled=INPUT_CACHE_ENABLED, max_mb=INPUT_CACHE_MAX_MB):
+    """
+    Загрузка разобранной таблицы источника source из файла file_path.
+    Если файл не изменился с прошлого разбора, таблица берется из кэша,
+    иначе вызывается parse(file_path) и результат сохраняется в кэш.
+    parser_version: версия разбора (константа рядом с функцией parse), увеличивается
+    при исправлении разбора - таблицы, разобранные прежней версией, не используются.
+    """
+    if not enabled:
+        return parse(file_path)
+
+    fingerprint = file_fingerprint(file_path)
+    # Ключ учитывает функцию разбора и ее версию: другой разбор того же файла кэшируется отдельно
+    key_data = dict(fingerprint, source=source, parser=f"{parse.__module__}.{parse.__qualname__}",
+                    parser_version=parser_version)
+    key = hashlib.sha1(json.dumps(key_data, sort_keys=True).encode('utf-8')).hexdigest()
+
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = _load_entry(cache_dir, key)
+        if entry is not None:
+            df = read_table(cache_dir / key, entry['table'])
+            entry['last_used'] = datetime.now().isoformat()
+            _save_entry(cache_dir, key, entry)
+            cache_stats['hits'] += 1
+            logger.info(f"Кэш: {source} ({file_path.name}) загружен без разбора Excel, {len(df)} записей")
+            return df
+    except Exception as e:
+        logger.warning(f"Ошибка чтения кэша для {source}: {e}")
+
+    cache_stats['misses'] += 1
+    logger.info(f"Кэш: нет актуальной записи для {source} ({file_path.name}), выполняется разбор файла")
+    df = parse(file_path)
+
+    try:
+        # Пока шел разбор, записи могли добавить параллельные загрузки других источников
+        entries = _load_entries(cache_dir)
+        # Устаревшие записи того же источника и файла больше не понадобятся
+        for old_key in [old_key for old_key, entry in entries.items()
+                        if old_key != key and entry['source'] == source and entry['path'] == fingerprint['path']]:
+            _remove_entry(cache_dir, entries, old_key)
+
+        # Таблица пишется до метаданных: запись без таблицы не появляется
+        table = write_table(df, cache_dir / key)
+        entries[key] = dict(
+            fingerprint,
+            source=source,
+            table=table,
+            bytes=table_file(cache_dir / key, table).stat().st_size,
+            last_used=datetime.now().isoformat(),
+        )
+        _save_entry(cache_dir, key, entries[key])
+        _evict(cache_dir, entries, max_mb * 1024 * 1024)
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить {source} в кэш: {e}")
+
+    return df
+
+def invalidate_cache(source=None, cache_dir=INPUT_CACHE_DIR):
+    """
+    Явный сброс кэша: записи источника source или весь кэш.
+    Возвращает количество удаленных записей.
+    """
+    entries = _load_entries(cache_dir)
+    keys = [key for key, entry in entries.items() if source is None or entry['source'] == source]
+    for key in keys:
+        _remove_entry(cache_dir, entries, key)
+    if source is None and cache_dir.exists():
+        for pattern in LEGACY_PATTERNS:
+            for legacy_file in cache_dir.glob(pattern):
+                legacy_file.unlink(missing_ok=True)
+
+    logger.info(f"Кэш: удалено записей - {len(keys)}" + (f" (источник {source})" if source else ""))
+    return len(keys)
+
+if __name__ == "__main__":
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Кэш разобранных исходных файлов")
+    parser.add_argument('--clear', nargs='?', const='', metavar='ИСТОЧНИК',
+                        help="сбросить кэш целиком или только источника (kontur, diadoc, shtat, onec)")
+    args = parser.parse_args()
+    
+    if args.clear is not None:
+        invalidate_cache(args.clear or None)
+    else:
+        entries = _load_entries(INPUT_CACHE_DIR)
+        if not entries:
+            sys.exit("Кэш пуст")
+        for entry in sorted(entries.values(), key=lambda entry: entry['source']):
+            print(f"{entry['source']:8} {entry['bytes'] / 1024:8.0f} КБ  {entry['last_used'][:19]}  {entry['path']}")
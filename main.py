@@ -1,8 +1,8 @@
 # main.py
 import logging
-import pandas as pd
-from config import INPUT_DIR, OUTPUT_DIR, OUTPUT_FILE
-from excel_processor import process_excel_data
+from datetime import datetime
+from config import setup_logging, ensure_directories, metrics_file, METRICS_ENABLED
+import metrics
 from ad_export import export_ad_users
 
 # Получаем логгер для этого модуля
@@ -65,49 +65,118 @@ def get_employee_type_choice():
         else:
             print("Некорректный ввод. Пожалуйста, используйте цифры 0, 1, 2 через пробел")
 
-def main():
-    logger.info("Запуск обработки данных")
-    
-    # Получаем выбор пользователя
-    selected_options = get_user_choice()
-    selected_employee_types = get_employee_type_choice()
-    logger.info(f"Выбранные опции: {selected_options}")
-    logger.info(f"Выбранные типы сотрудников: {selected_employee_types}")
-    
-    # Экспорт данных из AD (всегда выполняется)
+def run_ad_export(source=None):
+    """
+    Экспорт данных из AD; при ошибке обработка продолжается с пустыми данными.
+    source: записанный вывод PowerShell, LDIF файл или каталог разделов вместо домена
+    """
     try:
-        logger.info("Экспорт пользователей из Active Directory")
-        total_users, employees_count, gph_count = export_ad_users()
+        total_users, employees_count, gph_count = export_ad_users(source)
         logger.info(f"Экспорт AD завершен: {total_users} пользователей, {employees_count} сотрудников, {gph_count} ГПХ")
+        return total_users, employees_count, gph_count
     except Exception as e:
         logger.error(f"Ошибка при экспорте из AD: {e}")
         logger.info("Продолжение обработки с пустыми данными AD")
-        total_users, employees_count, gph_count = 0, 0, 0
+        return 0, 0, 0
+
+def log_results(results, selected_options):
+    """Итоги обработки в лог"""
+    logger.info("Обработка завершена. Результаты:")
+    if 1 in selected_options or 0 in selected_options:
+        logger.info(f"- Дубликаты между AD и 1С: {results.get('duplicates_ad_1c', 0)}")
+        logger.info(f"- Внутренние дубликаты в 1С: {results.get('internal_duplicates_1c', 0)}")
+        logger.info(f"- Пользователей для удаления из 1С: {len(results.get('users_to_remove_1c', ()))}")
+    if 2 in selected_options or 0 in selected_options:
+        logger.info(f"- Дубликаты между AD и Сфера Курьер: {results.get('duplicates_ad_diadoc', 0)}")  # ← ИЗМЕНИЛ
+        logger.info(f"- Внутренние дубликаты в Сфере Курьер: {results.get('internal_duplicates_diadoc', 0)}")  # ← ИЗМЕНИЛ
+        logger.info(f"- Пользователей для удаления из Сферы Курьер: {len(results.get('users_to_remove_diadoc', ()))}")  # ← ИЗМЕНИЛ
+    if 3 in selected_options or 0 in selected_options:
+        logger.info(f"- Дубликаты между AD и Контур Диадок: {results.get('duplicates_ad_kontur', 0)}")  # ← ИЗМЕНИЛ
+        logger.info(f"- Внутренние дубликаты в Контур Диадок: {results.get('internal_duplicates_kontur', 0)}")  # ← ИЗМЕНИЛ
+        logger.info(f"- Пользователей для удаления из Контур Диадок: {len(results.get('users_to_remove_kontur', ()))}")  # ← ИЗМЕНИЛ
+    logger.info(f"- Несоответствий между AD и Штатным расписанием: {results.get('comparison_count', 0)}")
+    logger.info(f"  - в AD, но не в штатном расписании: {results.get('missing_in_shtat_count', 0)}")
+    logger.info(f"  - в штатном расписании, но не в AD: {results.get('missing_in_ad_count', 0)}")
+    logger.info(f"- Вероятных совпадений с AD среди пользователей для удаления: {results.get('probable_matches', 0)}")
+    changes = results.get('changes')
+    if changes is not None:
+        logger.info(f"- Изменений с прошлого запуска: новых {changes.get('новое', 0)}, устранено {changes.get('устранено', 0)}")
+
+def write_metrics_file(started_at, selected_options, selected_employee_types, results, error):
+    """Метрики этапов запуска в JSON (см. metrics.write_metrics)"""
+    return metrics.write_metrics(
+        metrics_file(started_at),
+        started_at=started_at.isoformat(timespec='seconds'),
+        selected_options=sorted(selected_options),
+        selected_employee_types=sorted(selected_employee_types),
+        report_files=results.get('report_files', []),
+        error=error,
+    )
+
+def process(selected_options, selected_employee_types, report_formats=None, ad_export=True, ad_source=None):
+    """
+    Экспорт AD, загрузка источников и обработка для выбранных опций.
+    ad_export=False - без экспорта, по сохраненному снимку AD;
+    ad_source - экспорт из записанного источника вместо домена (см. run_ad_export).
+    Возвращает сведения о запуске: результаты экспорта AD ('ad', None без экспорта),
+    строки и время загрузки источников, итоги обработки ('results'),
+    текст ошибки обработки ('error', None при успехе) и файл метрик этапов ('metrics_file')
+    """
+    started_at = datetime.now()
+    metrics.reset()
+    logger.info(f"Выбранные опции: {selected_options}")
+    logger.info(f"Выбранные типы сотрудников: {selected_employee_types}")
+    
+    # pandas и openpyxl загружаются только для обработки, а не при запуске диалога
+    from excel_processor import process_excel_data
+    from source_loader import load_sources
+    
+    # Экспорт данных из AD и загрузка исходных файлов, при PARALLEL_LOADING - одновременно
+    logger.info("Экспорт пользователей из Active Directory и загрузка исходных файлов")
+    with metrics.stage('load_sources') as span:
+        ad_result, sources, timings = load_sources(selected_options, (lambda: run_ad_export(ad_source)) if ad_export else None)
+        span['rows'] = sum(len(df) for df in sources.values())
     
     # Обработка Excel данных
+    results = {}
+    error = None
     try:
         logger.info("Обработка Excel данных")
-        results = process_excel_data(selected_options, selected_employee_types)
-        
-        logger.info("Обработка завершена. Результаты:")
-        if 1 in selected_options or 0 in selected_options:
-            logger.info(f"- Дубликаты между AD и 1С: {results.get('duplicates_ad_1c', 0)}")
-            logger.info(f"- Внутренние дубликаты в 1С: {results.get('internal_duplicates_1c', 0)}")
-            logger.info(f"- Пользователей для удаления из 1С: {len(results.get('users_to_remove_1c', pd.DataFrame()))}")
-        if 2 in selected_options or 0 in selected_options:
-            logger.info(f"- Дубликаты между AD и Сфера Курьер: {results.get('duplicates_ad_diadoc', 0)}")  # ← ИЗМЕНИЛ
-            logger.info(f"- Внутренние дубликаты в Сфере Курьер: {results.get('internal_duplicates_diadoc', 0)}")  # ← ИЗМЕНИЛ
-            logger.info(f"- Пользователей для удаления из Сферы Курьер: {len(results.get('users_to_remove_diadoc', pd.DataFrame()))}")  # ← ИЗМЕНИЛ
-        if 3 in selected_options or 0 in selected_options:
-            logger.info(f"- Дубликаты между AD и Контур Диадок: {results.get('duplicates_ad_kontur', 0)}")  # ← ИЗМЕНИЛ
-            logger.info(f"- Внутренние дубликаты в Контур Диадок: {results.get('internal_duplicates_kontur', 0)}")  # ← ИЗМЕНИЛ
-            logger.info(f"- Пользователей для удаления из Контур Диадок: {len(results.get('users_to_remove_kontur', pd.DataFrame()))}")  # ← ИЗМЕНИЛ
-        logger.info(f"- Несоответствий между AD и Штатным расписанием: {results.get('comparison_count', 0)}")
-        
+        with metrics.stage('processing'):
+            results = process_excel_data(selected_options, selected_employee_types, sources, report_formats, started_at)
+        log_results(results, selected_options)
     except Exception as e:
         logger.error(f"Ошибка при обработке Excel: {str(e)}")
+        error = str(e)
+    
+    for path in results.get('report_files', []):
+        logger.info(f"Результаты сохранены в файл: {path}")
+    
+    # Время, CPU, строки и память по этапам - в папку логов рядом с отчетом
+    metrics_path = None
+    if METRICS_ENABLED:
+        metrics_path = write_metrics_file(started_at, selected_options, selected_employee_types, results, error)
+    
+    return {
+        'ad': ad_result,
+        'source_rows': {name: len(df) for name, df in sources.items()},
+        'load_timings': timings,
+        'results': results,
+        'error': error,
+        'metrics_file': metrics_path,
+    }
+
+def main():
+    logger.info("Запуск обработки данных")
+    
+    # Получаем выбор пользователя
+    selected_options = get_user_choice()
+    selected_employee_types = get_employee_type_choice()
     
-    logger.info(f"Результаты сохранены в файл: {OUTPUT_FILE}")
+    # Экспорт данных из AD выполняется всегда
+    process(selected_options, selected_employee_types)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    setup_logging()
+    ensure_directories()
+    main()
@@ -0,0 +1,117 @@
+# metrics.py
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Этапы текущего запуска в порядке завершения (записи stage и add_stage)
+stages = []
+_lock = threading.Lock()
+# Стек открытых этапов своего потока - для поля parent вложенных этапов
+_local = threading.local()
+
+def peak_memory_mb():
+    """
+    Пиковый объем памяти процесса в МБ (ru_maxrss в Unix, PeakWorkingSetSize в Windows).
+    Это максимум за все время работы процесса, поэтому вклад этапа - рост пика за этап.
+    None, если узнать не удалось.
+    """
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                            ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                            ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            if not ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                            ctypes.byref(counters), counters.cb):
+                return None
+            return counters.PeakWorkingSetSize / 2**20
+
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # В macOS ru_maxrss в байтах, в Linux - в килобайтах
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+    except Exception:
+        return None
+
+def reset():
+    """Начало нового запуска: этапы прошлого запуска в этом процессе отбрасываются"""
+    with _lock:
+        stages.clear()
+
+def add_stage(record):
+    """Этап, замеренный в другом процессе (например, загрузка источника в пуле процессов)"""
+    with _lock:
+        stages.append(record)
+
+@contextmanager
+def stage(name, rows=None, parent=None):
+    """
+    Замер этапа: время (wall), процессорное время процесса (cpu), число строк
+    и пик памяти. Число строк, известное только в конце, задается через
+    возвращаемую запись: with stage('reconcile') as span: ... span['rows'] = n.
+    parent по умолчанию - открытый этап этого потока; этапу в другом потоке
+    родителя задают явно. Замер стоит несколько системных вызовов, поэтому включен всегда.
+    """
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    if parent is None and stack:
+        parent = stack[-1]['stage']
+    record = {'stage': name, 'parent': parent, 'pid': os.getpid(), 'rows': rows}
+    peak_before = peak_memory_mb()
+    wall_started = time.perf_counter()
+    cpu_started = time.process_time()
+    stack.append(record)
+    try:
+        yield record
+    finally:
+        stack.pop()
+        record['wall_s'] = round(time.perf_counter() - wall_started, 4)
+        record['cpu_s'] = round(time.process_time() - cpu_started, 4)
+        peak = peak_memory_mb()
+        record['peak_memory_mb'] = None if peak is None else round(peak, 1)
+        record['peak_growth_mb'] = None if peak is None or peak_before is None else round(peak - peak_before, 1)
+        add_stage(record)
+        logger.debug(f"Этап {name}: {record['wall_s']:.3f} с, CPU {record['cpu_s']:.3f} с, строк {record['rows']}")
+
+def write_metrics(filename, **info):
+    """
+    Метрики запуска в JSON: этапы и дополнительные сведения info
+    (например, файлы результатов). Возвращает путь к файлу или None при ошибке.
+    """
+    with _lock:
+        records = list(stages)
+    peak = peak_memory_mb()
+    document = {
+        'written_at': datetime.now().isoformat(timespec='seconds'),
+        'peak_memory_mb': None if peak is None else round(peak, 1),
+        **info,
+        'stages': records,
+    }
+    try:
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=2, default=str)
+    except OSError as e:
+        logger.error(f"Не удалось записать метрики запуска {filename}: {e}")
+        return None
+
+    top = sorted((record for record in records if record['parent'] is None), key=lambda record: -record['wall_s'])
+    logger.info(f"Метрики запуска сохранены: {filename} (этапов {len(records)}; дольше всего: "
+                + ", ".join(f"{record['stage']} {record['wall_s']:.1f} с" for record in top[:3]) + ")")
+    return filename
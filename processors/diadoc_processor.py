@@ -1,51 +1,38 @@
 # processors/diadoc_processor.py
 import pandas as pd
-from utils import load_diadoc_data, find_duplicates, find_internal_duplicates, find_users_to_remove
+from utils import load_diadoc_data, add_name_key
 import logging
 logger = logging.getLogger(__name__)
 
-def process_diadoc_data(df, ad_employees_df, selected_options, employee_types):
-    """Обработка данных из Сфера Курьер"""  # ← ИЗМЕНИЛ комментарий
+# Столбцы таблицы Сфера Курьер на листе сравнения
+DIADOC_COLUMNS = ['Сфера_Курьер_ФИО', 'Сфера_Курьер_Активен', 'Сфера_Курьер_Администратор']
+
+def process_diadoc_data(tables, ad_available, selected_options, data=None):
+    """
+    Подготовка данных из Сфера Курьер: таблица источника сохраняется в tables['diadoc'],
+    сверка с AD выполняется в reconciliation.reconcile
+    """  # ← ИЗМЕНИЛ комментарий
     if 2 not in selected_options and 0 not in selected_options:
-        return df, {}
+        return tables
     
     logger.info("Обработка данных Сфера Курьер...")  # ← ИЗМЕНИЛ
     
-    # Проверяем наличие необходимых данных в AD
-    if ad_employees_df.empty or 'AD_ФИО' not in ad_employees_df.columns:
-        logger.warning("AD DataFrame пуст или не содержит столбец 'AD_ФИО'")
-        return df, {
-            'duplicates_ad_diadoc': 0,
-            'internal_duplicates_diadoc': 0,
-            'users_to_remove_diadoc': pd.DataFrame()
-        }
+    # Без учетных записей AD выбранных типов сверять не с чем
+    if not ad_available:
+        logger.warning("Нет учетных записей AD выбранных типов сотрудников")
+        return tables
     
     # Загружаем данные из Сфера Курьер
-    diadoc_data = load_diadoc_data()
+    diadoc_data = load_diadoc_data() if data is None else data
     
+    # Таблица источника - все записи, без ограничения по числу строк
     if not diadoc_data.empty:
-        # Убедимся, что не превышаем MAX_ROWS
-        diadoc_fio = diadoc_data['Сфера_Курьер_ФИО'][:len(df)]  # ← ИЗМЕНИЛ
-        diadoc_active = diadoc_data['Сфера_Курьер_Активен'][:len(df)]  # ← ИЗМЕНИЛ
-        diadoc_admin = diadoc_data['Сфера_Курьер_Администратор'][:len(df)]  # ← ИЗМЕНИЛ
-        
-        df['Сфера_Курьер_ФИО'] = pd.Series(diadoc_fio)  # ← ИЗМЕНИЛ
-        df['Сфера_Курьер_Активен'] = pd.Series(diadoc_active)  # ← ИЗМЕНИЛ
-        df['Сфера_Курьер_Администратор'] = pd.Series(diadoc_admin)  # ← ИЗМЕНИЛ
-    
-    # Разделение на отдельные DataFrame
-    diadoc_df = df[['Сфера_Курьер_ФИО', 'Сфера_Курьер_Активен']].dropna(subset=['Сфера_Курьер_ФИО'])  # ← ИЗМЕНИЛ
-    
-    # Инициализация результатов
-    results = {
-        'duplicates_ad_diadoc': 0,
-        'internal_duplicates_diadoc': 0,
-        'users_to_remove_diadoc': pd.DataFrame()
-    }
+        df = diadoc_data[DIADOC_COLUMNS].reset_index(drop=True)
+    else:
+        df = pd.DataFrame(columns=DIADOC_COLUMNS)
     
-    # Поиск дубликатов для Сфера Курьер
-    results['duplicates_ad_diadoc'] = len(find_duplicates(ad_employees_df, diadoc_df, 'AD_ФИО', 'Сфера_Курьер_ФИО'))  # ← ИЗМЕНИЛ
-    results['internal_duplicates_diadoc'] = len(find_internal_duplicates(diadoc_df, 'Сфера_Курьер_ФИО'))  # ← ИЗМЕНИЛ
-    results['users_to_remove_diadoc'] = find_users_to_remove(diadoc_df, ad_employees_df, ad_employees_df)
+    # Нормализованное ФИО считается один раз и переиспользуется всеми сравнениями
+    add_name_key(df, 'Сфера_Курьер_ФИО')
+    tables['diadoc'] = df
     
-    return df, results
\ No newline at end of file
+    return tables
\ No newline at end of file
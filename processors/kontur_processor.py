@@ -1,51 +1,38 @@
 # processors/kontur_processor.py
 import pandas as pd
-from utils import load_kontur_data, find_duplicates, find_internal_duplicates, find_users_to_remove
+from utils import load_kontur_data, add_name_key
 import logging
 logger = logging.getLogger(__name__)
 
-def process_kontur_data(df, ad_employees_df, selected_options, employee_types):
-    """Обработка данных из Контур Диадок"""  # ← ИЗМЕНИЛ комментарий
+# Столбцы таблицы Контур Диадок на листе сравнения
+KONTUR_COLUMNS = ['Контур_Диадок_ФИО', 'Контур_Диадок_Администратор', 'Контур_Диадок_статус']
+
+def process_kontur_data(tables, ad_available, selected_options, data=None):
+    """
+    Подготовка данных из Контур Диадок: таблица источника сохраняется в tables['kontur'],
+    сверка с AD выполняется в reconciliation.reconcile
+    """  # ← ИЗМЕНИЛ комментарий
     if 3 not in selected_options and 0 not in selected_options:
-        return df, {}
+        return tables
     
     logger.info("Обработка данных Контур Диадок...")  # ← ИЗМЕНИЛ
     
-    # Проверяем наличие необходимых данных в AD
-    if ad_employees_df.empty or 'AD_ФИО' not in ad_employees_df.columns:
-        logger.warning("AD DataFrame пуст или не содержит столбец 'AD_ФИО'")
-        return df, {
-            'duplicates_ad_kontur': 0,
-            'internal_duplicates_kontur': 0,
-            'users_to_remove_kontur': pd.DataFrame()
-        }
+    # Без учетных записей AD выбранных типов сверять не с чем
+    if not ad_available:
+        logger.warning("Нет учетных записей AD выбранных типов сотрудников")
+        return tables
     
     # Загружаем данные из Контур Диадок
-    kontur_data = load_kontur_data()
+    kontur_data = load_kontur_data() if data is None else data
     
+    # Таблица источника - все записи, без ограничения по числу строк
     if not kontur_data.empty:
-        # Убедимся, что не превышаем MAX_ROWS
-        kontur_fio = kontur_data['Контур_Диадок_ФИО'][:len(df)]  # ← ИЗМЕНИЛ
-        kontur_admin = kontur_data['Контур_Диадок_Администратор'][:len(df)]  # ← ИЗМЕНИЛ
-        kontur_status = kontur_data['Контур_Диадок_статус'][:len(df)]  # ← ИЗМЕНИЛ
-        
-        df['Контур_Диадок_ФИО'] = pd.Series(kontur_fio)  # ← ИЗМЕНИЛ
-        df['Контур_Диадок_Администратор'] = pd.Series(kontur_admin)  # ← ИЗМЕНИЛ
-        df['Контур_Диадок_статус'] = pd.Series(kontur_status)  # ← ИЗМЕНИЛ
-    
-    # Разделение на отдельные DataFrame
-    kontur_df = df[['Контур_Диадок_ФИО', 'Контур_Диадок_статус']].dropna(subset=['Контур_Диадок_ФИО'])  # ← ИЗМЕНИЛ
-    
-    # Инициализация результатов
-    results = {
-        'duplicates_ad_kontur': 0,
-        'internal_duplicates_kontur': 0,
-        'users_to_remove_kontur': pd.DataFrame()
-    }
+        df = kontur_data[KONTUR_COLUMNS].reset_index(drop=True)
+    else:
+        df = pd.DataFrame(columns=KONTUR_COLUMNS)
     
-    # Поиск дубликатов для Контур Диадок
-    results['duplicates_ad_kontur'] = len(find_duplicates(ad_employees_df, kontur_df, 'AD_ФИО', 'Контур_Диадок_ФИО'))  # ← ИЗМЕНИЛ
-    results['internal_duplicates_kontur'] = len(find_internal_duplicates(kontur_df, 'Контур_Диадок_ФИО'))  # ← ИЗМЕНИЛ
-    results['users_to_remove_kontur'] = find_users_to_remove(kontur_df, ad_employees_df, ad_employees_df)
+    # Нормализованное ФИО считается один раз и переиспользуется всеми сравнениями
+    add_name_key(df, 'Контур_Диадок_ФИО')
+    tables['kontur'] = df
     
-    return df, results
\ No newline at end of file
+    return tables
\ No newline at end of file
@@ -2,10 +2,87 @@
 import pandas as pd
 import os
 import logging
-from utils import get_onec_file, is_file_recent, normalize_name, find_duplicates, find_internal_duplicates, find_users_to_remove
+from utils import get_onec_file, is_file_recent, add_name_key
+from input_cache import load_cached
 
 logger = logging.getLogger(__name__)
 
+# Лист отчета 1С и столбец E "Недействителен" (индекс от нуля)
+ONEC_SHEET_NAME = 'Лист_1'
+ONEC_STATUS_COLUMN = 4
+# Признаки служебных учетных записей в ФИО
+ONEC_SERVICE_MARKERS = ['сервис', 'robot', 'робот']
+# Столбцы таблицы 1С на листе сравнения
+ONEC_COLUMNS = ['1C_ФИО', '1C_Активен']
+# Версия разбора отчета 1С для кэша исходных файлов: увеличивается при исправлении
+# read_onec_file (2 - сброс размеров листа, см. reset_dimensions)
+ONEC_PARSER_VERSION = 2
+
+def read_onec_file(onec_file):
+    """
+    Разбор отчета 1С в новом формате за один проход по строкам листа.
+    Строки до заголовка "Пользователь" пропускаются, затем из каждой строки
+    берутся ФИО (столбец A) и признак "Недействителен" (столбец E),
+    служебные записи отбрасываются сразу.
+    """
+    from openpyxl import load_workbook
+    
+    # Режим только для чтения не загружает лист в память целиком
+    wb = load_workbook(onec_file, read_only=True, data_only=True)
+    try:
+        ws = wb[ONEC_SHEET_NAME]
+        # Размеры листа из файла могут быть неверными (например, у выгрузок 1С
+        # записано A1:A1), и iter_rows тогда обрезал бы строки и столбцы
+        ws.reset_dimensions()
+        
+        names = []
+        statuses = []
+        header_found = False
+        skipped_service = 0
+        
+        # Нужны только первые пять столбцов, остальные ячейки не разбираются
+        for row in ws.iter_rows(max_col=ONEC_STATUS_COLUMN + 1, values_only=True):
+            first = row[0] if row else None
+            
+            # Находим строку с заголовком "Пользователь"
+            if not header_found:
+                if first is not None and str(first).strip() == 'Пользователь':
+                    header_found = True
+                continue
+            
+            # Проверяем, что строка содержит данные
+            if first is None:
+                continue
+            user_name = str(first).strip()
+            if not user_name:
+                continue
+            
+            # Пропускаем служебные записи
+            lower_name = user_name.lower()
+            if any(service in lower_name for service in ONEC_SERVICE_MARKERS):
+                skipped_service += 1
+                continue
+            
+            # "Нет" = активен, "Да" = неактивен; если статус не найден, считаем активным
+            status = row[ONEC_STATUS_COLUMN] if len(row) > ONEC_STATUS_COLUMN else None
+            if status is None:
+                statuses.append('Да')
+            else:
+                statuses.append('Да' if str(status).strip() == 'Нет' else 'Нет')
+            names.append(user_name)
+    finally:
+        wb.close()
+    
+    if not header_found:
+        logger.error("Не найдена строка с заголовком 'Пользователь'")
+        return pd.DataFrame(columns=['1C_ФИО', '1C_Активен'])
+    
+    logger.debug(f"Пропущено служебных записей 1С: {skipped_service}")
+    if not names:
+        logger.warning("Не найдено валидных записей пользователей в файле 1С")
+    
+    return pd.DataFrame({'1C_ФИО': names, '1C_Активен': statuses})
+
 def load_onec_data_new_format():
     """
     Загрузка данных из 1С в новом формате с обработкой объединенных ячеек
@@ -16,110 +93,37 @@ def load_onec_data_new_format():
             logger.warning("Актуальный файл 1С не найден")
             return pd.DataFrame(columns=['1C_ФИО', '1C_Активен'])
 
-        # Читаем Excel файл без пропуска строк, чтобы найти начало данных
-        df_raw = pd.read_excel(onec_file, sheet_name='Лист_1', header=None)
-        
-        logger.debug(f"Размер сырых данных: {df_raw.shape}")
-        
-        # Находим строку с заголовком "Пользователь"
-        start_row = None
-        for i in range(len(df_raw)):
-            # Проверяем первый столбец на наличие "Пользователь"
-            if (pd.notna(df_raw.iloc[i, 0]) and 
-                str(df_raw.iloc[i, 0]).strip() == 'Пользователь'):
-                start_row = i
-                logger.debug(f"Найдена строка с заголовком в позиции {i}")
-                break
-        
-        if start_row is None:
-            logger.error("Не найдена строка с заголовком 'Пользователь'")
-            return pd.DataFrame(columns=['1C_ФИО', '1C_Активен'])
-        
-        # Читаем данные, начиная со строки после заголовка
-        df_data = pd.read_excel(
-            onec_file, 
-            sheet_name='Лист_1',
-            skiprows=start_row + 1,  # Пропускаем строку заголовка
-            header=None
-        )
-        
-        logger.debug(f"Размер данных после пропуска: {df_data.shape}")
-        
-        # Создаем список для данных
-        data = []
-        valid_rows = 0
-        
-        for index, row in df_data.iterrows():
-            # Проверяем, что строка содержит данные
-            if pd.isna(row.iloc[0]) or str(row.iloc[0]).strip() == '':
-                continue
-                
-            # Извлекаем ФИО из первого столбца (индекс 0)
-            user_name = str(row.iloc[0]).strip()
-            
-            # Извлекаем статус из пятого столбца (индекс 4) - столбец E "Недействителен"
-            if len(row) > 4 and pd.notna(row.iloc[4]):
-                status = str(row.iloc[4]).strip()
-                is_active = status == 'Нет'  # "Нет" = активен, "Да" = неактивен
-                active_status = 'Да' if is_active else 'Нет'
-                logger.debug(f"Пользователь {user_name}: статус '{status}' -> активен: {is_active}")
-            else:
-                # Если статус не найден, считаем активным
-                active_status = 'Да'
-                logger.debug(f"Статус не найден для пользователя {user_name}, помечен как активный")
-            
-            # Пропускаем служебные записи
-            if any(service in user_name.lower() for service in ['сервис', 'robot', 'робот']):
-                logger.debug(f"Пропущена служебная запись: {user_name}")
-                continue
-                
-            data.append({
-                '1C_ФИО': user_name,
-                '1C_Активен': active_status
-            })
-            valid_rows += 1
-        
-        logger.info(f"Загружено {valid_rows} записей из 1С")
-        
-        if valid_rows == 0:
-            logger.warning("Не найдено валидных записей пользователей в файле 1С")
-            # Выведем первые несколько строк для отладки
-            logger.debug(f"Первые 5 строк данных: {df_data.head().values.tolist()}")
-        
-        return pd.DataFrame(data)
+        df = load_cached('onec', onec_file, read_onec_file, ONEC_PARSER_VERSION)
+        logger.info(f"Загружено {len(df)} записей из 1С")
+        return df
         
     except Exception as e:
         logger.error(f"Ошибка при загрузке данных 1С: {e}", exc_info=True)
         return pd.DataFrame(columns=['1C_ФИО', '1C_Активен'])
 
-def process_onec_data(df, ad_employees_df, selected_options, employee_types):
-    """Обработка данных из 1С"""
+def process_onec_data(tables, ad_available, selected_options, data=None):
+    """
+    Подготовка данных из 1С: таблица источника сохраняется в tables['onec'],
+    сверка с AD выполняется в reconciliation.reconcile
+    """
     if 1 not in selected_options and 0 not in selected_options:
-        return df, {}
+        return tables
     
     logger.info("Обработка данных 1С...")
     
-    # Проверяем наличие необходимых данных в AD
-    if ad_employees_df.empty or 'AD_ФИО' not in ad_employees_df.columns:
-        logger.warning("AD DataFrame пуст или не содержит столбец 'AD_ФИО'")
-        return df, {
-            'duplicates_ad_1c': 0,
-            'internal_duplicates_1c': 0,
-            'users_to_remove_1c': pd.DataFrame()
-        }
+    # Без учетных записей AD выбранных типов сверять не с чем
+    if not ad_available:
+        logger.warning("Нет учетных записей AD выбранных типов сотрудников")
+        return tables
     
     # Загружаем данные из 1С в новом формате
-    onec_data = load_onec_data_new_format()
+    onec_data = load_onec_data_new_format() if data is None else data
     
     if not onec_data.empty:
         logger.info(f"Загружено {len(onec_data)} записей из 1С")
         
-        # Убедимся, что не превышаем MAX_ROWS
-        onec_fio = onec_data['1C_ФИО'][:len(df)]
-        onec_active = onec_data['1C_Активен'][:len(df)]  # ИСПРАВЛЕНО: '1C_Активen' -> '1C_Активен'
-        
-        df['1C_ФИО'] = pd.Series(onec_fio)
-        df['1C_Активен'] = pd.Series(onec_active)
+        # Таблица источника - все записи, без ограничения по числу строк
+        df = onec_data[ONEC_COLUMNS].reset_index(drop=True)
         
         # Логируем несколько примеров для проверки
         sample_users = onec_data.head(3)[['1C_ФИО', '1C_Активен']].values.tolist()
@@ -131,30 +135,13 @@ def process_onec_data(df, ad_employees_df, selected_options, employee_types):
         logger.info(f"Статистика 1С: {active_count} активных, {inactive_count} неактивных")
     else:
         logger.warning("Данные из 1С не загружены или пусты")
+        df = pd.DataFrame(columns=ONEC_COLUMNS)
     
-    # Разделение на отдельные DataFrame
-    onec_df = df[['1C_ФИО', '1C_Активен']].dropna(subset=['1C_ФИО'])
-    
-    # Инициализация результатов
-    results = {
-        'duplicates_ad_1c': 0,
-        'internal_duplicates_1c': 0,
-        'users_to_remove_1c': pd.DataFrame()
-    }
-    
-    if not onec_df.empty:
-        # Поиск дубликатов для 1С
-        results['duplicates_ad_1c'] = len(find_duplicates(ad_employees_df, onec_df, 'AD_ФИО', '1C_ФИО'))
-        results['internal_duplicates_1c'] = len(find_internal_duplicates(onec_df, '1C_ФИО'))
-        results['users_to_remove_1c'] = find_users_to_remove(onec_df, ad_employees_df, ad_employees_df)
-        
-        logger.info(f"Найдено дубликатов между AD и 1С: {results['duplicates_ad_1c']}")
-        logger.info(f"Найдено внутренних дубликатов в 1С: {results['internal_duplicates_1c']}")
-        logger.info(f"Найдено пользователей для удаления из 1С: {len(results['users_to_remove_1c'])}")
-    else:
-        logger.warning("DataFrame 1С пуст, пропускаем поиск дубликатов")
+    # Нормализованное ФИО считается один раз и переиспользуется всеми сравнениями
+    add_name_key(df, '1C_ФИО')
+    tables['onec'] = df
     
-    return df, results
+    return tables
 
 # Сохраняем старые функции для тестирования
 def parse_1c_users_report(file_path):
@@ -0,0 +1,355 @@
+# reconciliation.py
+import time
+import logging
+import numpy as np
+import pandas as pd
+from config import FUZZY_MATCHING, FUZZY_MIN_SCORE
+from fuzzy_match import build_fuzzy_index, find_probable_matches
+from utils import name_key_column, normalize_patronymics
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+# Источники сверки: таблица источника и столбец ФИО в ней
+SOURCE_FIO_COLUMNS = {
+    'ad_employees': 'AD_сотрудники',
+    'ad_gph': 'AD_ГПХ',
+    'shtat': 'Штатное_ФИО',
+    'kontur': 'Контур_Диадок_ФИО',
+    'diadoc': 'Сфера_Курьер_ФИО',
+    'onec': '1C_ФИО',
+}
+
+# Учетные записи AD по типам сотрудников (1 - сотрудники, 2 - ГПХ)
+AD_SOURCES = {1: 'ad_employees', 2: 'ad_gph'}
+
+# Системы, для которых ищутся дубликаты и пользователи для удаления.
+# Новая система - еще одна запись здесь и в SOURCE_FIO_COLUMNS
+SERVICES = [
+    {
+        'source': 'kontur',
+        'name': 'Контур Диадок',
+        'result_suffix': 'kontur',
+        'status_col': 'Контур_Диадок_статус',
+        'active_value': 'активна',
+        'remove_sheet': 'удалить из Контур Диадок',
+        'duplicates_sheet': 'дубли в Контур Диадок',
+    },
+    {
+        'source': 'diadoc',
+        'name': 'Сфера Курьер',
+        'result_suffix': 'diadoc',
+        'status_col': 'Сфера_Курьер_Активен',
+        'active_value': 'Да',
+        'remove_sheet': 'удалить из Сфера Курьер',
+        'duplicates_sheet': 'дубли в Сфера Курьер',
+    },
+    {
+        'source': 'onec',
+        'name': '1С',
+        'result_suffix': '1c',
+        'status_col': '1C_Активен',
+        'active_value': 'Да',
+        'remove_sheet': 'удалить из 1С',
+        'duplicates_sheet': 'дубли в 1С',
+    },
+]
+
+def lookup_unique(group_keys, values, query_keys):
+    """
+    Для каждого query_keys - единственное значение values с тем же ключом группы
+    (хеш-поиск по уникальным парам). Возвращает (значение или -1, число вариантов).
+    """
+    pairs = pd.DataFrame({'group': group_keys, 'value': values}).drop_duplicates()
+    groups = pairs.groupby('group')['value'].agg(['size', 'first'])
+    position = groups.index.get_indexer(query_keys)
+    found = position >= 0
+    variants = np.where(found, groups['size'].to_numpy()[position], 0)
+    value = np.where(variants == 1, groups['first'].to_numpy()[position], -1)
+    return value, variants
+
+def resolve_person_keys(short_keys, patronymics):
+    """
+    Составной ключ ФИО (фамилия, имя, отчество) для записей всех источников.
+    Краткий ключ дополняется отчеством по иерархии:
+    - полное отчество - как есть;
+    - инициал - полное отчество на эту букву среди записей с тем же кратким ключом,
+      если оно одно (если полных отчеств на эту букву нет - сам инициал);
+    - отчество не указано - единственное отчество среди записей с тем же кратким ключом
+      (если отчеств нет - краткий ключ).
+    Если вариантов несколько, запись неоднозначна: ее ключ - краткий, и при сверке
+    она сопоставляется по краткому ключу. Ключи и отчества заменяются кодами
+    факторизации, поиски идут по хеш-индексам, строки собираются только для уникальных ключей.
+    Возвращает, как pd.factorize, (код для каждой записи, -1 - пустое ФИО; составные ключи),
+    а также признаки неоднозначности записей.
+    """
+    short_codes, short_uniques = pd.factorize(pd.Series(short_keys, dtype=object))
+    patronymic_codes, patronymic_uniques = pd.factorize(pd.Series(patronymics, dtype=object).fillna(''))
+    uniques = pd.Series(patronymic_uniques, dtype=object)
+    length = uniques.str.len().to_numpy()[patronymic_codes]
+    letter_codes = pd.factorize(uniques.str[:1])[0][patronymic_codes]
+
+    valid = short_codes >= 0
+    resolved = np.where(valid & (length > 0), patronymic_codes, -1)
+    ambiguous = np.zeros(len(short_codes), dtype=bool)
+
+    # Инициалы: полное отчество на ту же букву у записей с тем же кратким ключом
+    initial = np.flatnonzero(valid & (length == 1))
+    full = valid & (length > 1)
+    if len(initial) and full.any():
+        letters = len(patronymic_uniques)
+        value, variants = lookup_unique(short_codes[full] * letters + letter_codes[full], patronymic_codes[full],
+                                        short_codes[initial] * letters + letter_codes[initial])
+        resolved[initial[variants == 1]] = value[variants == 1]
+        ambiguous[initial[variants > 1]] = True
+
+    # Отчество не указано: единственное отчество среди записей с тем же кратким ключом
+    missing = np.flatnonzero(valid & (length == 0))
+    known = (resolved >= 0) & ~ambiguous
+    if len(missing) and known.any():
+        value, variants = lookup_unique(short_codes[known], resolved[known], short_codes[missing])
+        resolved[missing[variants == 1]] = value[variants == 1]
+        ambiguous[missing[variants > 1]] = True
+
+    # Код человека - пара (краткий ключ, отчество); строки ключей - только для уникальных пар
+    resolved[ambiguous] = -1
+    width = len(patronymic_uniques) + 1
+    person_codes = np.full(len(short_codes), -1, dtype=np.intp)
+    person_codes[valid], pairs = pd.factorize(short_codes[valid] * width + resolved[valid] + 1)
+    pair_short = pd.Series(short_uniques, dtype=object).to_numpy()[pairs // width]
+    pair_patronymic = pairs % width - 1
+    keys = np.where(pair_patronymic >= 0,
+                    pair_short + ' ' + uniques.to_numpy(dtype=object)[np.maximum(pair_patronymic, 0)],
+                    pair_short)
+    return person_codes, keys, ambiguous
+
+def build_presence_matrix(tables):
+    """
+    Матрица присутствия: одна строка на человека (составной ключ ФИО, внешнее объединение
+    ключей всех источников за одну факторизацию), в столбце источника - число его
+    записей с этим ключом. Источники без таблицы (не выбраны) дают нули.
+    Для неоднозначных записей строятся такие же матрицы по краткому ключу
+    (все записи и только неоднозначные).
+    Возвращает (матрица, матрица по краткому ключу, матрица неоднозначных записей,
+    {источник: {'person', 'short' - номера строк матриц для каждой записи, -1 - пустое ФИО;
+    'ambiguous' - признак неоднозначности}}).
+    """
+    sources = [source for source in SOURCE_FIO_COLUMNS if source in tables]
+    short_keys = []
+    names = []
+    for source in sources:
+        table = tables[source]
+        fio_col = SOURCE_FIO_COLUMNS[source]
+        short_keys.append(table[name_key_column(fio_col)].where(table[fio_col].notna()))
+        names.append(table[fio_col].astype(object))
+
+    all_short = pd.concat(short_keys, ignore_index=True) if short_keys else pd.Series([], dtype=object)
+
+    # Отчество извлекается один раз для каждого написания ФИО (одни и те же люди есть в нескольких источниках)
+    name_codes, name_uniques = pd.factorize(pd.concat(names, ignore_index=True) if names else pd.Series([], dtype=object))
+    all_patronymics = np.append(normalize_patronymics(pd.Series(name_uniques, dtype=object)).to_numpy(dtype=object), '')[name_codes]
+    person_codes, person_uniques, ambiguous = resolve_person_keys(all_short, all_patronymics)
+    short_codes, short_uniques = pd.factorize(all_short)
+
+    counts = np.zeros((len(person_uniques), len(SOURCE_FIO_COLUMNS)), dtype=np.int64)
+    short_counts = np.zeros((len(short_uniques), len(SOURCE_FIO_COLUMNS)), dtype=np.int64)
+    ambiguous_counts = np.zeros_like(short_counts)
+    rows = {}
+    start = 0
+    for source, source_keys in zip(sources, short_keys):
+        rows_slice = slice(start, start + len(source_keys))
+        start += len(source_keys)
+        person = person_codes[rows_slice]
+        short = short_codes[rows_slice]
+        source_ambiguous = ambiguous[rows_slice]
+        rows[source] = {'person': person, 'short': short, 'ambiguous': source_ambiguous}
+
+        column = list(SOURCE_FIO_COLUMNS).index(source)
+        counts[:, column] = np.bincount(person[person >= 0], minlength=len(person_uniques))
+        short_counts[:, column] = np.bincount(short[short >= 0], minlength=len(short_uniques))
+        ambiguous_counts[:, column] = np.bincount(short[(short >= 0) & source_ambiguous], minlength=len(short_uniques))
+
+    columns = list(SOURCE_FIO_COLUMNS)
+    matrix = pd.DataFrame(counts, index=pd.Index(person_uniques, name='ключ'), columns=columns)
+    short_matrix = pd.DataFrame(short_counts, index=pd.Index(short_uniques, name='ключ'), columns=columns)
+    ambiguous_matrix = pd.DataFrame(ambiguous_counts, index=short_matrix.index, columns=columns)
+    logger.info(f"Матрица сверки: {len(matrix)} уникальных ФИО ({len(short_matrix)} без учета отчества, "
+                f"неоднозначных записей - {int(ambiguous.sum())}) из {len(sources)} источников")
+    return matrix, short_matrix, ambiguous_matrix, rows
+
+def present_in(source_rows, targets, matrix, short_matrix, ambiguous_matrix):
+    """
+    Признак для каждой записи источника: есть ли ее ФИО в источниках targets.
+    Сравнение по составному ключу; по краткому - если запись неоднозначна
+    или в targets есть неоднозначные записи с тем же кратким ключом.
+    """
+    in_person = matrix[targets].to_numpy().sum(axis=1) > 0
+    in_short = short_matrix[targets].to_numpy().sum(axis=1) > 0
+    ambiguous_short = ambiguous_matrix[targets].to_numpy().sum(axis=1) > 0
+
+    has_name = source_rows['person'] >= 0
+    person = np.where(has_name, source_rows['person'], 0)
+    short = np.where(has_name, source_rows['short'], 0)
+    return has_name & (in_person[person] | ambiguous_short[short] | (source_rows['ambiguous'] & in_short[short]))
+
+def selected_ad_sources(employee_types):
+    """Таблицы AD для выбранных типов сотрудников"""
+    if 0 in employee_types:
+        return list(AD_SOURCES.values())
+    return [source for employee_type, source in AD_SOURCES.items() if employee_type in employee_types]
+
+def ad_original_names(tables):
+    """ФИО в AD в исходном написании по ключу (первое имя с таким ключом)"""
+    names = []
+    for source in AD_SOURCES.values():
+        fio_col = SOURCE_FIO_COLUMNS[source]
+        table = tables[source].dropna(subset=[fio_col])
+        names.append(pd.Series(table[fio_col].to_numpy(), index=table[name_key_column(fio_col)].to_numpy()))
+    names = pd.concat(names)
+    return names[~names.index.duplicated()]
+
+def probable_matches(service, users_to_remove, key_col, fio_col, index, ad_names, min_score):
+    """Пользователи для удаления, ФИО которых похоже на ФИО в AD: строки листа "вероятные совпадения" """
+    matches = find_probable_matches(users_to_remove[key_col], index, min_score)
+    matched = users_to_remove[[fio_col, key_col]].merge(matches, left_on=key_col, right_on='ключ')
+    return pd.DataFrame({
+        'Система': service['name'],
+        'ФИО в системе': matched[fio_col],
+        'ФИО в AD': matched['ключ_совпадения'].map(ad_names),
+        'Сходство': matched['сходство'],
+    })
+
+def missing_rows(source_rows, targets, matrix, short_matrix, ambiguous_matrix):
+    """Номера записей источника, ФИО которых нет в targets: первая запись каждого человека"""
+    missing = np.flatnonzero((source_rows['person'] >= 0) &
+                             ~present_in(source_rows, targets, matrix, short_matrix, ambiguous_matrix))
+    _, first = np.unique(source_rows['person'][missing], return_index=True)
+    return missing[np.sort(first)]
+
+def reconcile(tables, employee_types, fuzzy=FUZZY_MATCHING, min_score=FUZZY_MIN_SCORE):
+    """
+    Сверка всех источников по одной матрице присутствия (по составному ключу ФИО с отчеством).
+    Для каждой системы из SERVICES (если ее таблица сформирована) вычисляются:
+    дубликаты с AD выбранных типов сотрудников, внутренние дубликаты
+    (записи для листа "дубли") и активные пользователи, которых нет в AD
+    (лист "удалить из"). Также - номера записей сотрудников AD, отсутствующих в штатном расписании,
+    и записей штатного расписания, для которых нет учетной записи сотрудника в AD.
+    При fuzzy пользователи для удаления дополнительно сопоставляются с AD нечетко
+    (опечатки, транслитерация) - результат 'probable_matches' для листа "вероятные совпадения".
+    """
+    with stage('presence_matrix', rows=sum(len(table) for table in tables.values())):
+        matrix, short_matrix, ambiguous_matrix, rows = build_presence_matrix(tables)
+    ad_sources = list(AD_SOURCES.values())
+    selected_ad = selected_ad_sources(employee_types)
+
+    # Расхождения AD и штатного расписания в обе стороны (номера записей, по одной на человека)
+    # Составной ключ ФИО каждой записи (None - пустое ФИО), для сравнения запусков
+    person_keys = np.append(matrix.index.to_numpy(dtype=object), None)
+    results = {
+        'matrix': matrix,
+        'keys': {source: person_keys[source_rows['person']] for source, source_rows in rows.items()},
+        'missing_in_shtat': missing_rows(rows['ad_employees'], ['shtat'], matrix, short_matrix, ambiguous_matrix),
+        'missing_in_ad': (missing_rows(rows['shtat'], ['ad_employees'], matrix, short_matrix, ambiguous_matrix)
+                          if 'shtat' in rows else np.array([], dtype=np.intp)),
+    }
+    
+    fuzzy_index = None
+    matches = []
+    if fuzzy:
+        started = time.perf_counter()
+        with stage('fuzzy_index') as span:
+            in_ad_short = short_matrix[ad_sources].to_numpy().sum(axis=1) > 0
+            fuzzy_index = build_fuzzy_index(short_matrix.index[in_ad_short])
+            ad_names = ad_original_names(tables)
+            span['rows'] = int(in_ad_short.sum())
+
+    for service in SERVICES:
+        source = service['source']
+        if source not in tables:
+            logger.debug(f"Пропускаем {service['name']}: таблица источника не сформирована")
+            continue
+
+        suffix = service['result_suffix']
+        fio_col = SOURCE_FIO_COLUMNS[source]
+        status_col = service['status_col']
+        table = tables[source]
+
+        # Записи источника; записи без ФИО не участвуют
+        source_rows = rows[source]
+        has_name = source_rows['person'] >= 0
+        person = np.where(has_name, source_rows['person'], 0)
+        short = np.where(has_name, source_rows['short'], 0)
+
+        with stage(f"duplicates_{suffix}", rows=len(table)):
+            # Дубликаты с AD - число людей системы, найденных в AD выбранных типов
+            in_selected_ad = present_in(source_rows, selected_ad, matrix, short_matrix, ambiguous_matrix)
+            results[f'duplicates_ad_{suffix}'] = len(np.unique(person[in_selected_ad]))
+
+            # Внутренние дубликаты: несколько записей одного человека; для неоднозначных
+            # записей - несколько записей с тем же кратким ключом
+            person_count = matrix[source].to_numpy()[person]
+            short_count = short_matrix[source].to_numpy()[short]
+            ambiguous_count = ambiguous_matrix[source].to_numpy()[short]
+            duplicated = has_name & ((person_count > 1) | ((short_count > 1) & (source_rows['ambiguous'] | (ambiguous_count > 0))))
+            results[f'internal_duplicates_{suffix}'] = len(np.unique(person[duplicated]))
+            results[f'duplicates_{suffix}'] = table.loc[duplicated, [fio_col]]
+
+        with stage(f"users_to_remove_{suffix}", rows=len(table)):
+            # Активные пользователи, которых нет в AD (статус приводится к строке без пробелов)
+            status = table[status_col].astype(str).str.strip()
+            active = (status.str.lower() == service['active_value'].lower()).to_numpy()
+            mask = has_name & active & ~present_in(source_rows, ad_sources, matrix, short_matrix, ambiguous_matrix)
+            users_to_remove = table.loc[mask, [fio_col]]
+            users_to_remove[status_col] = status[mask]
+            results[f'users_to_remove_{suffix}'] = users_to_remove
+        
+        if fuzzy_index is not None:
+            with stage(f"fuzzy_{suffix}", rows=int(mask.sum())):
+                service_matches = probable_matches(service, table.loc[mask], name_key_column(fio_col), fio_col,
+                                                   fuzzy_index, ad_names, min_score)
+            matches.append(service_matches)
+            logger.info(f"{service['name']}: вероятных совпадений с AD среди пользователей для удаления - {len(service_matches)}")
+
+        logger.info(f"{service['name']}: дубликатов с AD - {results[f'duplicates_ad_{suffix}']}, "
+                    f"внутренних дубликатов - {results[f'internal_duplicates_{suffix}']}, "
+                    f"для удаления - {len(users_to_remove)}")
+
+    if fuzzy_index is not None:
+        results['probable_matches'] = (pd.concat(matches, ignore_index=True) if matches
+                                       else pd.DataFrame(columns=['Система', 'ФИО в системе', 'ФИО в AD', 'Сходство']))
+        logger.info(f"Нечеткое сопоставление ФИО: {time.perf_counter() - started:.1f} с")
+
+    return results
+
+def tracked_results(results, tables):
+    """
+    Результаты сверки, отслеживаемые между запусками: DataFrame со столбцами
+    'набор', 'ключ' (составной ключ ФИО), 'ФИО' - по строке на человека в наборе.
+    Наборы: users_to_remove_<система>, duplicates_<система>, а если штатное расписание
+    загружено - missing_in_shtat и missing_in_ad. Все вычисленные в этом запуске наборы,
+    в том числе пустые, перечислены в категориях столбца 'набор'.
+    """
+    parts = {}
+
+    def add(name, source, rows):
+        rows = np.asarray(rows, dtype=np.intp)
+        parts[name] = pd.DataFrame({
+            'ключ': results['keys'][source][rows],
+            'ФИО': tables[source][SOURCE_FIO_COLUMNS[source]].to_numpy(dtype=object)[rows],
+        })
+
+    if 'shtat' in tables:
+        add('missing_in_shtat', 'ad_employees', results['missing_in_shtat'])
+        add('missing_in_ad', 'shtat', results['missing_in_ad'])
+    for service in SERVICES:
+        suffix = service['result_suffix']
+        if f'duplicates_{suffix}' not in results:
+            continue
+        add(f'users_to_remove_{suffix}', service['source'], results[f'users_to_remove_{suffix}'].index)
+        add(f'duplicates_{suffix}', service['source'], results[f'duplicates_{suffix}'].index)
+
+    state = pd.concat(parts, names=['набор']).reset_index(level='набор') if parts else \
+        pd.DataFrame(columns=['набор', 'ключ', 'ФИО'])
+    state = state.drop_duplicates(['набор', 'ключ']).reset_index(drop=True)
+    state['набор'] = pd.Categorical(state['набор'], categories=list(parts))
+    return state[['набор', 'ключ', 'ФИО']]
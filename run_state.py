@@ -0,0 +1,134 @@
+# run_state.py
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from config import RUN_STATE_FILE, RUN_STATE_META_FILE
+from table_store import read_table, table_file, write_table
+
+logger = logging.getLogger(__name__)
+
+# Увеличивается при изменении формата состояния, старое состояние при этом не используется
+STATE_VERSION = 2
+
+STATE_COLUMNS = ['набор', 'ключ', 'ФИО']
+
+# Виды изменений между запусками
+NEW = 'новое'
+RESOLVED = 'устранено'
+
+def load_state(filename=RUN_STATE_FILE, meta_filename=RUN_STATE_META_FILE):
+    """
+    Результаты сверки прошлого запуска (см. reconciliation.tracked_results).
+    Возвращает (состояние, метаданные) или None, если состояния нет или оно повреждено.
+    """
+    if not meta_filename.exists():
+        logger.info("Состояние прошлого запуска не найдено, отчет об изменениях не строится")
+        return None
+
+    try:
+        with open(meta_filename, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Не удалось прочитать состояние прошлого запуска {meta_filename}: {e}")
+        return None
+
+    if meta.get('version') != STATE_VERSION:
+        logger.warning(f"Неподдерживаемый формат состояния прошлого запуска: {meta_filename}")
+        return None
+
+    try:
+        state = read_table(filename, meta['table'])
+    except Exception as e:
+        logger.warning(f"Не удалось прочитать состояние прошлого запуска {filename}: {e}")
+        return None
+
+    if list(state.columns) != STATE_COLUMNS:
+        logger.warning(f"Неподдерживаемый формат состояния прошлого запуска: {filename}")
+        return None
+
+    logger.info(f"Загружено состояние запуска {meta.get('saved_at')}: {len(state)} записей")
+    return state, meta
+
+def save_state(state, report_files=(), filename=RUN_STATE_FILE, meta_filename=RUN_STATE_META_FILE):
+    """
+    Сохранение результатов сверки для сравнения со следующим запуском:
+    таблица (Parquet или CSV, см. table_store) и метаданные с типами столбцов в JSON рядом с ней
+    """
+    filename.parent.mkdir(parents=True, exist_ok=True)
+
+    # Файлы пишутся во временные и атомарно заменяются, чтобы прерванная запись не портила состояние
+    table = write_table(state, filename)
+    # Состояние прежнего формата (pickle) больше не читается
+    filename.with_name(filename.name + '.pkl').unlink(missing_ok=True)
+
+    meta = {
+        'version': STATE_VERSION,
+        'table': table,
+        'saved_at': datetime.now().isoformat(timespec='seconds'),
+        'report_files': [str(path) for path in report_files],
+        'sets': {name: int(count) for name, count in state['набор'].value_counts(sort=False).items()},
+    }
+    tmp_meta = meta_filename.with_name(meta_filename.name + '.tmp')
+    with open(tmp_meta, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_meta, meta_filename)
+
+    logger.info(f"Состояние запуска сохранено: {table_file(filename, table)} ({len(state)} записей)")
+    return meta
+
+def merge_states(previous, current):
+    """
+    Состояние для сохранения: наборы текущего запуска и наборы прошлого состояния,
+    которые в этом запуске не вычислялись (например, запуск только по 1С сохраняет
+    записи Контур Диадок и Сфера Курьер из прошлого состояния). Иначе следующий
+    полный запуск не нашел бы базы для сравнения этих наборов и не показал бы изменений.
+    """
+    if previous is None:
+        return current
+    current_sets = set(current['набор'].cat.categories)
+    kept_sets = [name for name in previous['набор'].cat.categories if name not in current_sets]
+    if not kept_sets:
+        return current
+
+    kept = previous[previous['набор'].isin(kept_sets)]
+    merged = pd.concat([current.astype({'набор': object}), kept.astype({'набор': object})], ignore_index=True)
+    merged['набор'] = pd.Categorical(merged['набор'], categories=list(current['набор'].cat.categories) + kept_sets)
+    logger.info(f"Из прошлого состояния сохранены наборы, не вычисленные в этом запуске: {', '.join(kept_sets)}")
+    return merged[STATE_COLUMNS]
+
+def state_changes(previous, current):
+    """
+    Изменения между запусками: записи, ключ (набор, ключ) которых есть только в одном
+    из состояний. Оба состояния объединяются, и общие записи находятся одним проходом
+    хеширования ключей (duplicated), без соединения таблиц.
+    Сравниваются только наборы, вычисленные в обоих запусках (другой выбор систем
+    не дает ложных "устранено"). Возвращает DataFrame со столбцами
+    'изменение' (NEW/RESOLVED), 'набор', 'ключ', 'ФИО'.
+    """
+    previous_sets = set(previous['набор'].cat.categories)
+    common = [name for name in current['набор'].cat.categories if name in previous_sets]
+    previous = previous[previous['набор'].isin(common)]
+    current = current[current['набор'].isin(common)]
+
+    # Ключи уникальны внутри состояния, поэтому повтор в объединении - запись из обоих запусков
+    combined = pd.concat([previous.astype({'набор': object}), current.astype({'набор': object})],
+                         ignore_index=True)
+    in_both = combined.duplicated(['набор', 'ключ'], keep=False).to_numpy()
+    is_new = np.arange(len(combined)) >= len(previous)
+    changed = combined[~in_both]
+    changes = pd.DataFrame({
+        'изменение': np.where(is_new[~in_both], NEW, RESOLVED),
+        'набор': changed['набор'].to_numpy(),
+        'ключ': changed['ключ'].to_numpy(),
+        'ФИО': changed['ФИО'].to_numpy(),
+    }).sort_values(['набор', 'изменение', 'ключ'], kind='stable').reset_index(drop=True)
+
+    counts = changes.groupby(['набор', 'изменение']).size()
+    logger.info(f"Изменения с прошлого запуска: новых {int((changes['изменение'] == NEW).sum())}, "
+                f"устранено {int((changes['изменение'] == RESOLVED).sum())}")
+    for (name, change), count in counts.items():
+        logger.debug(f"  {name}: {change} - {count}")
+    return changes
@@ -0,0 +1,109 @@
+# source_loader.py
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from config import PARALLEL_LOADING, LOAD_WORKERS, setup_logging
+from input_cache import cache_stats
+from metrics import stage, add_stage
+from utils import load_shtat_data, load_kontur_data, load_diadoc_data
+from processors.onec_processor import load_onec_data_new_format
+
+logger = logging.getLogger(__name__)
+
+# Загрузчики исходных файлов по источникам
+SOURCE_LOADERS = {
+    'shtat': load_shtat_data,
+    'onec': load_onec_data_new_format,
+    'diadoc': load_diadoc_data,
+    'kontur': load_kontur_data,
+}
+
+SOURCE_TITLES = {
+    'ad': 'Active Directory',
+    'shtat': 'Штатное расписание',
+    'onec': '1С',
+    'diadoc': 'Сфера Курьер',
+    'kontur': 'Контур Диадок',
+}
+
+def selected_sources(selected_options):
+    """Источники, которые нужны для выбранных опций проверки (штатное расписание нужно всегда)"""
+    sources = ['shtat']
+    if 1 in selected_options or 0 in selected_options:
+        sources.append('onec')
+    if 2 in selected_options or 0 in selected_options:
+        sources.append('diadoc')
+    if 3 in selected_options or 0 in selected_options:
+        sources.append('kontur')
+    return sources
+
+def _load_source(name):
+    """
+    Загрузка одного источника с замером времени. Выполняется в отдельном процессе,
+    поэтому вместе с таблицей возвращаются счетчики кэша и замер этапа этого процесса
+    """
+    hits, misses = cache_stats['hits'], cache_stats['misses']
+    started = time.perf_counter()
+    with stage(f"load_{name}", parent='load_sources') as span:
+        df = SOURCE_LOADERS[name]()
+        span['rows'] = len(df)
+    return df, time.perf_counter() - started, cache_stats['hits'] - hits, cache_stats['misses'] - misses, span
+
+def load_sources(selected_options, run_ad_export=None, parallel=PARALLEL_LOADING, workers=LOAD_WORKERS):
+    """
+    Загрузка всех нужных источников. При parallel разбор Excel файлов идет
+    в пуле процессов (разбор xlsx нагружает процессор), а экспорт AD
+    run_ad_export - параллельно в отдельном потоке; результаты собираются,
+    только когда все готово. Возвращает (результат экспорта AD, {источник: таблица}, {источник: секунды}).
+    """
+    names = selected_sources(selected_options)
+    timings = {}
+    sources = {}
+    ad_result = None
+    started = time.perf_counter()
+
+    def run_ad():
+        ad_started = time.perf_counter()
+        try:
+            # Экспорт идет в своем потоке, поэтому родительский этап задается явно
+            with stage('ad_export', parent='load_sources') as span:
+                result = run_ad_export()
+                span['rows'] = result[0] if result else None
+            return result
+        finally:
+            timings['ad'] = time.perf_counter() - ad_started
+
+    if not parallel:
+        if run_ad_export:
+            ad_result = run_ad()
+        for name in names:
+            sources[name], timings[name], _, _, _ = _load_source(name)
+    else:
+        # Процессы пула (при запуске через spawn, как в Windows) настраивают логирование сами,
+        # если оно настроено в основном процессе: импорт config его больше не настраивает
+        initializer = setup_logging if logging.root.handlers else None
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as pool, ThreadPoolExecutor(max_workers=1) as ad_pool:
+            # Процессы пула создаются до запуска потока экспорта AD
+            futures = {name: pool.submit(_load_source, name) for name in names}
+            ad_future = ad_pool.submit(run_ad) if run_ad_export else None
+
+            for name, future in futures.items():
+                try:
+                    sources[name], timings[name], hits, misses, span = future.result()
+                    cache_stats['hits'] += hits
+                    cache_stats['misses'] += misses
+                    add_stage(span)
+                except Exception as e:
+                    # Например, пул процессов недоступен - загружаем источник здесь
+                    logger.warning(f"Параллельная загрузка {SOURCE_TITLES[name]} не удалась ({e}), загружаем последовательно")
+                    sources[name], timings[name], _, _, _ = _load_source(name)
+
+            if ad_future:
+                ad_result = ad_future.result()
+
+    elapsed = time.perf_counter() - started
+    for name, seconds in timings.items():
+        logger.info(f"Время загрузки {SOURCE_TITLES[name]}: {seconds:.1f} с")
+    logger.info(f"Загрузка источников заняла {elapsed:.1f} с "
+                f"(сумма по источникам {sum(timings.values()):.1f} с, {'параллельно' if parallel else 'последовательно'})")
+    return ad_result, sources, timings
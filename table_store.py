@@ -0,0 +1,132 @@
+# table_store.py
+"""
+Хранение таблиц pandas на диске без pickle: файлы лежат в том числе в общей
+папке исходных файлов, а распаковка pickle из такого файла - выполнение
+произвольного кода. Если установлен pyarrow, таблица пишется в Parquet,
+иначе в CSV; типы столбцов возвращаются описанием таблицы, которое вызывающий
+сохраняет в своих метаданных JSON и передает при чтении.
+"""
+import os
+import json
+import threading
+import importlib.util
+
+# Отсутствующее значение в CSV (пустая строка остается пустой строкой)
+CSV_NA = '\\N'
+
+FORMATS = ('parquet', 'csv')
+
+def table_format():
+    """Формат записи: Parquet, если установлен pyarrow, иначе CSV"""
+    return 'parquet' if importlib.util.find_spec('pyarrow') is not None else 'csv'
+
+def table_file(path, table_or_format):
+    """Файл таблицы: path без расширения плюс расширение формата"""
+    fmt = table_or_format['format'] if isinstance(table_or_format, dict) else table_or_format
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат таблицы: {fmt}")
+    return path.with_name(f"{path.name}.{fmt}")
+
+def _column_type(series):
+    """
+    Описание типа столбца для восстановления после CSV. Столбцы object, в которых
+    не только строки (например, логические значения с пропусками из Excel),
+    хранятся как JSON каждой ячейки. Неподдерживаемый тип - TypeError
+    """
+    import pandas as pd
+
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = list(dtype.categories)
+        if not all(isinstance(value, str) for value in categories):
+            raise TypeError(f"Столбец {series.name}: поддерживаются только строковые категории")
+        return {'category': categories}
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'bool'
+    if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_float_dtype(dtype):
+        if pd.api.types.is_extension_array_dtype(dtype):
+            raise TypeError(f"Столбец {series.name}: тип {dtype} не поддерживается")
+        return str(dtype)
+    if pd.api.types.is_string_dtype(dtype):
+        values = series.dropna()
+        if dtype != object or all(isinstance(value, str) for value in values):
+            return 'str'
+        return 'json'
+    raise TypeError(f"Столбец {series.name}: тип {dtype} не поддерживается")
+
+def _write_csv(df, filename, dtypes):
+    """CSV с отсутствующими значениями CSV_NA; ячейки столбцов 'json' кодируются в JSON"""
+    import pandas as pd
+
+    encoded = {
+        column: df[column].map(lambda value: value if pd.isna(value) else json.dumps(value, ensure_ascii=False))
+        for column, column_type in dtypes.items() if column_type == 'json'
+    }
+    if encoded:
+        df = df.assign(**encoded)
+    df.to_csv(filename, index=False, na_rep=CSV_NA, encoding='utf-8')
+
+def _read_csv(filename, columns, dtypes):
+    """Чтение CSV: все значения как строки, затем типы столбцов по описанию"""
+    import pandas as pd
+
+    df = pd.read_csv(filename, dtype=str, keep_default_na=False, na_values=[CSV_NA], encoding='utf-8')
+    if list(df.columns) != columns:
+        raise ValueError(f"Столбцы таблицы {filename} не совпадают с описанием")
+
+    for column, column_type in dtypes.items():
+        values = df[column]
+        if isinstance(column_type, dict):
+            df[column] = pd.Categorical(values, categories=column_type['category'])
+        elif column_type == 'bool':
+            df[column] = values.map({'True': True, 'False': False}).astype(bool)
+        elif column_type == 'json':
+            df[column] = values.map(json.loads, na_action='ignore').astype(object)
+        elif column_type != 'str':
+            df[column] = values.astype(column_type)
+    return df
+
+def write_table(df, path):
+    """
+    Атомарная запись таблицы в path без расширения (<path>.parquet или <path>.csv).
+    Индекс не сохраняется. Файл другого формата с тем же именем удаляется.
+    Возвращает описание таблицы для метаданных: {'format', 'columns', 'dtypes'}
+    """
+    fmt = table_format()
+    columns = [str(column) for column in df.columns]
+    if columns != list(df.columns) or len(set(columns)) != len(columns):
+        raise TypeError("Имена столбцов таблицы должны быть уникальными строками")
+    dtypes = {column: _column_type(df[column]) for column in columns}
+
+    filename = table_file(path, fmt)
+    # Таблицы могут записываться параллельно в разных процессах и потоках
+    tmp_file = filename.with_name(f"{filename.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        if fmt == 'parquet':
+            df.to_parquet(tmp_file, index=False)
+        else:
+            _write_csv(df, tmp_file, dtypes)
+        os.replace(tmp_file, filename)
+    finally:
+        tmp_file.unlink(missing_ok=True)
+
+    for other in FORMATS:
+        if other != fmt:
+            table_file(path, other).unlink(missing_ok=True)
+    return {'format': fmt, 'columns': columns, 'dtypes': dtypes}
+
+def read_table(path, table):
+    """Чтение таблицы, записанной write_table() в path, по ее описанию из метаданных"""
+    filename = table_file(path, table)
+    if table['format'] == 'parquet':
+        import pandas as pd
+        df = pd.read_parquet(filename)
+        if list(df.columns) != table['columns']:
+            raise ValueError(f"Столбцы таблицы {filename} не совпадают с описанием")
+        return df
+    return _read_csv(filename, table['columns'], table['dtypes'])
+
+def remove_table(path):
+    """Удаление файлов таблицы всех форматов"""
+    for fmt in FORMATS:
+        table_file(path, fmt).unlink(missing_ok=True)
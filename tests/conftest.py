@@ -0,0 +1,7 @@
+# tests/conftest.py
+"""Тесты запускаются из корня проекта: python -m pytest"""
+import sys
+from pathlib import Path
+
+# Модули проекта лежат в корне, а не в пакете
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
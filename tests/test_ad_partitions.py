@@ -0,0 +1,79 @@
+# tests/test_ad_partitions.py
+"""Параллельный экспорт AD по разделам и диапазонам uSNChanged на записанном источнике вместо домена"""
+import json
+
+import pytest
+
+from ad_export import (ad_partition_sources, build_users_table, iter_file_records, iter_partitioned_records,
+                       usn_range_name, usn_ranges)
+from ad_snapshot import user_key
+
+def user(i, usn, ou='cu_users'):
+    return {'Name': f"Пользователь {i}", 'SamAccountName': f"user{i}", 'Enabled': i % 7 != 0, 'EmailAddress': "",
+            'Company': "", 'DistinguishedName': f"CN=user{i},OU={ou},DC=corp,DC=local",
+            'ObjectGUID': f"guid-{i}", 'USNChanged': str(usn)}
+
+def write_export(filename, users, usn=5000):
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(f"Watermark: dc1.corp.local {usn}\n")
+        for item in users:
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    return filename
+
+def keys(records):
+    return sorted(user_key(record) for record in records)
+
+def test_duplicates_across_partitions_are_yielded_once():
+    first = [user(i, i) for i in range(0, 300)]
+    second = [user(i, i) for i in range(200, 500)]
+    sources = [('OU=a', lambda: iter(first)), ('OU=b', lambda: iter(second))]
+
+    records = list(iter_partitioned_records(sources, workers=2))
+    assert keys(records) == keys(user(i, i) for i in range(500))
+
+    # Уже полученные до сбоя пользователи не выдаются повторно
+    seen = {user_key(user(i, i)) for i in range(100)}
+    records = list(iter_partitioned_records(sources, workers=2, seen=seen))
+    assert keys(records) == keys(user(i, i) for i in range(100, 500))
+
+def test_duplicates_across_partition_files_and_ranges(tmp_path):
+    directory = tmp_path / 'разделы'
+    directory.mkdir()
+    write_export(directory / 'cu_users.txt', [user(i, i * 10) for i in range(0, 400)])
+    # Пользователь перемещен во время экспорта и попал в оба раздела
+    write_export(directory / 'гпх.txt', [user(i, i * 10, ou='ГПХ') for i in range(350, 500)])
+
+    watermarks = []
+    sources = ad_partition_sources(str(directory), True, None, [], on_watermark=watermarks.append,
+                                   file_range_count=3)
+    assert [name for name, _ in sources] == [usn_range_name(name, usn_range) for name in ('cu_users.txt', 'гпх.txt')
+                                             for usn_range in usn_ranges(5000, 3)]
+    assert keys(iter_partitioned_records(sources, workers=4)) == keys(user(i, 0) for i in range(500))
+
+def test_recorded_files_are_not_split_by_default(tmp_path):
+    filename = write_export(tmp_path / 'export.txt', [user(i, i) for i in range(10)])
+    sources = ad_partition_sources(str(filename), True, None, [], on_watermark=lambda watermark: None)
+    assert [name for name, _ in sources] == ['']
+
+def test_worker_error_reaches_caller():
+    def failing():
+        yield user(1, 1)
+        raise RuntimeError("PowerShell завершился с кодом 1")
+
+    sources = [('OU=a', lambda: iter([user(i, i) for i in range(1000)])), ('OU=b', failing)]
+    with pytest.raises(RuntimeError, match="кодом 1"):
+        list(iter_partitioned_records(sources, workers=2))
+
+def test_partitioned_export_equals_single_pass(tmp_path):
+    filename = write_export(tmp_path / 'export.txt', [user(i, (i * 7919) % 5000) for i in range(2500)])
+    single = build_users_table(iter_file_records(filename))
+
+    # Медленный контроллер домена: задержка на каждую страницу записей
+    sources = [(usn_range_name('', usn_range),
+                lambda usn_range=usn_range: iter_file_records(filename, latency=0.01, usn_range=usn_range))
+               for usn_range in usn_ranges(5000, 8)]
+    merged = build_users_table(iter_partitioned_records(sources, workers=4))
+
+    assert len(merged) == len(single) == 2500
+    order = ['SamAccountName']
+    assert merged.sort_values(order, ignore_index=True).equals(single.sort_values(order, ignore_index=True))
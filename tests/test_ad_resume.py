@@ -0,0 +1,82 @@
+# tests/test_ad_resume.py
+"""Возобновление прерванного полного экспорта AD внутри раздела по диапазонам uSNChanged"""
+import json
+
+import pytest
+
+import ad_export
+from ad_checkpoint import load_checkpoint
+from ad_export import (ad_partition_sources, build_fast_command, iter_checkpointed_records, usn_ranges,
+                       usn_range_name)
+
+def user(i, usn):
+    return {'Name': f"Пользователь {i}", 'SamAccountName': f"user{i}", 'Enabled': True, 'EmailAddress': "",
+            'Company': "", 'DistinguishedName': f"CN=user{i},OU=cu_users,DC=corp,DC=local",
+            'ObjectGUID': f"guid-{i}", 'USNChanged': str(usn)}
+
+@pytest.fixture
+def recorded_export(tmp_path):
+    """Записанный вывод быстрой команды: 100 пользователей в первом диапазоне, 201 во втором, 99 в третьем"""
+    usns = list(range(1, 101)) + list(range(300, 600))
+    filename = tmp_path / 'export.txt'
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write("Подключение к домену: DC=corp,DC=local\nWatermark: dc1.corp.local 1000\n")
+        for i, usn in enumerate(usns):
+            f.write(json.dumps(user(i, usn), ensure_ascii=False) + "\n")
+    return filename
+
+def test_usn_ranges():
+    assert usn_ranges(1000, 4) == [(0, 250), (251, 500), (501, 750), (751, None)]
+    assert usn_ranges(1000, 1) == [(0, None)]
+    # Малая метка: пустые диапазоны отбрасываются, оставшиеся не пересекаются
+    assert usn_ranges(2, 8) == [(0, 0), (1, 1), (2, None)]
+
+def test_fast_command_range_filter():
+    command = build_fast_command(search_base='OU=cu_users', server='dc1', usn_range=(251, 500))
+    assert "(uSNChanged>=251)(uSNChanged<=500)" in command
+    assert "(uSNChanged" not in build_fast_command(server='dc1', usn_range=(0, None))
+
+def test_resume_inside_partition(tmp_path, recorded_export):
+    directory = tmp_path / 'checkpoint'
+    ranges = usn_ranges(1000, 4)
+
+    checkpoint = load_checkpoint('src', directory)
+    watermarks = []
+    sources = ad_partition_sources(str(recorded_export), True, None, [], on_watermark=watermarks.append,
+                                   fail_after=150, file_range_count=4)
+    assert [name for name, _ in sources] == [usn_range_name('', usn_range) for usn_range in ranges]
+    with pytest.raises(RuntimeError):
+        list(iter_checkpointed_records(sources, checkpoint, watermarks, workers=1))
+
+    # Первый диапазон завершен, из второго сохранена одна пачка до сбоя
+    checkpoint = load_checkpoint('src', directory)
+    assert checkpoint['watermark'] == {'server': 'dc1.corp.local', 'usn': 1000}
+    assert checkpoint['done'] == [usn_range_name('', ranges[0])]
+    assert len(checkpoint['records']) == 200
+
+    watermarks = [checkpoint['watermark']]
+    sources = ad_partition_sources(str(recorded_export), True, None, [], on_watermark=watermarks.append,
+                                   range_watermark=checkpoint['watermark'], file_range_count=4)
+    records = list(iter_checkpointed_records(sources, checkpoint, watermarks, workers=1))
+
+    assert sorted(record['SamAccountName'] for record in records) == sorted(f"user{i}" for i in range(400))
+    # Заново получены только пользователи прерванного и следующих диапазонов
+    assert checkpoint['added'] == 200
+
+def test_domain_split_without_partitions(monkeypatch):
+    """Без AD_PARTITIONS весь домен делится на диапазоны по метке, полученной до опроса"""
+    commands = []
+    monkeypatch.setattr(ad_export, 'discover_partitions',
+                        lambda partitions, server: ({'server': 'dc1', 'usn': 1000}, []))
+    monkeypatch.setattr(ad_export, 'iter_powershell_records',
+                        lambda command, errors, **kwargs: commands.append(command) or iter(()))
+    watermarks = []
+    sources = ad_partition_sources(None, True, None, [], on_watermark=watermarks.append,
+                                   partitions=[], range_count=4)
+
+    assert watermarks == [{'server': 'dc1', 'usn': 1000}]
+    assert len(sources) == 4
+    for _, open_records in sources:
+        list(open_records())
+    assert '"dc1"' in commands[0] and "(uSNChanged<=250)" in commands[0]
+    assert "(uSNChanged>=751)" in commands[3] and "(uSNChanged<=" not in commands[3]
@@ -0,0 +1,110 @@
+# tests/test_ad_snapshot.py
+"""Инкрементальный экспорт AD: слияние изменений со снимком и переход на полный экспорт"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import ad_export
+from ad_export import fetch_changes
+from ad_snapshot import load_snapshot, make_users_table, merge_changes, needs_full_export, save_snapshot
+
+def user(sam, name=None, guid='', dn=None, enabled=True):
+    return {'Name': name or sam, 'SamAccountName': sam, 'Enabled': enabled, 'EmailAddress': "", 'Company': "",
+            'DistinguishedName': dn or f"CN={sam},OU=cu_users,DC=corp,DC=local", 'ObjectGUID': guid,
+            'USNChanged': "1"}
+
+@pytest.fixture
+def snapshot_users():
+    return [
+        user('ivanov', 'Иванов Иван', guid='guid-1'),
+        user('petrov', 'Петров Петр'),
+        user('', 'Служебная', dn="CN=svc,OU=service,DC=corp,DC=local"),
+        user('sidorov', 'Сидоров Сидор', guid='guid-3'),
+    ]
+
+def by_name(users):
+    return {item['Name']: item for item in users}
+
+def test_update_by_object_guid(snapshot_users):
+    # Учетная запись переименована: samAccountName другой, objectGUID тот же
+    merged = merge_changes(snapshot_users, [user('ivanov.i', 'Иванов Иван Иванович', guid='guid-1')])
+    assert len(merged) == 4
+    assert 'Иванов Иван' not in by_name(merged)
+    assert by_name(merged)['Иванов Иван Иванович']['SamAccountName'] == 'ivanov.i'
+
+def test_fallback_match_by_sam_account_name_or_dn(snapshot_users):
+    changed = [
+        user('PETROV', 'Петров Петр Петрович'),
+        user('', 'Служебная учетная запись', dn="CN=svc,OU=service,DC=corp,DC=local"),
+    ]
+    merged = merge_changes(snapshot_users, changed)
+    assert sorted(by_name(merged)) == ['Иванов Иван', 'Петров Петр Петрович', 'Сидоров Сидор',
+                                        'Служебная учетная запись']
+
+def test_disabled_and_moved_users(snapshot_users):
+    changed = [
+        user('sidorov', 'Сидоров Сидор', guid='guid-3', enabled=False),
+        user('petrov', 'Петров Петр', dn="CN=petrov,OU=ГПХ,DC=corp,DC=local"),
+    ]
+    merged = by_name(merge_changes(snapshot_users, changed))
+    assert len(merged) == 4
+    assert merged['Сидоров Сидор']['Enabled'] is False
+    assert merged['Петров Петр']['DistinguishedName'].startswith("CN=petrov,OU=ГПХ")
+
+def test_new_user(snapshot_users):
+    merged = merge_changes(snapshot_users, [user('kuznetsov', 'Кузнецов Петр', guid='guid-9')])
+    assert len(merged) == 5
+    assert by_name(merged)['Кузнецов Петр']['ObjectGUID'] == 'guid-9'
+    assert by_name(merged)['Иванов Иван'] == snapshot_users[0]
+
+def test_needs_full_export():
+    now = datetime.now()
+    watermark = {'server': 'dc1', 'usn': 100}
+    assert needs_full_export(None)
+    assert needs_full_export({'watermark': None, 'full_export_at': now.isoformat()})
+    assert needs_full_export({'watermark': watermark, 'full_export_at': 'вчера'})
+    assert needs_full_export({'watermark': watermark, 'full_export_at': (now - timedelta(days=8)).isoformat()},
+                             max_age_days=7)
+    assert not needs_full_export({'watermark': watermark, 'full_export_at': (now - timedelta(days=1)).isoformat()},
+                                 max_age_days=7)
+
+def test_snapshot_of_other_version_forces_full_export(tmp_path):
+    meta_file, users_file = tmp_path / 'ad_snapshot.json', tmp_path / 'ad_users'
+    users = make_users_table({'Name': ['Иванов Иван'], 'SamAccountName': ['ivanov'], 'Enabled': [True],
+                              'EmailAddress': [''], 'Company': [''], 'DistinguishedName': ['CN=ivanov'],
+                              'ObjectGUID': ['guid-1'], 'USNChanged': ['1'], 'Category': ['']})
+    save_snapshot(users, {'server': 'dc1', 'usn': 1}, meta_filename=meta_file, users_filename=users_file,
+                  error_filename=tmp_path / 'error.json')
+    assert not needs_full_export(load_snapshot(meta_file, users_file))
+
+    meta = json.loads(meta_file.read_text(encoding='utf-8'))
+    meta['version'] -= 1
+    meta_file.write_text(json.dumps(meta), encoding='utf-8')
+    assert load_snapshot(meta_file, users_file) is None
+    assert needs_full_export(load_snapshot(meta_file, users_file))
+
+def test_fetch_changes_from_recorded_file(tmp_path):
+    filename = tmp_path / 'changes.txt'
+    changed = [user('ivanov.i', 'Иванов Иван Иванович', guid='guid-1'), user('kuznetsov', 'Кузнецов Петр')]
+    filename.write_text("Watermark: dc1.corp.local 2000\n"
+                        + "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in changed), encoding='utf-8')
+    watermarks = []
+    records = fetch_changes(str(filename), {'server': 'dc1.corp.local', 'usn': 1000}, [], watermarks)
+    assert [record['SamAccountName'] for record in records] == ['ivanov.i', 'kuznetsov']
+    assert watermarks == [{'server': 'dc1.corp.local', 'usn': 2000}]
+
+    # Ошибка записанного источника не заменяется полным экспортом
+    with pytest.raises(RuntimeError):
+        fetch_changes(str(filename), {'server': 'dc1.corp.local', 'usn': 1000}, [], [], fail_after=1)
+
+def test_failed_live_query_falls_back_to_full_export(monkeypatch):
+    def failing(command, errors, **kwargs):
+        errors.append("Контроллер домена недоступен")
+        raise RuntimeError("PowerShell завершился с кодом 1")
+        yield
+
+    monkeypatch.setattr(ad_export, 'iter_powershell_records', failing)
+    errors = []
+    assert fetch_changes(None, {'server': 'dc1', 'usn': 1000}, errors, []) is None
+    assert errors == ["Контроллер домена недоступен"]
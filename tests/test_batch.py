@@ -0,0 +1,114 @@
+# tests/test_batch.py
+"""Настройки и коды завершения запуска без диалога (batch.py)"""
+import json
+
+import pytest
+
+import batch
+import config
+import main
+from batch import (EMPLOYEE_TYPE_OPTIONS, EXIT_ERROR, EXIT_OK, EXIT_USAGE, EXIT_WARNINGS, SOURCE_OPTIONS,
+                   SettingsError, build_parser, parse_choices, resolve_settings)
+
+def settings_of(argv):
+    return resolve_settings(build_parser().parse_args(argv))
+
+def test_parse_choices():
+    assert parse_choices(['1c', 'KONTUR'], SOURCE_OPTIONS, "Источники") == {1, 3}
+    # Номера пунктов меню, как в диалоге; "все" поглощает остальные
+    assert parse_choices(['2', 1], EMPLOYEE_TYPE_OPTIONS, "Типы") == {1, 2}
+    assert parse_choices(['1c', 'all'], SOURCE_OPTIONS, "Источники") == {0}
+    with pytest.raises(SettingsError, match="неизвестное значение '1с'"):
+        parse_choices(['1с'], SOURCE_OPTIONS, "Источники")
+    with pytest.raises(SettingsError, match="не выбрано"):
+        parse_choices([], SOURCE_OPTIONS, "Источники")
+
+def test_defaults():
+    settings = settings_of([])
+    assert settings['selected_options'] == {0}
+    assert settings['selected_employee_types'] == {0}
+    assert settings['ad_export'] is True
+    assert settings['input_dir'] is None and settings['report_formats'] is None
+
+def test_arguments_override_settings_file(tmp_path):
+    settings_file = tmp_path / 'настройки' / 'ночной.json'
+    settings_file.parent.mkdir()
+    settings_file.write_text(json.dumps({'sources': ['1c', 'kontur'], 'employee_types': ['gph'],
+                                         'output_dir': 'вывод', 'ad_export': False}), encoding='utf-8')
+
+    settings = settings_of(['--config', str(settings_file), '--sources', 'diadoc', '--input-dir', 'данные'])
+    assert settings['selected_options'] == {2}
+    assert settings['selected_employee_types'] == {2}
+    assert settings['ad_export'] is False
+    # Относительные пути файла - от его папки, аргументы - как заданы (от текущей папки)
+    assert settings['output_dir'] == str(settings_file.parent / 'вывод')
+    assert settings['input_dir'] == 'данные'
+
+def test_invalid_settings_file(tmp_path):
+    settings_file = tmp_path / 'ночной.json'
+    settings_file.write_text(json.dumps({'sources': ['1c'], 'outputdir': 'вывод'}), encoding='utf-8')
+    with pytest.raises(SettingsError, match="Неизвестные параметры в файле настроек: outputdir"):
+        settings_of(['--config', str(settings_file)])
+
+    settings_file.write_text(json.dumps({'sources': '1c'}), encoding='utf-8')
+    with pytest.raises(SettingsError, match="списками"):
+        settings_of(['--config', str(settings_file)])
+
+    settings_file.write_text("{", encoding='utf-8')
+    with pytest.raises(SettingsError, match="Не удалось прочитать"):
+        settings_of(['--config', str(settings_file)])
+
+@pytest.fixture
+def fake_process(monkeypatch):
+    """batch.main без обработки: итоги запуска подменяются, логирование и папки не настраиваются"""
+    monkeypatch.setattr(config, 'setup_logging', lambda: None)
+    monkeypatch.setattr(config, 'ensure_directories', lambda: None)
+    for name in ('RECONCILE_INPUT_DIR', 'RECONCILE_OUTPUT_DIR'):
+        monkeypatch.delenv(name, raising=False)
+
+    def set_run(ad=(3, 2, 1), source_rows=None, error=None):
+        def process(*args):
+            if error is not None:
+                raise RuntimeError(error)
+            return {'ad': ad, 'source_rows': source_rows or {'shtat': 3, 'onec': 5},
+                    'load_timings': {}, 'results': {}, 'error': None, 'metrics_file': None}
+        monkeypatch.setattr(main, 'process', process)
+    return set_run
+
+def run_batch(argv, capsys):
+    exit_code = batch.main(argv)
+    output = capsys.readouterr().out
+    return exit_code, json.loads(output) if output else None
+
+def test_exit_ok(fake_process, capsys):
+    fake_process()
+    exit_code, summary = run_batch(['--sources', '1c'], capsys)
+    assert exit_code == EXIT_OK
+    assert summary['status'] == 'ok' and summary['sources'] == ['1c']
+    assert summary['ad'] == {'total': 3, 'employees': 2, 'gph': 1}
+
+def test_exit_error(fake_process, capsys):
+    fake_process(error="нет доступа к домену")
+    exit_code, summary = run_batch(['--sources', '1c'], capsys)
+    assert exit_code == EXIT_ERROR
+    assert summary['error'] == "нет доступа к домену"
+
+def test_exit_usage(fake_process, capsys):
+    fake_process()
+    assert run_batch(['--sources', '1с'], capsys) == (EXIT_USAGE, None)
+
+def test_exit_warnings(fake_process, capsys):
+    fake_process(ad=(0, 0, 0), source_rows={'shtat': 3})
+    exit_code, summary = run_batch(['--sources', '1c'], capsys)
+    assert exit_code == EXIT_WARNINGS
+    assert len(summary['warnings']) == 2
+
+def test_other_folders_in_same_process(fake_process, capsys, tmp_path):
+    fake_process()
+    # Настройки уже загружены с config.OUTPUT_DIR: запуск с другой папкой записал бы результаты в нее
+    assert run_batch(['--sources', '1c', '--output-dir', str(tmp_path)], capsys) == (EXIT_USAGE, None)
+    assert not list(tmp_path.iterdir())
+
+    exit_code, summary = run_batch(['--sources', '1c', '--output-dir', str(config.OUTPUT_DIR)], capsys)
+    assert exit_code == EXIT_OK
+    assert summary['output_dir'] == str(config.OUTPUT_DIR)
@@ -0,0 +1,36 @@
+# tests/test_clean_value.py
+"""Табличная clean_value() и пакетная clean_values() совпадают с прежней посимвольной очисткой"""
+import random
+
+import pytest
+
+from ad_export import clean_value, clean_values
+from benchmarks.bench_clean_value import legacy_clean_value, random_unicode, random_mixed
+
+def assert_equivalent(values):
+    expected = [legacy_clean_value(value) for value in values]
+    assert [clean_value(value) for value in values] == expected
+    assert clean_values(values) == expected
+
+@pytest.mark.parametrize('value', [
+    "", None, 0, 12345, True, " \x00 ", "\x01\x02Иванов\x7f",
+    "Иванов\xa0Иван", "\u200buser\ufeff", "Фамилия\tИмя\nОтчество\r",
+    "\ud800", "Иванов\udfff", "\u0378", "\ue000", "\U0010ffff", "\U000e0001",
+])
+def test_special_values(value):
+    assert_equivalent([value])
+
+def test_random_unicode():
+    """Произвольные кодовые точки, включая суррогаты, неназначенные и private use"""
+    rnd = random.Random(42)
+    assert_equivalent([random_unicode(rnd) for _ in range(20000)])
+
+def test_random_mixed():
+    """Кириллица, пробелы и управляющие символы вперемешку"""
+    rnd = random.Random(42)
+    assert_equivalent([random_mixed(rnd) for _ in range(20000)])
+
+def test_batch_with_one_dirty_value():
+    """Склеенная строка пачки непечатная из-за одного значения, остальные не меняются"""
+    values = [f"user{i}" for i in range(100)] + [" ООО «Компания»\x01 ", None]
+    assert_equivalent(values)
@@ -0,0 +1,43 @@
+# tests/test_config_import.py
+"""Импорт настроек и легких точек входа ничего не создает на диске, не настраивает логирование и не загружает pandas"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.bench_startup import LIGHT_MODULES, PROJECT_DIR
+
+CHECK = """
+import json, logging, sys
+import {module}
+print(json.dumps({{
+    'handlers': len(logging.root.handlers) + len(logging.getLogger('ad_export').handlers),
+    'modules': [name for name in ('pandas', 'numpy', 'openpyxl') if name in sys.modules],
+}}))
+"""
+
+@pytest.mark.parametrize('module', LIGHT_MODULES)
+def test_import_has_no_side_effects(tmp_path, module):
+    input_dir, output_dir = tmp_path / 'эксельки', tmp_path / 'вывод'
+    env = dict(os.environ, RECONCILE_INPUT_DIR=str(input_dir), RECONCILE_OUTPUT_DIR=str(output_dir))
+    result = subprocess.run([sys.executable, '-c', CHECK.format(module=module)], cwd=PROJECT_DIR, env=env,
+                            capture_output=True, text=True, encoding='utf-8')
+    assert result.returncode == 0, result.stderr
+
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    assert loaded['handlers'] == 0
+    assert loaded['modules'] == []
+    # Папки создаются только при запуске (config.ensure_directories)
+    assert list(tmp_path.iterdir()) == []
+
+def test_entry_points_do_not_load_pandas():
+    """Настройки, запуск без диалога и экспорт AD вместе не загружают pandas и numpy"""
+    check = "import sys, config, batch, ad_export; print(' '.join(sorted({'pandas', 'numpy'} & set(sys.modules))))"
+    result = subprocess.run([sys.executable, '-c', check], cwd=PROJECT_DIR,
+                            capture_output=True, text=True, encoding='utf-8')
+    assert result.returncode == 0, result.stderr
+    loaded = result.stdout.split()
+    assert 'pandas' not in loaded
+    assert 'numpy' not in loaded
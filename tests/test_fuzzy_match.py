@@ -0,0 +1,44 @@
+# tests/test_fuzzy_match.py
+"""Нечеткое сопоставление ФИО с AD: блокирующий индекс по вариантам без одного символа и порог сходства"""
+import pandas as pd
+
+from config import FUZZY_MIN_SCORE
+from fuzzy_match import build_fuzzy_index, find_probable_matches, fuzzy_key
+from utils import normalize_names
+
+AD_NAMES = ['Иванов Иван Иванович', 'Петрова Елена Сергеевна', 'Ли Ан']
+
+def matches(names, min_score=FUZZY_MIN_SCORE):
+    """Вероятные совпадения ФИО names с AD: {ключ ФИО: ключ совпадения}"""
+    index = build_fuzzy_index(normalize_names(pd.Series(AD_NAMES)))
+    found = find_probable_matches(normalize_names(pd.Series(names)), index, min_score)
+    return dict(zip(found['ключ'], found['ключ_совпадения']))
+
+def test_fuzzy_key():
+    assert fuzzy_key('IVANOV IVAN') == fuzzy_key('ИВАНОВ ИВАН') == 'ИВАНОВ ИВАН'
+    assert fuzzy_key('ALEKSEY SHCHERBAKOV') == fuzzy_key('АЛЕКСЕЙ ЩЕРБАКОВ')
+    assert fuzzy_key('PETROVA_E.') == 'ПЕТРОВА Е'
+
+def test_typo():
+    assert matches(['Ивагов Иван Петрович', 'Петрва Елена']) == {'ИВАГОВ ИВАН': 'ИВАНОВ ИВАН',
+                                                                  'ПЕТРВА ЕЛЕНА': 'ПЕТРОВА ЕЛЕНА'}
+
+def test_transliteration_and_latin_look_alike_letters():
+    # Логин латиницей и латинская "o" внутри кириллического ФИО
+    assert matches(['Ivanov Ivan', 'Иванoв Иван']) == {'IVANOV IVAN': 'ИВАНОВ ИВАН', 'ИВАНOВ ИВАН': 'ИВАНОВ ИВАН'}
+
+def test_score_below_threshold():
+    # Одна правка в коротком ФИО: сходство 0.8 ниже порога по умолчанию
+    assert matches(['Ли Ян']) == {}
+    assert matches(['Ли Ян'], min_score=0.8) == {'ЛИ ЯН': 'ЛИ АН'}
+    # Две правки не попадают в блокирующий индекс
+    assert matches(['Ивагов Ибан']) == {}
+
+def test_exact_match_excluded():
+    assert matches(['Иванов Иван', 'Петрова Елена Петровна']) == {}
+
+def test_result_columns_and_score():
+    index = build_fuzzy_index(normalize_names(pd.Series(AD_NAMES)))
+    found = find_probable_matches(pd.Series(['ИВАГОВ ИВАН', None]), index)
+    assert list(found.columns) == ['ключ', 'ключ_совпадения', 'сходство']
+    assert found['сходство'].tolist() == [round(1 - 1 / len('ИВАНОВ ИВАН'), 3)]
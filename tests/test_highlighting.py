@@ -0,0 +1,61 @@
+# tests/test_highlighting.py
+"""Подсветка листа "сравнение пользователей" в записанной книге"""
+import pandas as pd
+from openpyxl import load_workbook
+
+from config import RED_COLOR, YELLOW_COLOR
+from excel_processor import assemble_users_sheet, prepare_table, users_sheet_highlighting
+from reconciliation import reconcile
+from utils import highlight_fill, write_workbook
+
+SHEET = 'сравнение пользователей'
+COLORS = {highlight_fill(RED_COLOR).fgColor.rgb: 'red', highlight_fill(YELLOW_COLOR).fgColor.rgb: 'yellow'}
+
+def make_tables():
+    tables = {
+        'ad_employees': pd.DataFrame({'AD_сотрудники': ['Иванов Иван Иванович', 'Петров Петр Петрович'],
+                                      'AD_Статус_сотрудники': 'Активна'}),
+        'ad_gph': pd.DataFrame({'AD_ГПХ': pd.Series([], dtype=object), 'AD_Статус_ГПХ': pd.Series([], dtype=object)}),
+        'shtat': pd.DataFrame({'Штатное_ФИО': ['Иванов Иван Иванович', 'Кузнецов Петр Ильич']}),
+        'onec': pd.DataFrame({
+            '1C_ФИО': ['Орлов Олег', 'Иванов Иван Иванович', 'Орлов Олег', 'Волков Антон',
+                       'Иванов Иван Иванович', 'Сидоров Сидор'],
+            '1C_Активен': ['Да', 'Да', 'Да', 'Нет', 'Нет', 'Да'],
+        }),
+    }
+    for table in tables.values():
+        prepare_table(table)
+    return tables
+
+def fills(filename, sheet_name, column):
+    """Цвет подсветки ячеек столбца листа сверху вниз (None - без подсветки)"""
+    sheet = load_workbook(filename)[sheet_name]
+    header = [cell.value for cell in sheet[1]]
+    cells = [row[header.index(column)] for row in sheet.iter_rows(min_row=2)]
+    return [COLORS.get(cell.fill.fgColor.rgb) if cell.fill.fill_type else None for cell in cells]
+
+def test_users_sheet_fills(tmp_path):
+    tables = make_tables()
+    results = reconcile(tables, {0}, fuzzy=False)
+    sheet = assemble_users_sheet(tables)
+    filename = tmp_path / 'отчет.xlsx'
+    write_workbook({SHEET: sheet}, filename, highlighting={SHEET: users_sheet_highlighting(sheet, results)})
+
+    assert fills(filename, SHEET, 'AD_сотрудники')[:2] == [None, 'yellow']
+    assert fills(filename, SHEET, 'Штатное_ФИО')[:2] == [None, 'yellow']
+    # Дубликат, который еще и подлежит удалению, - красный: красная подсветка применяется после желтой
+    assert fills(filename, SHEET, '1C_ФИО') == ['red', 'red', 'red', None, 'red', 'yellow']
+    # Подсвечивается только столбец ФИО
+    assert fills(filename, SHEET, '1C_Активен') == [None] * 6
+
+def test_fills_continue_on_next_sheet(tmp_path):
+    tables = make_tables()
+    results = reconcile(tables, {0}, fuzzy=False)
+    sheet = assemble_users_sheet(tables)
+    filename = tmp_path / 'отчет.xlsx'
+    write_workbook({SHEET: sheet}, filename, max_rows=5,
+                   highlighting={SHEET: users_sheet_highlighting(sheet, results, shtat_loaded=False)})
+
+    assert fills(filename, SHEET, '1C_ФИО') == ['red', 'red', 'red', None]
+    assert fills(filename, f"{SHEET} (2)", '1C_ФИО') == ['red', 'yellow']
+    assert fills(filename, SHEET, 'AD_сотрудники') == [None] * 4
@@ -0,0 +1,82 @@
+# tests/test_input_cache.py
+"""Кэш разобранных исходных файлов: записи без pickle, у каждой свой файл метаданных"""
+import os
+
+import pandas as pd
+
+from input_cache import cache_stats, invalidate_cache, load_cached
+
+def parse_names(file_path):
+    return pd.DataFrame({'ФИО': file_path.read_text(encoding='utf-8').split('\n'), 'Активен': 'Да'})
+
+def other_parse(file_path):
+    return parse_names(file_path).assign(Активен='Нет')
+
+def other_parse_v2(file_path):
+    return other_parse(file_path)
+
+# Та же функция разбора, что parse_names, после исправления
+other_parse_v2.__qualname__ = parse_names.__qualname__
+
+def test_hit_after_miss(tmp_path):
+    source_file = tmp_path / 'выгрузка.txt'
+    source_file.write_text('Иванов Иван\nПетров Петр', encoding='utf-8')
+    cache_dir = tmp_path / 'кэш'
+
+    hits = cache_stats['hits']
+    first = load_cached('kontur', source_file, parse_names, cache_dir=cache_dir)
+    second = load_cached('kontur', source_file, parse_names, cache_dir=cache_dir)
+
+    assert cache_stats['hits'] == hits + 1
+    pd.testing.assert_frame_equal(second, first, check_dtype=False)
+    assert not list(cache_dir.glob('*.pkl')) and not (cache_dir / 'index.json').exists()
+    assert len(list(cache_dir.glob('*.json'))) == 1
+
+def test_changed_file_replaces_entry(tmp_path):
+    source_file = tmp_path / 'выгрузка.txt'
+    source_file.write_text('Иванов Иван', encoding='utf-8')
+    cache_dir = tmp_path / 'кэш'
+    load_cached('kontur', source_file, parse_names, cache_dir=cache_dir)
+
+    source_file.write_text('Иванов Иван\nСидоров Сидор', encoding='utf-8')
+    stat = source_file.stat()
+    os.utime(source_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    df = load_cached('kontur', source_file, parse_names, cache_dir=cache_dir)
+
+    assert df['ФИО'].tolist() == ['Иванов Иван', 'Сидоров Сидор']
+    assert len(list(cache_dir.glob('*.json'))) == 1
+
+def test_entries_of_other_sources_kept(tmp_path):
+    """Запись одного источника не затирает метаданные другого (раньше - общий индекс)"""
+    source_file = tmp_path / 'выгрузка.txt'
+    source_file.write_text('Иванов Иван', encoding='utf-8')
+    cache_dir = tmp_path / 'кэш'
+    load_cached('kontur', source_file, parse_names, cache_dir=cache_dir)
+    load_cached('diadoc', source_file, other_parse, cache_dir=cache_dir)
+    assert len(list(cache_dir.glob('*.json'))) == 2
+
+    assert invalidate_cache('kontur', cache_dir=cache_dir) == 1
+    hits = cache_stats['hits']
+    assert load_cached('diadoc', source_file, other_parse, cache_dir=cache_dir)['Активен'].tolist() == ['Нет']
+    assert cache_stats['hits'] == hits + 1
+
+def test_legacy_files_removed_on_clear(tmp_path):
+    cache_dir = tmp_path / 'кэш'
+    cache_dir.mkdir()
+    (cache_dir / 'index.json').write_text('{"version": 1, "entries": {}}', encoding='utf-8')
+    (cache_dir / 'old.pkl').write_bytes(b'not a pickle')
+    invalidate_cache(cache_dir=cache_dir)
+    assert not list(cache_dir.iterdir())
+
+def test_new_parser_version_reparses_file(tmp_path):
+    source_file = tmp_path / 'выгрузка.txt'
+    source_file.write_text('Иванов Иван', encoding='utf-8')
+    cache_dir = tmp_path / 'кэш'
+    load_cached('kontur', source_file, parse_names, cache_dir=cache_dir)
+
+    # Исправленный разбор с тем же именем функции: таблица прежней версии не используется
+    misses = cache_stats['misses']
+    df = load_cached('kontur', source_file, other_parse_v2, parser_version=2, cache_dir=cache_dir)
+    assert cache_stats['misses'] == misses + 1
+    assert df['Активен'].tolist() == ['Нет']
+    assert len(list(cache_dir.glob('*.json'))) == 1
@@ -0,0 +1,105 @@
+# tests/test_metrics.py
+"""Замеры этапов запуска и файл метрик в папке логов"""
+import json
+import os
+import threading
+from datetime import datetime
+
+import pytest
+
+import config
+import metrics
+from metrics import reset, stage, write_metrics
+
+@pytest.fixture(autouse=True)
+def clean_stages():
+    reset()
+    yield
+    reset()
+
+def by_stage():
+    return {record['stage']: record for record in metrics.stages}
+
+def test_nested_stages():
+    with stage('reconcile') as outer:
+        with stage('reconcile.onec', rows=10) as inner:
+            inner['rows'] = 12
+        with stage('reconcile.kontur'):
+            pass
+    with stage('write_xlsx'):
+        pass
+
+    # Этапы записываются в порядке завершения, вложенный - раньше внешнего
+    assert [record['stage'] for record in metrics.stages] == ['reconcile.onec', 'reconcile.kontur',
+                                                             'reconcile', 'write_xlsx']
+    records = by_stage()
+    assert records['reconcile.onec']['parent'] == 'reconcile'
+    assert records['reconcile.kontur']['parent'] == 'reconcile'
+    assert records['reconcile']['parent'] is None and records['write_xlsx']['parent'] is None
+    assert records['reconcile.onec']['rows'] == 12
+    assert records['reconcile'] is outer
+    for record in metrics.stages:
+        assert record['pid'] == os.getpid()
+        assert record['wall_s'] >= 0 and record['cpu_s'] >= 0
+    assert outer['wall_s'] >= records['reconcile.onec']['wall_s']
+
+def test_stage_in_other_thread():
+    def export(parent):
+        with stage('ad_export', parent=parent):
+            with stage('ad_export.partition'):
+                pass
+
+    with stage('load_sources'):
+        # Открытый этап другого потока не становится родителем сам по себе
+        thread = threading.Thread(target=export, args=(None,))
+        thread.start()
+        thread.join()
+        thread = threading.Thread(target=export, args=('load_sources',))
+        thread.start()
+        thread.join()
+
+    parents = [(record['stage'], record['parent']) for record in metrics.stages]
+    assert parents == [('ad_export.partition', 'ad_export'), ('ad_export', None),
+                       ('ad_export.partition', 'ad_export'), ('ad_export', 'load_sources'),
+                       ('load_sources', None)]
+
+def test_stage_recorded_on_error():
+    with pytest.raises(ValueError):
+        with stage('reconcile'):
+            with stage('reconcile.onec'):
+                raise ValueError
+    assert [record['stage'] for record in metrics.stages] == ['reconcile.onec', 'reconcile']
+    # Стек потока после ошибки пуст: следующий этап - верхнего уровня
+    with stage('write_xlsx'):
+        pass
+    assert by_stage()['write_xlsx']['parent'] is None
+
+def test_reset():
+    with stage('reconcile'):
+        pass
+    metrics.add_stage({'stage': 'load.onec', 'parent': 'load_sources', 'pid': 1, 'rows': 5, 'wall_s': 0.5})
+    assert len(metrics.stages) == 2
+    reset()
+    assert metrics.stages == []
+
+def test_metrics_file_in_log_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'LOG_DIR', tmp_path / 'вывод' / 'log')
+    with stage('load_sources'):
+        pass
+    metrics.add_stage({'stage': 'load.onec', 'parent': 'load_sources', 'pid': 1, 'rows': 5, 'wall_s': 0.5})
+
+    filename = config.metrics_file(datetime(2024, 3, 1, 9, 30, 5))
+    assert write_metrics(filename, report_files=[tmp_path / 'отчет.xlsx']) == filename
+    assert filename == tmp_path / 'вывод' / 'log' / 'метрики_20240301_093005.json'
+
+    document = json.loads(filename.read_text(encoding='utf-8'))
+    assert document['report_files'] == [str(tmp_path / 'отчет.xlsx')]
+    assert [record['stage'] for record in document['stages']] == ['load_sources', 'load.onec']
+    assert document['stages'][1]['parent'] == 'load_sources'
+    assert 'written_at' in document and 'peak_memory_mb' in document
+
+def test_metrics_file_not_written(tmp_path):
+    blocker = tmp_path / 'log'
+    blocker.write_text('', encoding='utf-8')
+    # Папка логов не создается (на ее месте файл) - запуск продолжается без метрик
+    assert write_metrics(blocker / 'метрики.json') is None
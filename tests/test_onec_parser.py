@@ -0,0 +1,47 @@
+# tests/test_onec_parser.py
+"""Разбор отчета 1С в режиме только для чтения"""
+import re
+import zipfile
+
+from openpyxl import Workbook
+
+from processors.onec_processor import ONEC_SHEET_NAME, read_onec_file
+
+def write_report(filename, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = ONEC_SHEET_NAME
+    sheet.append(['Параметры:', None, None, None, None])
+    sheet.append(['Пользователь', None, None, None, 'Недействителен'])
+    for row in rows:
+        sheet.append(row)
+    workbook.save(filename)
+
+def test_statuses_and_service_accounts(tmp_path):
+    filename = tmp_path / 'Users.1C.xlsx'
+    write_report(filename, [
+        ['Иванов Иван Иванович', None, None, None, 'Нет'],
+        ['Петров Петр Петрович', None, None, None, 'Да'],
+        ['Сервис обмена', None, None, None, 'Нет'],
+        ['Сидоров Сидор', None, None, None, None],
+    ])
+    df = read_onec_file(filename)
+    assert df['1C_ФИО'].tolist() == ['Иванов Иван Иванович', 'Петров Петр Петрович', 'Сидоров Сидор']
+    assert df['1C_Активен'].tolist() == ['Да', 'Нет', 'Да']
+
+def test_wrong_sheet_dimensions(tmp_path):
+    """Выгрузки 1С записывают размеры листа A1:A1; строки и столбцы за ними не теряются"""
+    filename = tmp_path / 'Users.1C.xlsx'
+    write_report(filename, [[f"Фамилия{i} Имя", None, None, None, 'Да'] for i in range(50)])
+
+    patched = tmp_path / 'patched.xlsx'
+    with zipfile.ZipFile(filename) as source, zipfile.ZipFile(patched, 'w') as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename.startswith('xl/worksheets/'):
+                data = re.sub(rb'<dimension ref="[^"]*"', b'<dimension ref="A1:A1"', data)
+            target.writestr(item, data)
+
+    df = read_onec_file(patched)
+    assert len(df) == 50
+    assert set(df['1C_Активен']) == {'Нет'}
@@ -0,0 +1,67 @@
+# tests/test_person_keys.py
+"""Составной ключ ФИО с отчеством и сопоставление по краткому ключу для неоднозначных записей"""
+import pandas as pd
+
+from excel_processor import prepare_table
+from reconciliation import reconcile, resolve_person_keys
+
+def person_keys(records):
+    """Составные ключи и признаки неоднозначности для записей (краткий ключ, отчество)"""
+    short_keys = pd.Series([short for short, _ in records], dtype=object)
+    patronymics = pd.Series([patronymic for _, patronymic in records], dtype=object)
+    codes, keys, ambiguous = resolve_person_keys(short_keys, patronymics)
+    return [keys[code] if code >= 0 else None for code in codes], ambiguous.tolist()
+
+def test_full_patronymic():
+    keys, ambiguous = person_keys([('ИВАНОВ ИВАН', 'ИВАНОВИЧ'), ('ИВАНОВ ИВАН', 'ПЕТРОВИЧ')])
+    # Два человека с одним кратким ключом различаются отчеством
+    assert keys == ['ИВАНОВ ИВАН ИВАНОВИЧ', 'ИВАНОВ ИВАН ПЕТРОВИЧ']
+    assert ambiguous == [False, False]
+
+def test_initial():
+    keys, ambiguous = person_keys([('ИВАНОВ ИВАН', 'ИВАНОВИЧ'), ('ИВАНОВ ИВАН', 'И'),
+                                   ('ОРЛОВ ОЛЕГ', 'А'), ('ОРЛОВ ОЛЕГ', 'ПЕТРОВИЧ')])
+    # Инициал раскрывается единственным полным отчеством на эту букву, иначе остается инициалом
+    assert keys == ['ИВАНОВ ИВАН ИВАНОВИЧ', 'ИВАНОВ ИВАН ИВАНОВИЧ', 'ОРЛОВ ОЛЕГ А', 'ОРЛОВ ОЛЕГ ПЕТРОВИЧ']
+    assert ambiguous == [False] * 4
+
+def test_initial_with_several_patronymics_is_ambiguous():
+    keys, ambiguous = person_keys([('ПЕТРОВ ПЕТР', 'ИВАНОВИЧ'), ('ПЕТРОВ ПЕТР', 'ИЛЬИЧ'), ('ПЕТРОВ ПЕТР', 'И')])
+    assert keys == ['ПЕТРОВ ПЕТР ИВАНОВИЧ', 'ПЕТРОВ ПЕТР ИЛЬИЧ', 'ПЕТРОВ ПЕТР']
+    assert ambiguous == [False, False, True]
+
+def test_missing_patronymic():
+    keys, ambiguous = person_keys([('СИДОРОВ СИДОР', ''), ('СИДОРОВ СИДОР', 'СИДОРОВИЧ'),
+                                   ('ЛИ АН', ''), ('ЛИ АН', '')])
+    # Единственное отчество среди записей с тем же кратким ключом; если отчеств нет - краткий ключ
+    assert keys == ['СИДОРОВ СИДОР СИДОРОВИЧ', 'СИДОРОВ СИДОР СИДОРОВИЧ', 'ЛИ АН', 'ЛИ АН']
+    assert ambiguous == [False] * 4
+
+def test_missing_patronymic_with_two_people_is_ambiguous():
+    keys, ambiguous = person_keys([('ИВАНОВ ИВАН', 'ИВАНОВИЧ'), ('ИВАНОВ ИВАН', 'ПЕТРОВИЧ'), ('ИВАНОВ ИВАН', '')])
+    assert keys == ['ИВАНОВ ИВАН ИВАНОВИЧ', 'ИВАНОВ ИВАН ПЕТРОВИЧ', 'ИВАНОВ ИВАН']
+    assert ambiguous == [False, False, True]
+
+def test_empty_name():
+    keys, ambiguous = person_keys([(None, ''), ('ИВАНОВ ИВАН', 'ИВАНОВИЧ')])
+    assert keys == [None, 'ИВАНОВ ИВАН ИВАНОВИЧ']
+    assert ambiguous == [False, False]
+
+def test_users_to_remove_by_composite_key():
+    tables = {
+        'ad_employees': pd.DataFrame({'AD_сотрудники': ['Иванов Иван Иванович', 'Иванов Иван Петрович',
+                                                        'Петров Петр Павлович', 'Сидоров Сидор']}),
+        'ad_gph': pd.DataFrame({'AD_ГПХ': pd.Series([], dtype=object)}),
+        'onec': pd.DataFrame({
+            '1C_ФИО': ['Иванов Иван', 'Иванов Иван Сергеевич', 'Петров Петр П.', 'Сидоров Сидор Сидорович'],
+            '1C_Активен': 'Да',
+        }),
+    }
+    for table in tables.values():
+        prepare_table(table)
+    users_to_remove = reconcile(tables, {0}, fuzzy=False)['users_to_remove_1c']
+
+    # "Иванов Иван" без отчества неоднозначен (в AD два Ивана Ивановых) и сопоставляется
+    # по краткому ключу; "Иванов Иван Сергеевич" - другой человек, его в AD нет;
+    # инициал и отсутствующее в AD отчество раскрываются до того же человека
+    assert users_to_remove['1C_ФИО'].tolist() == ['Иванов Иван Сергеевич']
@@ -0,0 +1,52 @@
+# tests/test_result_files.py
+"""Наборы результатов в машиночитаемых форматах (CSV, JSON Lines, Parquet)"""
+import importlib.util
+import json
+
+import pandas as pd
+
+import utils
+from utils import write_result_files
+
+RESULT_SETS = {
+    'users_to_remove_1c': pd.DataFrame({'1C_ФИО': ['Иванов Иван', 'Петров, "Петр"'], '1C_Активен': ['Да', None]},
+                                       index=[5, 9]),
+    'duplicates_1c': pd.DataFrame({'1C_ФИО': pd.Series([], dtype=object)}),
+}
+
+def test_csv_and_jsonl(tmp_path):
+    files = write_result_files(RESULT_SETS, tmp_path / 'результаты', ['csv', 'jsonl'])
+    assert [path.name for path in files] == ['users_to_remove_1c.csv', 'users_to_remove_1c.jsonl',
+                                             'duplicates_1c.csv', 'duplicates_1c.jsonl']
+
+    csv = pd.read_csv(tmp_path / 'результаты' / 'users_to_remove_1c.csv', dtype=str, keep_default_na=False)
+    # Индекс таблицы не записывается, пустое значение - пустая ячейка
+    assert csv.to_dict('records') == [{'1C_ФИО': 'Иванов Иван', '1C_Активен': 'Да'},
+                                      {'1C_ФИО': 'Петров, "Петр"', '1C_Активен': ''}]
+
+    lines = (tmp_path / 'результаты' / 'users_to_remove_1c.jsonl').read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == [{'1C_ФИО': 'Иванов Иван', '1C_Активен': 'Да'},
+                                                    {'1C_ФИО': 'Петров, "Петр"', '1C_Активен': None}]
+    # Кириллица записывается как есть, без \u-последовательностей
+    assert 'Иванов' in lines[0]
+
+def test_empty_result_sets(tmp_path):
+    write_result_files(RESULT_SETS, tmp_path, ['csv', 'jsonl'])
+    # Пустой набор - файл с заголовком, чтобы его не путали с невычисленным
+    assert (tmp_path / 'duplicates_1c.csv').read_text(encoding='utf-8').strip() == '1C_ФИО'
+    assert (tmp_path / 'duplicates_1c.jsonl').read_text(encoding='utf-8').strip() == ''
+
+def test_parquet_skipped_without_pyarrow(tmp_path, monkeypatch, caplog):
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(utils.importlib.util, 'find_spec',
+                        lambda name, *args: None if name in ('pyarrow', 'fastparquet') else find_spec(name, *args))
+    files = write_result_files(RESULT_SETS, tmp_path, ['parquet', 'csv'])
+
+    assert [path.name for path in files] == ['users_to_remove_1c.csv', 'duplicates_1c.csv']
+    assert not list(tmp_path.glob('*.parquet'))
+    assert "parquet пропущен" in caplog.text
+
+def test_no_supported_formats(tmp_path):
+    directory = tmp_path / 'результаты'
+    assert write_result_files(RESULT_SETS, directory, ['xlsx']) == []
+    assert not directory.exists()
@@ -0,0 +1,77 @@
+# tests/test_run_state.py
+"""Отчет об изменениях с прошлого запуска и сохранение состояния сверки"""
+import json
+
+import pandas as pd
+
+from run_state import NEW, RESOLVED, STATE_COLUMNS, load_state, merge_states, save_state, state_changes
+
+def make_state(sets):
+    """Состояние из {набор: [ФИО]}; ключ - ФИО заглавными буквами"""
+    rows = [(name, fio.upper(), fio) for name, names in sets.items() for fio in names]
+    state = pd.DataFrame(rows, columns=STATE_COLUMNS)
+    state['набор'] = pd.Categorical(state['набор'], categories=list(sets))
+    return state
+
+def changes_of(changes):
+    return sorted(zip(changes['изменение'], changes['набор'], changes['ФИО']))
+
+def save_and_load(state, tmp_path):
+    save_state(state, filename=tmp_path / 'сверка', meta_filename=tmp_path / 'сверка.json')
+    return load_state(tmp_path / 'сверка', tmp_path / 'сверка.json')
+
+def test_new_and_resolved():
+    previous = make_state({'users_to_remove_1c': ['Иванов Иван', 'Петров Петр'], 'duplicates_1c': []})
+    current = make_state({'users_to_remove_1c': ['Петров Петр', 'Сидоров Сидор'], 'duplicates_1c': ['Орлов Олег']})
+    assert changes_of(state_changes(previous, current)) == [
+        (NEW, 'duplicates_1c', 'Орлов Олег'),
+        (NEW, 'users_to_remove_1c', 'Сидоров Сидор'),
+        (RESOLVED, 'users_to_remove_1c', 'Иванов Иван'),
+    ]
+
+def test_first_run(tmp_path):
+    assert load_state(tmp_path / 'сверка', tmp_path / 'сверка.json') is None
+
+    current = make_state({'users_to_remove_1c': ['Иванов Иван']})
+    saved = merge_states(None, current)
+    loaded, meta = save_and_load(saved, tmp_path)
+    pd.testing.assert_frame_equal(loaded, current)
+    assert meta['sets'] == {'users_to_remove_1c': 1}
+
+def test_sets_missing_from_one_run_are_not_compared():
+    previous = make_state({'users_to_remove_1c': ['Иванов Иван'], 'users_to_remove_kontur': ['Петров Петр']})
+    current = make_state({'users_to_remove_1c': ['Иванов Иван'], 'missing_in_ad': ['Сидоров Сидор']})
+    # Контур не выбран в этом запуске, штатка не загружалась в прошлом - ни "устранено", ни "новое"
+    assert state_changes(previous, current).empty
+
+def test_partial_run_keeps_baseline_of_other_systems(tmp_path):
+    full = make_state({'users_to_remove_1c': ['Иванов Иван'], 'users_to_remove_kontur': ['Петров Петр']})
+    save_and_load(full, tmp_path)
+
+    # Запуск только по 1С
+    previous, _ = load_state(tmp_path / 'сверка', tmp_path / 'сверка.json')
+    only_1c = make_state({'users_to_remove_1c': ['Иванов Иван', 'Орлов Олег']})
+    assert changes_of(state_changes(previous, only_1c)) == [(NEW, 'users_to_remove_1c', 'Орлов Олег')]
+    loaded, meta = save_and_load(merge_states(previous, only_1c), tmp_path)
+    assert meta['sets'] == {'users_to_remove_1c': 2, 'users_to_remove_kontur': 1}
+
+    # Следующий полный запуск сравнивает Контур с последним запуском, в котором он выбирался
+    next_full = make_state({'users_to_remove_1c': ['Иванов Иван', 'Орлов Олег'],
+                            'users_to_remove_kontur': ['Сидоров Сидор']})
+    assert changes_of(state_changes(loaded, next_full)) == [
+        (NEW, 'users_to_remove_kontur', 'Сидоров Сидор'),
+        (RESOLVED, 'users_to_remove_kontur', 'Петров Петр'),
+    ]
+
+def test_current_sets_replace_stored_ones():
+    previous = make_state({'users_to_remove_1c': ['Иванов Иван'], 'duplicates_1c': ['Петров Петр']})
+    current = make_state({'users_to_remove_1c': [], 'duplicates_1c': ['Петров Петр']})
+    pd.testing.assert_frame_equal(merge_states(previous, current), current)
+
+def test_state_of_other_version_is_ignored(tmp_path):
+    save_and_load(make_state({'users_to_remove_1c': ['Иванов Иван']}), tmp_path)
+    meta_file = tmp_path / 'сверка.json'
+    meta = json.loads(meta_file.read_text(encoding='utf-8'))
+    meta['version'] += 1
+    meta_file.write_text(json.dumps(meta), encoding='utf-8')
+    assert load_state(tmp_path / 'сверка', meta_file) is None
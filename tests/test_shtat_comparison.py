@@ -0,0 +1,40 @@
+# tests/test_shtat_comparison.py
+"""Расхождения AD и штатного расписания в обе стороны"""
+import pandas as pd
+
+from excel_processor import comparison_table, prepare_table
+from reconciliation import reconcile
+
+def make_tables(ad_employees, ad_gph, shtat=None):
+    tables = {
+        'ad_employees': pd.DataFrame({'AD_сотрудники': pd.Series(ad_employees, dtype=object)}),
+        'ad_gph': pd.DataFrame({'AD_ГПХ': pd.Series(ad_gph, dtype=object)}),
+    }
+    if shtat is not None:
+        tables['shtat'] = pd.DataFrame({'Штатное_ФИО': pd.Series(shtat, dtype=object)})
+    for table in tables.values():
+        prepare_table(table)
+    return tables
+
+def test_names_on_one_side_only():
+    ad_employees = ['Иванов Иван Иванович', 'Петров Петр', 'Петров Петр', 'Орлов Олег']
+    shtat = ['ИВАНОВ ИВАН ИВАНОВИЧ', 'Кузнецов Пётр', 'Кузнецов Петр', 'Смирнов Олег', None, 'Орлов Олег Олегович']
+    tables = make_tables(ad_employees, ['Смирнов Олег'], shtat)
+    results = reconcile(tables, {0}, fuzzy=False)
+
+    # По одной записи на человека; "Орлов Олег" в AD - тот же человек, что в штатке с отчеством
+    assert results['missing_in_shtat'].tolist() == [1]
+    # Обратная проверка - по учетным записям сотрудников: ГПХ не считается сотрудником
+    assert results['missing_in_ad'].tolist() == [1, 3]
+
+    table = comparison_table(results['missing_in_shtat'], tables['ad_employees']['AD_сотрудники'],
+                             results['missing_in_ad'], tables['shtat']['Штатное_ФИО'])
+    assert table['ФИО'].tolist() == ['Петров Петр', 'Кузнецов Петр', 'Смирнов Олег']
+    assert table['Статус'].tolist() == ['Активен в AD, но отсутствует в штатном расписании',
+                                        'Есть в штатном расписании, но отсутствует в AD',
+                                        'Есть в штатном расписании, но отсутствует в AD']
+
+def test_without_shtat():
+    results = reconcile(make_tables(['Иванов Иван'], []), {0}, fuzzy=False)
+    assert results['missing_in_shtat'].tolist() == [0]
+    assert results['missing_in_ad'].tolist() == []
@@ -0,0 +1,93 @@
+# tests/test_table_store.py
+"""Таблицы снимка AD, кэша и состояния запуска сохраняются без pickle и читаются с теми же типами"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import table_store
+from ad_snapshot import EMPLOYEE, GPH, load_users_table, make_users_table, save_snapshot
+from run_state import STATE_COLUMNS, load_state, save_state
+from table_store import read_table, table_file, write_table
+
+def sample_table():
+    return pd.DataFrame({
+        'ФИО': ['Иванов Иван', None, '', ' "Петров",\nПетр '],
+        'Активен': [True, False, True, False],
+        'Строк': [1, 2, 3, 4],
+        'Доля': [0.5, np.nan, 1e-300, -0.0],
+        'Категория': pd.Categorical([EMPLOYEE, GPH, '', None], categories=['', EMPLOYEE, GPH]),
+        # Столбец Excel со значениями разных типов и пропусками
+        'Администратор': pd.Series([True, np.nan, 'да', 3], dtype=object),
+    })
+
+@pytest.fixture(params=['csv', 'parquet'])
+def table_format(request, monkeypatch):
+    if request.param == 'parquet':
+        pytest.importorskip('pyarrow')
+    monkeypatch.setattr(table_store, 'table_format', lambda: request.param)
+    return request.param
+
+def test_round_trip(tmp_path, table_format):
+    df = sample_table()
+    table = write_table(df, tmp_path / 'таблица')
+    assert table['format'] == table_format
+    assert table_file(tmp_path / 'таблица', table).exists()
+
+    loaded = read_table(tmp_path / 'таблица', table)
+    pd.testing.assert_frame_equal(loaded, df, check_dtype=False)
+    assert loaded['Активен'].dtype == bool
+    assert isinstance(loaded['Категория'].dtype, pd.CategoricalDtype)
+    assert loaded['Администратор'].tolist()[2:] == ['да', 3]
+
+def test_other_format_removed(tmp_path, monkeypatch):
+    (tmp_path / 'таблица.parquet').write_bytes(b'old')
+    monkeypatch.setattr(table_store, 'table_format', lambda: 'csv')
+    write_table(sample_table(), tmp_path / 'таблица')
+    assert not (tmp_path / 'таблица.parquet').exists()
+
+def test_unsupported_column(tmp_path):
+    df = pd.DataFrame({'Дата': pd.to_datetime(['2024-01-01'])})
+    with pytest.raises(TypeError):
+        write_table(df, tmp_path / 'таблица')
+
+def test_snapshot_round_trip(tmp_path, table_format):
+    users = make_users_table({
+        'Name': ['Иванов Иван', 'Петров Петр'],
+        'SamAccountName': ['ivanov', 'petrov'],
+        'Enabled': [True, False],
+        'EmailAddress': ['', 'petrov@corp.local'],
+        'Company': ['', ''],
+        'DistinguishedName': ['CN=Иванов,OU=cu_users', 'CN=Петров,OU=ГПХ'],
+        'ObjectGUID': ['', ''],
+        'USNChanged': ['10', '11'],
+        'Category': [EMPLOYEE, ''],
+    })
+    meta_file = tmp_path / 'ad_snapshot.json'
+    save_snapshot(users, {'server': 'dc1', 'usn': 11}, meta_filename=meta_file,
+                  users_filename=tmp_path / 'ad_users', error_filename=tmp_path / 'error.json')
+
+    loaded = load_users_table(meta_file, tmp_path / 'ad_users')
+    pd.testing.assert_frame_equal(loaded, users, check_dtype=False)
+    assert not list(tmp_path.glob('*.pkl'))
+
+def test_run_state_round_trip(tmp_path):
+    # Пустой набор остается в категориях: он был вычислен в этом запуске
+    state = pd.DataFrame({
+        'набор': pd.Categorical(['users_to_remove_1c', 'users_to_remove_1c', 'duplicates_1c'],
+                                categories=['users_to_remove_1c', 'duplicates_1c', 'missing_in_ad']),
+        'ключ': ['ИВАНОВ ИВАН ИВАНОВИЧ', 'ПЕТРОВ ПЕТР', 'СИДОРОВ СИДОР'],
+        'ФИО': ['Иванов Иван Иванович', 'Петров Петр', None],
+    }, columns=STATE_COLUMNS)
+    filename, meta_file = tmp_path / 'сверка', tmp_path / 'сверка.json'
+    (tmp_path / 'сверка.pkl').write_bytes(b'not a pickle')
+    meta = save_state(state, filename=filename, meta_filename=meta_file)
+
+    assert meta['sets'] == {'users_to_remove_1c': 2, 'duplicates_1c': 1, 'missing_in_ad': 0}
+    assert not list(tmp_path.glob('*.pkl'))
+    loaded, _ = load_state(filename, meta_file)
+    pd.testing.assert_frame_equal(loaded, state)
+
+def test_run_state_of_previous_format_is_ignored(tmp_path):
+    meta_file = tmp_path / 'сверка.json'
+    meta_file.write_text('{"version": 1, "saved_at": "2024-01-01T00:00:00"}', encoding='utf-8')
+    assert load_state(tmp_path / 'сверка', meta_file) is None
@@ -0,0 +1,116 @@
+# tests/test_users_to_remove.py
+"""
+Пользователи для удаления из систем: сверка по матрице присутствия
+(reconciliation.reconcile) на небольших таблицах и прежние поиски
+на столбцах старого формата (benchmarks.legacy_search) в сравнении с их
+копиями на обходе строк из benchmarks.bench_users_to_remove
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.legacy_search import (legacy_masked_comparison_find_users_to_remove,
+                                      legacy_masked_find_users_to_remove)
+from benchmarks.bench_users_to_remove import (
+    legacy_comparison_find_users_to_remove, legacy_utils_find_users_to_remove, same_result,
+)
+from excel_processor import prepare_table
+from reconciliation import reconcile
+
+def make_tables(**systems):
+    """Подготовленные таблицы AD и штатного расписания и переданных систем"""
+    tables = {
+        'ad_employees': pd.DataFrame({'AD_сотрудники': ['Иванов Иван Иванович', 'Петрова Елена Сергеевна']}),
+        'ad_gph': pd.DataFrame({'AD_ГПХ': ['Смирнов Олег Петрович']}),
+        'shtat': pd.DataFrame({'Штатное_ФИО': ['Иванов Иван Иванович']}),
+        **systems,
+    }
+    for table in tables.values():
+        prepare_table(table)
+    return tables
+
+def test_active_users_missing_in_ad():
+    onec = pd.DataFrame({
+        '1C_ФИО': ['Иванов Иван Иванович', 'Кузнецов Петр Ильич', 'ПЕТРОВА ЁЛЕНА СЕРГЕЕВНА',
+                   'Орлов Игорь Андреевич', None, 'Смирнов Олег Петрович', 'Волков Антон Юрьевич'],
+        '1C_Активен': ['Да', 'Да', 'Да', 'Нет', 'Да', 'Да', ' да '],
+    }, index=[10, 11, 12, 13, 14, 15, 16])
+    results = reconcile(make_tables(onec=onec), {1}, fuzzy=False)
+
+    users_to_remove = results['users_to_remove_1c']
+    # Нет в AD и активны; статус - без учета регистра и пробелов; ГПХ в AD - даже если выбраны
+    # только сотрудники; записи без ФИО не попадают; индекс исходной таблицы сохраняется
+    assert users_to_remove.index.tolist() == [11, 16]
+    assert users_to_remove['1C_ФИО'].tolist() == ['Кузнецов Петр Ильич', 'Волков Антон Юрьевич']
+    assert users_to_remove['1C_Активен'].tolist() == ['Да', 'да']
+
+def test_status_columns_of_current_sources():
+    """Прежние поиски проверяли столбцы статуса, которых в текущих таблицах нет, и не находили никого"""
+    kontur = pd.DataFrame({
+        'Контур_Диадок_ФИО': ['Кузнецов Петр Ильич', 'Орлов Игорь Андреевич', 'Иванов Иван Иванович'],
+        'Контур_Диадок_статус': ['активна', 'заблокирована', 'активна'],
+    })
+    diadoc = pd.DataFrame({
+        'Сфера_Курьер_ФИО': ['Кузнецов Петр Ильич', 'Орлов Игорь Андреевич'],
+        'Сфера_Курьер_Активен': ['Нет', 'Да'],
+    })
+    tables = make_tables(kontur=kontur, diadoc=diadoc)
+    results = reconcile(tables, {0}, fuzzy=False)
+
+    assert results['users_to_remove_kontur']['Контур_Диадок_ФИО'].tolist() == ['Кузнецов Петр Ильич']
+    assert results['users_to_remove_diadoc']['Сфера_Курьер_ФИО'].tolist() == ['Орлов Игорь Андреевич']
+    assert 'users_to_remove_1c' not in results
+
+    staff_df = pd.DataFrame({'AD_ФИО': tables['ad_employees']['AD_сотрудники']})
+    gph_df = pd.DataFrame({'AD_ФИО': tables['ad_gph']['AD_ГПХ']})
+    for legacy in (legacy_utils_find_users_to_remove, legacy_comparison_find_users_to_remove):
+        assert legacy(kontur, staff_df, gph_df).empty
+        assert legacy(diadoc, staff_df, gph_df).empty
+
+def test_empty_system_table():
+    onec = pd.DataFrame({'1C_ФИО': pd.Series([], dtype=object), '1C_Активен': pd.Series([], dtype=object)})
+    users_to_remove = reconcile(make_tables(onec=onec), {0}, fuzzy=False)['users_to_remove_1c']
+    assert users_to_remove.empty
+    assert list(users_to_remove.columns) == ['1C_ФИО', '1C_Активен']
+
+STAFF = pd.DataFrame({'AD_ФИО': ['Иванов Иван Иванович', None, 'Петрова Елена']})
+GPH = pd.DataFrame({'AD_ФИО': ['Смирнов Олег Петрович']})
+
+LEGACY_CASES = {
+    'ФИО и статус 1С': pd.DataFrame({
+        'ФИО': ['Иванов Иван Иванович', 'Кузнецов Петр Ильич', None, 'ПЕТРОВА ЁЛЕНА', ' Смирнов  Олег Петрович '],
+        '1C_Активен': ['Да', 'Да', 'Да', 'Да', 'Да'],
+    }),
+    'неактивные и пропуски статуса': pd.DataFrame({
+        'ФИО': ['Кузнецов Петр Ильич', 'Орлов Игорь', 'Волков Антон'],
+        '1C_Активен': ['Нет', None, 'Да'],
+    }),
+    'статус Контура': pd.DataFrame({
+        'ФИО': ['Кузнецов Петр Ильич', 'Орлов Игорь', 'Волков Антон'],
+        'Контур_статус': ['активна', 'заблокирована', None],
+    }),
+    'дата блокировки Контура': pd.DataFrame({
+        'ФИО': ['Кузнецов Петр Ильич', 'Орлов Игорь'],
+        'Контур_Дата_блокировки': [np.nan, '01.02.2024'],
+    }),
+    'несколько статусов': pd.DataFrame({
+        'ФИО': ['Кузнецов Петр Ильич', 'Орлов Игорь', 'Волков Антон'],
+        'Диадок_Активен': ['Нет', 'Да', 'Нет'],
+        '1C_Активен': ['Да', 'Нет', 'Нет'],
+    }),
+    'без статуса': pd.DataFrame({'ФИО': ['Кузнецов Петр Ильич'], 'Подразделение': ['ИТ']}),
+    'повторяющиеся индексы': pd.DataFrame({
+        'ФИО': ['Кузнецов Петр Ильич', 'Иванов Иван Иванович', 'Орлов Игорь'],
+        '1C_Активен': ['Да', 'Да', 'Да'],
+    }, index=[0, 0, 1]),
+    'пустая таблица': pd.DataFrame(columns=['ФИО', '1C_Активен']),
+}
+
+@pytest.mark.parametrize('legacy, vectorized', [
+    (legacy_utils_find_users_to_remove, legacy_masked_find_users_to_remove),
+    (legacy_comparison_find_users_to_remove, legacy_masked_comparison_find_users_to_remove),
+], ids=['utils', 'comparison'])
+@pytest.mark.parametrize('title', LEGACY_CASES)
+def test_masks_match_row_loop(legacy, vectorized, title):
+    edo_df = LEGACY_CASES[title]
+    assert same_result(legacy(edo_df, STAFF, GPH), vectorized(edo_df.copy(), STAFF, GPH))
@@ -1,11 +1,15 @@
 # utils.py
 import re
+import importlib.util
+from copy import copy
+import numpy as np
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
 import os
 from pathlib import Path
-from config import SHTAT_DIR, KONTUR_DIR, DIADOC_DIR, ONEC_DIR, MAX_FILE_AGE_DAYS, MAX_ROWS
+from config import SHTAT_DIR, KONTUR_DIR, DIADOC_DIR, ONEC_DIR, MAX_FILE_AGE_DAYS, EXCEL_MAX_ROWS
+from config import RED_COLOR, YELLOW_COLOR
+from input_cache import load_cached
+from metrics import stage
 from datetime import datetime, timedelta
 import logging
 logger = logging.getLogger(__name__)
@@ -80,33 +84,104 @@ def normalize_name(full_name):
         return parts[0].upper()
     return ""
 
-def highlight_duplicates(df, column, duplicate_names, color='red'):
-    """Подсветка дубликатов в DataFrame"""
-    if color == 'red':
-        fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
-    else:
-        fill = PatternFill(start_color='FFEB9C', end_color='FFEB9C', fill_type='solid')
+# Суффикс столбца с нормализованным ФИО, который считается один раз для таблицы
+NAME_KEY_SUFFIX = '_ключ'
+
+# Счетчики векторной нормализации: вызовы и обработанные значения
+normalize_stats = {'calls': 0, 'values': 0}
+
+def normalize_names(names):
+    """
+    Векторная нормализация столбца ФИО: тот же результат, что normalize_name
+    для каждого значения, но строковыми операциями pandas над всем столбцом
+    """
+    names = pd.Series(names, dtype=object) if not isinstance(names, pd.Series) else names
+    normalize_stats['calls'] += 1
+    normalize_stats['values'] += len(names)
+    
+    if names.empty:
+        return pd.Series([], index=names.index, dtype=object)
     
-    for idx, row in df.iterrows():
-        normalized_name = normalize_name(row[column])
-        if normalized_name in duplicate_names:
-            yield fill
-        else:
-            yield None
+    missing = names.isna()
+    text = names.mask(missing, '').astype(str).str.replace('ё', 'е', regex=False).str.replace('Ё', 'Е', regex=False).str.strip()
+    parts = text.str.split(r'\s+', n=2, regex=True)
+    first = parts.str[0]
+    second = parts.str[1]
+    keys = first.where(second.isna(), first + ' ' + second).str.upper()
+    return keys.mask(missing, '').astype(object)
 
-def save_with_formatting(df, filename, sheet_name, highlighting):
-    """Сохранение DataFrame с форматированием"""
-    df.to_excel(filename, sheet_name=sheet_name, index=False)
+def normalize_patronymics(names):
+    """
+    Отчество (третье слово ФИО) для составного ключа: верхний регистр, замена Ё на Е,
+    без точки после инициала ("П." -> "П"). Пустая строка, если отчества нет.
+    """
+    names = pd.Series(names, dtype=object) if not isinstance(names, pd.Series) else names
+    if names.empty:
+        return pd.Series([], index=names.index, dtype=object)
+    
+    patronymics = names.astype(object).str.extract(r'^\s*\S+\s+\S+\s+(\S+)', expand=False).fillna('')
+    return patronymics.str.rstrip('.').str.upper().str.replace('Ё', 'Е', regex=False).astype(object)
+
+def name_key_column(column):
+    """Имя столбца с нормализованным ФИО для столбца column"""
+    return f"{column}{NAME_KEY_SUFFIX}"
+
+def is_name_key(column):
+    """Является ли столбец служебным столбцом нормализованного ФИО"""
+    return str(column).endswith(NAME_KEY_SUFFIX)
+
+def add_name_key(df, column):
+    """Добавляет в таблицу столбец нормализованного ФИО, который переиспользуют все сравнения"""
+    df[name_key_column(column)] = normalize_names(df[column])
+    return df
+
+# Версии разбора выгрузок для кэша исходных файлов: увеличиваются при исправлении функций read_*_file
+KONTUR_PARSER_VERSION = 1
+DIADOC_PARSER_VERSION = 1
+SHTAT_PARSER_VERSION = 1
+
+def read_kontur_file(kontur_file):
+    """Разбор выгрузки Контур Диадок в таблицу с переименованными столбцами"""
+    df = pd.read_excel(kontur_file)
+    
+    # Автоматически определяем структуру файла
+    df = df.rename(columns={
+        'ФИО': 'Контур_Диадок_ФИО',
+        'Администратор': 'Контур_Диадок_Администратор',
+        'Дата блокировки': 'Контур_Диадок_статус'
+    })
     
-    wb = load_workbook(filename)
-    ws = wb[sheet_name]
+    # Если переименование не сработало, ищем столбцы по содержимому
+    if 'Контур_Диадок_ФИО' not in df.columns:
+        for col in df.columns:
+            if any(keyword in str(col).lower() for keyword in ['фио', 'ф.и.о.', 'name']):
+                df = df.rename(columns={col: 'Контур_Диадок_ФИО'})
+            elif any(keyword in str(col).lower() for keyword in ['администратор', 'admin']):
+                df = df.rename(columns={col: 'Контур_Диадок_Администратор'})
+            elif any(keyword in str(col).lower() for keyword in ['дата блокировки', 'блокировка', 'статус']):
+                df = df.rename(columns={col: 'Контур_Диадок_статус'})
     
-    for idx, fill in enumerate(highlighting, 1):
-        if fill:
-            for row in range(2, len(df) + 2):
-                ws.cell(row=row, column=idx).fill = fill
+    result_df = df[['Контур_Диадок_ФИО', 'Контур_Диадок_Администратор', 'Контур_Диадок_статус']].copy()
     
-    wb.save(filename)
+    # Преобразуем булевы значения
+    if 'Контур_Диадок_Администратор' in result_df.columns:
+        admin_series = result_df['Контур_Диадок_Администратор'].astype(str)
+        admin_series = admin_series.apply(
+            lambda x: 'да' if x.lower() in ['true', 'истина', '1', 'yes', 'да'] 
+            else 'нет' if x.lower() in ['false', 'ложь', '0', 'no', 'нет'] 
+            else x
+        )
+        result_df = result_df.assign(Контур_Диадок_Администратор=admin_series)
+    
+    # Преобразуем даты блокировки в статусы
+    if 'Контур_Диадок_статус' in result_df.columns:
+        status_series = result_df['Контур_Диадок_статус'].apply(
+            lambda x: 'заблокирована' if pd.notna(x) and str(x).strip() != '' 
+            else 'активна'
+        )
+        result_df = result_df.assign(Контур_Диадок_статус=status_series)
+    
+    return result_df
 
 def load_kontur_data():
     """Загрузка данных из Контур Диадок"""
@@ -117,44 +192,7 @@ def load_kontur_data():
             return pd.DataFrame(columns=['Контур_Диадок_ФИО', 'Контур_Диадок_Администратор', 'Контур_Диадок_статус'])
         
         logger.info(f"Загрузка данных из файла: {kontur_file.name}")
-        df = pd.read_excel(kontur_file)
-        
-        # Автоматически определяем структуру файла
-        df = df.rename(columns={
-            'ФИО': 'Контур_Диадок_ФИО',
-            'Администратор': 'Контур_Диадок_Администратор',
-            'Дата блокировки': 'Контур_Диадок_статус'
-        })
-        
-        # Если переименование не сработало, ищем столбцы по содержимому
-        if 'Контур_Диадок_ФИО' not in df.columns:
-            for col in df.columns:
-                if any(keyword in str(col).lower() for keyword in ['фио', 'ф.и.о.', 'name']):
-                    df = df.rename(columns={col: 'Контур_Диадок_ФИО'})
-                elif any(keyword in str(col).lower() for keyword in ['администратор', 'admin']):
-                    df = df.rename(columns={col: 'Контур_Диадок_Администратор'})
-                elif any(keyword in str(col).lower() for keyword in ['дата блокировки', 'блокировка', 'статус']):
-                    df = df.rename(columns={col: 'Контур_Диадок_статус'})
-        
-        result_df = df[['Контур_Диадок_ФИО', 'Контур_Диадок_Администратор', 'Контур_Диадок_статус']].copy()
-        
-        # Преобразуем булевы значения
-        if 'Контур_Диадок_Администратор' in result_df.columns:
-            admin_series = result_df['Контур_Диадок_Администратор'].astype(str)
-            admin_series = admin_series.apply(
-                lambda x: 'да' if x.lower() in ['true', 'истина', '1', 'yes', 'да'] 
-                else 'нет' if x.lower() in ['false', 'ложь', '0', 'no', 'нет'] 
-                else x
-            )
-            result_df = result_df.assign(Контур_Диадок_Администратор=admin_series)
-        
-        # Преобразуем даты блокировки в статусы
-        if 'Контур_Диадок_статус' in result_df.columns:
-            status_series = result_df['Контур_Диадок_статус'].apply(
-                lambda x: 'заблокирована' if pd.notna(x) and str(x).strip() != '' 
-                else 'активна'
-            )
-            result_df = result_df.assign(Контур_Диадок_статус=status_series)
+        result_df = load_cached('kontur', kontur_file, read_kontur_file, KONTUR_PARSER_VERSION)
         
         logger.info(f"Загружено {len(result_df)} записей из Контур Диадок")
         return result_df
@@ -163,6 +201,29 @@ def load_kontur_data():
         logger.error(f"Ошибка при загрузке данных Контур Диадок: {e}")
         return pd.DataFrame(columns=['Контур_Диадок_ФИО', 'Контур_Диадок_Администратор', 'Контур_Диадок_статус'])
     
+def read_diadoc_file(diadoc_file):
+    """Разбор выгрузки Сфера Курьер в таблицу с переименованными столбцами"""
+    df = pd.read_excel(diadoc_file)
+    
+    # Автоматически определяем структуру файла
+    df = df.rename(columns={
+        'ФИО': 'Сфера_Курьер_ФИО',
+        'Активен': 'Сфера_Курьер_Активен',
+        'Администратор': 'Сфера_Курьер_Администратор'
+    })
+    
+    # Если переименование не сработало, ищем столбцы по содержимому
+    if 'Сфера_Курьер_ФИО' not in df.columns:
+        for col in df.columns:
+            if any(keyword in str(col).lower() for keyword in ['фио', 'ф.и.о.', 'name']):
+                df = df.rename(columns={col: 'Сфера_Курьер_ФИО'})
+            elif any(keyword in str(col).lower() for keyword in ['активен', 'active', 'статус']):
+                df = df.rename(columns={col: 'Сфера_Курьер_Активен'})
+            elif any(keyword in str(col).lower() for keyword in ['администратор', 'admin']):
+                df = df.rename(columns={col: 'Сфера_Курьер_Администратор'})
+    
+    return df[['Сфера_Курьер_ФИО', 'Сфера_Курьер_Активен', 'Сфера_Курьер_Администратор']]
+
 def load_diadoc_data():
     """Загрузка данных из Сфера Курьер"""
     try:
@@ -172,32 +233,31 @@ def load_diadoc_data():
             return pd.DataFrame(columns=['Сфера_Курьер_ФИО', 'Сфера_Курьер_Активен', 'Сфера_Курьер_Администратор'])
         
         logger.info(f"Загрузка данных из файла: {diadoc_file.name}")
-        df = pd.read_excel(diadoc_file)
-        
-        # Автоматически определяем структуру файла
-        df = df.rename(columns={
-            'ФИО': 'Сфера_Курьер_ФИО',
-            'Активен': 'Сфера_Курьер_Активен',
-            'Администратор': 'Сфера_Курьер_Администратор'
-        })
-        
-        # Если переименование не сработало, ищем столбцы по содержимому
-        if 'Сфера_Курьер_ФИО' not in df.columns:
-            for col in df.columns:
-                if any(keyword in str(col).lower() for keyword in ['фио', 'ф.и.о.', 'name']):
-                    df = df.rename(columns={col: 'Сфера_Курьер_ФИО'})
-                elif any(keyword in str(col).lower() for keyword in ['активен', 'active', 'статус']):
-                    df = df.rename(columns={col: 'Сфера_Курьер_Активен'})
-                elif any(keyword in str(col).lower() for keyword in ['администратор', 'admin']):
-                    df = df.rename(columns={col: 'Сфера_Курьер_Администратор'})
-        
-        result_df = df[['Сфера_Курьер_ФИО', 'Сфера_Курьер_Активен', 'Сфера_Курьер_Администратор']]
+        result_df = load_cached('diadoc', diadoc_file, read_diadoc_file, DIADOC_PARSER_VERSION)
         logger.info(f"Загружено {len(result_df)} записей из Сфера Курьер")
         return result_df
     except Exception as e:
         logger.error(f"Ошибка при загрузке данных Сфера Курьер: {e}")
         return pd.DataFrame(columns=['Сфера_Курьер_ФИО', 'Сфера_Курьер_Активен', 'Сфера_Курьер_Администратор'])
 
+def read_shtat_file(shtat_file):
+    """Разбор штатного расписания: столбец ФИО, переименованный в Штатное_ФИО"""
+    df = pd.read_excel(shtat_file)
+    
+    # Автоматически определяем столбец с ФИО
+    if 'Ф.И.О.' in df.columns:
+        df = df.rename(columns={'Ф.И.О.': 'Штатное_ФИО'})
+    elif 'ФИО' in df.columns:
+        df = df.rename(columns={'ФИО': 'Штатное_ФИО'})
+    else:
+        # Ищем столбец с ФИО по содержимому
+        for col in df.columns:
+            if any(keyword in str(col).lower() for keyword in ['фио', 'ф.и.о.', 'фио сотрудника']):
+                df = df.rename(columns={col: 'Штатное_ФИО'})
+                break
+    
+    return df[['Штатное_ФИО']]
+
 def load_shtat_data():
     """Загрузка данных из штатного расписания"""
     try:
@@ -207,89 +267,119 @@ def load_shtat_data():
             return pd.DataFrame(columns=['Штатное_ФИО'])
         
         logger.info(f"Загрузка данных из файла: {shtat_file.name}")
-        df = pd.read_excel(shtat_file)
-        
-        # Автоматически определяем столбец с ФИО
-        if 'Ф.И.О.' in df.columns:
-            df = df.rename(columns={'Ф.И.О.': 'Штатное_ФИО'})
-        elif 'ФИО' in df.columns:
-            df = df.rename(columns={'ФИО': 'Штатное_ФИО'})
-        else:
-            # Ищем столбец с ФИО по содержимому
-            for col in df.columns:
-                if any(keyword in str(col).lower() for keyword in ['фио', 'ф.и.о.', 'фио сотрудника']):
-                    df = df.rename(columns={col: 'Штатное_ФИО'})
-                    break
+        df = load_cached('shtat', shtat_file, read_shtat_file, SHTAT_PARSER_VERSION)
         
         logger.info(f"Загружено {len(df)} записей из штатного расписания")
-        return df[['Штатное_ФИО']]
+        return df
     except Exception as e:
         logger.error(f"Ошибка при загрузке данных штатного расписания: {e}")
         return pd.DataFrame(columns=['Штатное_ФИО'])
 
-def create_comparison_sheet(ad_employees, shtat_employees, filename):
-    """Создание листа сравнения AD и Штатного расписания"""
-    if not shtat_employees:
-        return 0
-    
-    ad_set = set(normalize_name(name) for name in ad_employees)
-    shtat_set = set(normalize_name(name) for name in shtat_employees)
-    
-    missing_in_shtat = ad_set - shtat_set
-    
-    comparison_data = []
-    for name in missing_in_shtat:
-        original_name = next((n for n in ad_employees if normalize_name(n) == name), name)
-        comparison_data.append({
-            'ФИО_AD': original_name,
-            'Статус': 'Активен в AD, но отсутствует в штатном расписании'
-        })
-    
-    comparison_df = pd.DataFrame(comparison_data)
-    
-    with pd.ExcelWriter(filename, engine='openpyxl', mode='a') as writer:
-        comparison_df.to_excel(writer, sheet_name='сравнение AD и Штатки', index=False)
-    
-    return len(missing_in_shtat)
+def highlight_fill(color):
+    """Заливка ячеек цветом RGB из config"""
+    from openpyxl.styles import PatternFill
+    rgb = '%02X%02X%02X' % color
+    return PatternFill(start_color=rgb, end_color=rgb, fill_type='solid')
 
-def find_duplicates(df1, df2, col1, col2):
-    """Поиск дубликатов между двумя DataFrame"""
-    names1 = set(df1[col1].apply(normalize_name).dropna())
-    names2 = set(df2[col2].apply(normalize_name).dropna())
-    
-    return names1.intersection(names2)
+# Подсветка: красный - дубликаты, желтый - предупреждения (удаление, расхождения)
+HIGHLIGHT_COLORS = {'red': RED_COLOR, 'yellow': YELLOW_COLOR}
 
-def find_internal_duplicates(df, column):
-    """Поиск дубликатов внутри одного столбца"""
-    normalized_names = df[column].apply(normalize_name)
-    value_counts = normalized_names.value_counts()
-    return set(value_counts[value_counts > 1].index)
+def highlighted_cells(df, highlighting, start, stop):
+    """
+    Подсвечиваемые ячейки строк start:stop: {номер строки в части: {номер столбца: цвет}}.
+    highlighting - список (столбец, маска строк df, цвет); при пересечении побеждает последний.
+    """
+    cells = {}
+    for column, mask, color in highlighting or []:
+        if column not in df.columns:
+            continue
+        position = df.columns.get_loc(column)
+        for row in np.flatnonzero(np.asarray(mask)[start:stop]):
+            cells.setdefault(row, {})[position] = color
+    return cells
 
-def find_users_to_remove(edo_df, staff_df, gph_df):
-    """Поиск пользователей для удаления из ЭДО"""
-    all_valid_names = set()
-    
-    if not staff_df.empty and 'AD_ФИО' in staff_df.columns:
-        all_valid_names.update(staff_df['AD_ФИО'].apply(normalize_name).dropna())
-    
-    if not gph_df.empty and 'AD_ФИО' in gph_df.columns:
-        all_valid_names.update(gph_df['AD_ФИО'].apply(normalize_name).dropna())
-    
-    users_to_remove = []
+def write_sheet(df, workbook, sheet_name, max_rows=EXCEL_MAX_ROWS, highlighting=None):
+    """
+    Запись таблицы на лист книги openpyxl в режиме write_only (строки сразу уходят
+    в файл листа, ячейки не держатся в памяти). Пустые значения - пустые ячейки.
+    Подсветка (см. highlighted_cells) задается заранее вычисленными масками строк
+    и применяется при той же записи только к отмеченным ячейкам.
+    Если строк больше, чем помещается на лист, остаток записывается на листы
+    "<имя> (2)", "<имя> (3)" и т.д.
+    """
+    from openpyxl.cell import WriteOnlyCell
     
-    for _, row in edo_df.iterrows():
-        fio_column = edo_df.columns[0]
-        if pd.isna(row[fio_column]):
-            continue
-            
-        normalized_name = normalize_name(row[fio_column])
+    chunk_size = max_rows - 1
+    starts = range(0, len(df), chunk_size) if len(df) else [0]
+    for part, start in enumerate(starts, start=1):
+        sheet = workbook.create_sheet(sheet_name if part == 1 else f"{sheet_name} ({part})")
+        sheet.append([str(column) for column in df.columns])
+        chunk = df.iloc[start:start + chunk_size].astype(object)
+        cells = highlighted_cells(df, highlighting, start, start + chunk_size)
+        
+        # Стиль заливки регистрируется в книге один раз, ячейкам копируется готовый
+        styles = {}
+        for color, rgb in HIGHLIGHT_COLORS.items():
+            template = WriteOnlyCell(sheet)
+            template.fill = highlight_fill(rgb)
+            styles[color] = template._style
         
-        if normalized_name not in all_valid_names:
-            if 'Контур_статус' in edo_df.columns and row['Контур_статус'] == 'активна':
-                users_to_remove.append(row)
-            elif 'Диадок_Активен' in edo_df.columns and row['Диадок_Активен'] == 'Да':
-                users_to_remove.append(row)
-            elif '1C_Активен' in edo_df.columns and row['1C_Активен'] == 'Да':
-                users_to_remove.append(row)
+        for i, row in enumerate(chunk.where(chunk.notna(), None).itertuples(index=False, name=None)):
+            if i in cells:
+                row = list(row)
+                for position, color in cells[i].items():
+                    row[position] = WriteOnlyCell(sheet, value=row[position])
+                    row[position]._style = copy(styles[color])
+            sheet.append(row)
+    if len(starts) > 1:
+        logger.info(f"Лист {sheet_name}: {len(df)} строк не помещаются на один лист, записано листов - {part}")
+
+def write_workbook(sheets, filename, max_rows=EXCEL_MAX_ROWS, highlighting=None):
+    """
+    Запись всех листов результата за один раз: sheets - {имя листа: DataFrame}
+    в порядке листов, highlighting - {имя листа: подсветка для write_sheet}.
+    Книга не перечитывается и не дописывается.
+    """
+    from openpyxl import Workbook
     
-    return pd.DataFrame(users_to_remove)
\ No newline at end of file
+    highlighting = highlighting or {}
+    workbook = Workbook(write_only=True)
+    for sheet_name, df in sheets.items():
+        with stage(f"write_sheet {sheet_name}", rows=len(df)):
+            write_sheet(df, workbook, sheet_name, max_rows, highlighting.get(sheet_name))
+    with stage('save_workbook'):
+        workbook.save(filename)
+    logger.info(f"Сохранено листов: {len(workbook.worksheets)} в файл {filename}")
+
+# Машиночитаемые форматы наборов результатов: запись DataFrame в файл
+RESULT_FILE_WRITERS = {
+    'csv': lambda df, path: df.to_csv(path, index=False, encoding='utf-8'),
+    'jsonl': lambda df, path: df.to_json(path, orient='records', lines=True, force_ascii=False),
+    'parquet': lambda df, path: df.to_parquet(path, index=False),
+}
+
+def write_result_files(result_sets, directory, formats):
+    """
+    Наборы результатов {имя: DataFrame} в машиночитаемых форматах: файл <имя>.<формат>
+    для каждого набора и формата в папке directory. Пустые наборы тоже записываются
+    (только заголовок), чтобы отсутствие файла не путалось с отсутствием данных.
+    Parquet требует pyarrow или fastparquet; без них формат пропускается с ошибкой в логе.
+    Возвращает список записанных файлов.
+    """
+    formats = [file_format for file_format in formats if file_format in RESULT_FILE_WRITERS]
+    if 'parquet' in formats and not (importlib.util.find_spec('pyarrow') or importlib.util.find_spec('fastparquet')):
+        logger.error("Формат parquet пропущен: не установлен pyarrow (pip install pyarrow)")
+        formats.remove('parquet')
+    if not formats:
+        return []
+    
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    files = []
+    for name, df in result_sets.items():
+        for file_format in formats:
+            path = directory / f"{name}.{file_format}"
+            RESULT_FILE_WRITERS[file_format](df, path)
+            files.append(path)
+    logger.info(f"Наборы результатов ({', '.join(formats)}): {len(result_sets)} в папке {directory}")
+    return files